@@ -1,11 +1,25 @@
 import numpy as np
 import json
+import os
 from sklearn.ensemble import RandomForestRegressor
-from heapq import heappop, heappush
-from datetime import datetime
+from asof_join import asof_join
+from model_store import load_or_train
+from road_graph import RoadGraph
+from route_engines import ENGINES
+from weight_engine import FEATURE_COLUMNS, air_quality_features, calculate_route_weights, traffic_features
+from window_stats import AIR_QUALITY_FIELDS, ALL, WindowAggregator
 import sys
 sys.stdout.reconfigure(encoding='utf-8')
 
+# Input and output files, next to this script
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SENSOR_DATA_FILE = os.path.join(BASE_DIR, 'sensor_data.json')
+INTERSECTION_DATA_FILE = os.path.join(BASE_DIR, 'intersection_data.json')
+RESULTS_FILE = os.path.join(BASE_DIR, 'optimal_route_results.json')
+
+# RandomForest settings (part of the saved model's hash)
+MODEL_PARAMS = {'n_estimators': 100}
+
 road_graph = {
     'Intersection A': {'Intersection B': 5, 'Intersection C': 10, 'Intersection D': 8},
     'Intersection B': {'Intersection A': 5, 'Intersection C': 4, 'Intersection D': 7},
@@ -27,16 +41,28 @@ air_quality_data = [
     {'timestamp': 'Intersection D', 'co': 2, 'no2': 4, 'pm25': 6, 'temperature': 25, 'humidity': 65}
 ]
 
-# Load air quality data from the JSON file
-with open('sensor_data.json', 'r') as file:
-    air_quality_data = json.load(file)
+# Load air quality data from the JSON file, or from a binary telemetry frame file (.tlm)
+def load_air_quality_data(path=SENSOR_DATA_FILE):
+    if path.endswith('.tlm'):
+        root_dir = os.path.join(BASE_DIR, '..')
+        if root_dir not in sys.path:
+            sys.path.insert(0, root_dir)
+        from telemetry_codec import load_records
+        return load_records(path)
+    with open(path, 'r') as file:
+        return json.load(file)
+
+# Calculate average air quality levels for penalty calculation over the current window of the telemetry stream
+def calculate_air_quality_averages(aggregator, key=ALL, window=None, now=None):
+    """Window means of the air quality fields for one intersection (default: all of them).
 
-# Calculate average air quality levels for penalty calculation
-average_co = np.mean([entry['co'] for entry in air_quality_data])
-average_no2 = np.mean([entry.get('no2', 0) for entry in air_quality_data])
-average_pm25 = np.mean([entry.get('pm25', 0) for entry in air_quality_data])
-average_temperature = np.mean([entry['temperature'] for entry in air_quality_data])
-average_humidity = np.mean([entry['humidity'] for entry in air_quality_data])
+    aggregator is a WindowAggregator fed with the readings as they arrive; returns None
+    when the window holds no reading.
+    """
+    averages = aggregator.means(key, window, now)
+    if not averages:
+        return None
+    return {field: averages.get(field, 0.0) for field in AIR_QUALITY_FIELDS}
 
 # Define a function for air quality penalty, considering temperature and humidity with a weight of 0.01
 def calculate_air_quality_penalty(co, no2, pm25, temperature, humidity):
@@ -45,21 +71,26 @@ def calculate_air_quality_penalty(co, no2, pm25, temperature, humidity):
     penalty += (humidity * 0.01)
     return penalty
 
-# Load traffic data from the JSON file
-with open('intersection_data.json', 'r') as file:
-    traffic_data = json.load(file)
+# Calculate the air quality penalty from the current window averages (None without readings)
+def calculate_window_penalty(aggregator, key=ALL, window=None, now=None):
+    averages = calculate_air_quality_averages(aggregator, key, window, now)
+    return calculate_air_quality_penalty(**averages) if averages else None
 
-# Convert traffic data to the required format
-traffic_data_dict = {
-    entry['timestamp']: {
-        'traffic_volume': entry['traffic_volume'],
-        'average_speed': entry['average_speed'],
-        'vehicle_count': entry['vehicle_count'],
-        'light_status': entry['light_status'],
-        'rain': entry['rain']
+# Load traffic data from the JSON file and convert it to the required format
+def load_traffic_data(path=INTERSECTION_DATA_FILE):
+    with open(path, 'r') as file:
+        traffic_data = json.load(file)
+
+    return {
+        entry['timestamp']: {
+            'traffic_volume': entry['traffic_volume'],
+            'average_speed': entry['average_speed'],
+            'vehicle_count': entry['vehicle_count'],
+            'light_status': entry['light_status'],
+            'rain': entry['rain']
+        }
+        for entry in traffic_data
     }
-    for entry in traffic_data
-}
 
 # Road network graph with distances
 #   'Intersection A': {'Intersection B': 5, 'Intersection C': 10, 'Intersection D': 8},
@@ -68,186 +99,182 @@ traffic_data_dict = {
    # 'Intersection D': {'Intersection A': 8, 'Intersection B': 7, 'Intersection C': 6}
 #}
 
-# Function to generate training data for RandomForest (using traffic and air quality data)
-def find_closest_timestamp(target, air_quality_data):
-    target_time = datetime.strptime(target, "%Y-%m-%d %H:%M:%S")
-    closest_entry = min(
-        air_quality_data,
-        key=lambda x: abs(datetime.strptime(x['timestamp'], "%Y-%m-%d %H:%M:%S") - target_time)
-    )
-    return closest_entry
-
-# Generate training data for RandomForest
-def generate_training_data(traffic_data, air_quality_data):
-    X = []
-    y = []
-    
-    for timestamp, entry in traffic_data.items():
-        # Find the closest timestamp from `air_quality_data`
-        air_data_entry = find_closest_timestamp(timestamp, air_quality_data)
-        if air_data_entry:
-            # Build the feature vector
-            features = [
-                entry['traffic_volume'],
-                entry['average_speed'],
-                entry['vehicle_count'],
-                1 if entry['light_status'] == 'red' else 0,
-                entry['rain'],
-                air_data_entry['co'],
-                air_data_entry['no2'],
-                air_data_entry['pm25'],
-                air_data_entry['temperature'],
-                air_data_entry['humidity']
-            ]
-            # Add a dummy target value (you can modify it later with a real target)
-            target = 1
-            
-            X.append(features)
-            y.append(target)
-    
-    return np.array(X), np.array(y)
+# Generate training data for RandomForest (using traffic and air quality data)
+def generate_training_data(traffic_data, air_quality_data, max_tolerance=None):
+    """Join every traffic record with the closest air quality reading in one sorted pass.
+
+    traffic_data and air_quality_data are either the loaded JSON records or the columns
+    read from the telemetry store (TelemetryStore.read). Records with no reading within
+    max_tolerance seconds are left out.
+    """
+    if isinstance(traffic_data.get('timestamp'), np.ndarray):
+        return generate_training_data_from_columns(traffic_data, air_quality_data, max_tolerance)
+    timestamps = list(traffic_data)
+    if not timestamps or not air_quality_data:
+        return np.array([]), np.array([])
+
+    # Find the closest timestamp from `air_quality_data` for every traffic record at once
+    matches = asof_join(timestamps, [entry['timestamp'] for entry in air_quality_data], tolerance=max_tolerance)
+    matched = np.flatnonzero(matches >= 0)
+    if matched.size == 0:
+        return np.array([]), np.array([])
+
+    # Build the feature matrix
+    traffic_entries = list(traffic_data.values())
+    traffic_rows = np.array([traffic_features(traffic_entries[i]) for i in matched.tolist()], dtype=float)
+    air_rows = np.array([air_quality_features(air_quality_data[i]) for i in matches[matched].tolist()], dtype=float)
+    X = np.hstack([traffic_rows, air_rows])
+    # Add a dummy target value (you can modify it later with a real target)
+    y = np.ones(len(X), dtype=int)
+
+    return X, y
+
+# Generate the same training data from the columns of the telemetry store, without building records
+def generate_training_data_from_columns(traffic_columns, air_columns, max_tolerance=None):
+    """Rows whose features are not all present (NaN) are left out."""
+    if len(traffic_columns['timestamp']) == 0 or len(air_columns['timestamp']) == 0:
+        return np.array([]), np.array([])
+
+    # The store keeps timestamps as epoch seconds, so no string is parsed here
+    matches = asof_join(traffic_columns['timestamp'], air_columns['timestamp'], tolerance=max_tolerance)
+    matched = np.flatnonzero(matches >= 0)
+    if matched.size == 0:
+        return np.array([]), np.array([])
+
+    categories = traffic_columns.categories.get('light_status', [])
+    red_code = categories.index('red') if 'red' in categories else -2
+    columns = []
+    for field in FEATURE_COLUMNS:
+        source, rows = (air_columns, matches[matched]) if field in AIR_QUALITY_FIELDS else (traffic_columns, matched)
+        if field == 'red_light':
+            columns.append(traffic_columns['light_status'][matched] == red_code)
+        elif field in source:
+            columns.append(source[field][rows])
+        else:
+            raise ValueError(f"No {field} column in the telemetry data")
+    X = np.column_stack(columns).astype(float)
+    X = X[np.isfinite(X).all(axis=1)]
+    # Add a dummy target value (you can modify it later with a real target)
+    y = np.ones(len(X), dtype=int)
+
+    return X, y
 
 # Train the RandomForest model
-X_train, y_train = generate_training_data(traffic_data_dict, air_quality_data)
-model = RandomForestRegressor(n_estimators=100)
-print("X_train shape:", np.array(X_train).shape)
-print("y_train shape:", np.array(y_train).shape)
-print("X_train:", X_train)
-print("y_train:", y_train)
-print("X_train:", X_train)
-print("y_train:", y_train)
-
-if isinstance(X_train, list):
-    X_train = np.array(X_train)
-if isinstance(y_train, list):
-    y_train = np.array(y_train)
-
-print("X_train shape:", X_train.shape)
-print("y_train shape:", y_train.shape)
-
-# Stop execution if the data is empty
-if X_train.size == 0 or y_train.size == 0:
-    raise ValueError("Error: X_train or y_train is empty")
-
-# Transform X_train to 2D if necessary
-if len(X_train.shape) == 1:
-    print("Reshape X_train to 2D")
-    X_train = X_train.reshape(-1, 1)
-
-print("New shape of X_train:", X_train.shape)
-model.fit(X_train, y_train)
-print("Final shape of X_train:", X_train.shape)
-print("Final shape of y_train:", y_train.shape)
-
-# Calculate route weights using the trained RandomForest model
-def calculate_route_weights(graph, traffic_data, air_quality_data, model):
-    route_weights = {}
-    
-    for start, neighbors in graph.items():
-        for end, distance in neighbors.items():
-            # Find the corresponding traffic and air quality data entry for this timestamp
-            traffic_entry = traffic_data.get(start)
-            if not traffic_entry:
-                print(f"Missing traffic data for {start}. Skipping this route.")
-                continue
-            
-            # Extract traffic and air quality data
-            air_data_entry = next((ad for ad in air_quality_data if ad['timestamp'] == start), None)
-            if not air_data_entry:
-                print(f"Missing air quality data for {start}. Skipping this route.")
-                continue
-            
-            # Feature vector for the model (traffic data + air quality data)
-            features = [
-                traffic_entry['traffic_volume'],
-                traffic_entry['average_speed'],
-                traffic_entry['vehicle_count'],
-                1 if traffic_entry['light_status'] == 'red' else 0,  # Red light factor
-                traffic_entry['rain'],
-                air_data_entry['co'],
-                air_data_entry['no2'],
-                air_data_entry['pm25'],
-                air_data_entry['temperature'],
-                air_data_entry['humidity']
-            ]
-            
-            # Predict route weight using RandomForest model
-            weight = model.predict(np.array(features).reshape(1, -1))[0]
-            if not np.isfinite(weight):
-                print(f"Invalid weight between {start} and {end}: {weight}. Setting default value.")
-                weight = 9999  # Large value to signal a penalty
-            route_weights[(start, end)] = weight
-    
-    return route_weights
-
-# Dijkstra’s algorithm for finding the optimal route
-def find_optimal_route(start, end, graph, route_weights):
-    priority_queue = [(0, start)]  # (cumulative weight, intersection)
-    shortest_paths = {node: float('inf') for node in graph}
-    shortest_paths[start] = 0
-    previous_nodes = {}
-    
-    while priority_queue:
-        current_weight, current_intersection = heappop(priority_queue)
-        print(f"Analyzing current intersection: {current_intersection} with weight: {current_weight}")
-        
-        if current_intersection == end:
-            break
-        
-        for neighbor in graph[current_intersection]:
-            weight = route_weights.get((current_intersection, neighbor), float('inf'))
-            if weight == float('inf'):
-                print(f"Missing route weight from {current_intersection} to {neighbor}. Skipping.")
-                continue
-
-            new_weight = current_weight + weight
-            
-            if new_weight < shortest_paths[neighbor]:
-                shortest_paths[neighbor] = new_weight
-                previous_nodes[neighbor] = current_intersection
-                heappush(priority_queue, (new_weight, neighbor))
-    
-    print(f"Analyzing current intersection: {current_intersection}")
-    print(f"Current weight: {current_weight}")
-    print(f"Neighbors: {graph[current_intersection]}")
+def train_model(traffic_data, air_quality_data):
+    X_train, y_train = generate_training_data(traffic_data, air_quality_data)
+    model = RandomForestRegressor(**MODEL_PARAMS)
+    print("X_train shape:", np.array(X_train).shape)
+    print("y_train shape:", np.array(y_train).shape)
+    print("X_train:", X_train)
+    print("y_train:", y_train)
+    print("X_train:", X_train)
+    print("y_train:", y_train)
+
+    if isinstance(X_train, list):
+        X_train = np.array(X_train)
+    if isinstance(y_train, list):
+        y_train = np.array(y_train)
+
+    print("X_train shape:", X_train.shape)
+    print("y_train shape:", y_train.shape)
+
+    # Stop execution if the data is empty
+    if X_train.size == 0 or y_train.size == 0:
+        raise ValueError("Error: X_train or y_train is empty")
+
+    # Transform X_train to 2D if necessary
+    if len(X_train.shape) == 1:
+        print("Reshape X_train to 2D")
+        X_train = X_train.reshape(-1, 1)
+
+    print("New shape of X_train:", X_train.shape)
+    model.fit(X_train, y_train)
+    print("Final shape of X_train:", X_train.shape)
+    print("Final shape of y_train:", y_train.shape)
+    return model
+
+# Load the saved RandomForest model, retraining only when the input files changed
+def load_model(traffic_data, air_quality_data):
+    return load_or_train(
+        lambda: train_model(traffic_data, air_quality_data),
+        [INTERSECTION_DATA_FILE, SENSOR_DATA_FILE],
+        FEATURE_COLUMNS,
+        MODEL_PARAMS
+    )
+
+# Find the optimal route with one of the query engines (Dijkstra’s algorithm by default)
+def find_optimal_route(start, end, graph, route_weights, engine='dijkstra', **engine_options):
+    """Find the cheapest route from start to end over the CSR road graph.
+
+    graph may be a RoadGraph or the dict-of-dicts format, route_weights either a
+    {(start, end): weight} map or an array aligned with the RoadGraph edges.
+    engine is one of 'dijkstra', 'bidirectional', 'astar' (engine_options: heuristic)
+    or 'ch' (engine_options: hierarchy, a prebuilt ContractionHierarchy; without one, the
+    hierarchy is preprocessed on the first query and reused while the weights stay the same).
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unsupported route engine: {engine}. Use one of {', '.join(ENGINES)}.")
+    road_network = graph if isinstance(graph, RoadGraph) else RoadGraph.from_dict(graph)
+    if isinstance(route_weights, np.ndarray):
+        weights = route_weights
+    else:
+        weights = road_network.weights_from_map(route_weights)
+
+    missing = int(np.count_nonzero(np.isinf(weights)))
+    if missing:
+        print(f"Missing route weights for {missing} of {road_network.num_edges} routes. Skipping them.")
+
+    source = road_network.node_index[start]
+    target = road_network.node_index[end]
+    path, total_weight, settled = ENGINES[engine](road_network, weights, source, target, **engine_options)
+    print(f"Analyzed {settled} intersections ({engine}), cheapest weight to {end}: {total_weight}")
 
     # Retrieve the path
-    route = []
-    current = end
-    while current in previous_nodes:
-        route.insert(0, current)
-        current = previous_nodes[current]
-    route.insert(0, start)
-    
+    route = [road_network.node_names[node] for node in path] if path else [start]
+
     if len(route) < 2:
         print("Optimal route is too short. Check your data and weights.")
-    return route, shortest_paths[end]
+    return route, total_weight
 
 # Main execution
-start_intersection = 'Intersection A'
-end_intersection = 'Intersection D'
-
-# Calculate route weights using the trained RandomForest model
-route_weights = calculate_route_weights(
-    road_graph, 
-    traffic_data_dict, 
-    air_quality_data, 
-    model
-)
-
-optimal_route, total_weight = find_optimal_route(start_intersection, end_intersection, road_graph, route_weights)
-print("Route Weights:", route_weights)
-
-# Save results
-results = {
-    "optimal_route": optimal_route,
-    "total_weight": total_weight
-}
-with open('optimal_route_results.json', 'w') as f:
-    json.dump(results, f, indent=4)
-print("THE RESULTS WERE SAVED in 'optimal_route_results.json'")
-print("Optimal Route:", optimal_route)
-print("Total Weight (Cost or Time):", total_weight)
-
-with open('optimal_route_results.json', 'w', encoding='utf-8') as f:
-    json.dump(results, f)
+def main():
+    air_quality_data = load_air_quality_data()
+    traffic_data_dict = load_traffic_data()
+    model = load_model(traffic_data_dict, air_quality_data)
+
+    # Feed the readings through the window statistics like the telemetry stream would
+    window_stats = WindowAggregator(AIR_QUALITY_FIELDS)
+    window_stats.consume(air_quality_data)
+    print("Air quality penalty (last 15 minutes):", calculate_window_penalty(window_stats, window=900))
+
+    start_intersection = 'Intersection A'
+    end_intersection = 'Intersection D'
+
+    # Calculate route weights using the trained RandomForest model
+    route_weights = calculate_route_weights(
+        road_graph, 
+        traffic_data_dict, 
+        air_quality_data, 
+        model
+    )
+
+    road_network = RoadGraph.from_dict(road_graph)
+    optimal_route, total_weight = find_optimal_route(start_intersection, end_intersection, road_network, route_weights)
+    print("Route Weights:", route_weights)
+
+    # Save results
+    results = {
+        "optimal_route": optimal_route,
+        "total_weight": total_weight
+    }
+    with open(RESULTS_FILE, 'w') as f:
+        json.dump(results, f, indent=4)
+    print("THE RESULTS WERE SAVED in 'optimal_route_results.json'")
+    print("Optimal Route:", optimal_route)
+    print("Total Weight (Cost or Time):", total_weight)
+
+    with open(RESULTS_FILE, 'w', encoding='utf-8') as f:
+        json.dump(results, f)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import numpy as np
+
+# Function to parse "%Y-%m-%d %H:%M:%S" timestamp strings once into int64 epoch seconds
+def parse_epochs(timestamps):
+    return np.array(list(timestamps), dtype='datetime64[s]').astype(np.int64)
+
+class AsOfIndex:
+    """Sorted epoch index used to match many timestamps against one reading history."""
+
+    def __init__(self, timestamps):
+        epochs = parse_epochs(timestamps)
+        # Stable sort so equal timestamps keep the order in which they were recorded
+        self.order = np.argsort(epochs, kind='stable')
+        self.sorted_epochs = epochs[self.order]
+
+    def __len__(self):
+        return len(self.sorted_epochs)
+
+    def match(self, targets, tolerance=None, direction='nearest'):
+        """Return the position in the original history matched by each target, or -1.
+
+        direction is 'nearest', 'backward' (latest reading at or before the target)
+        or 'forward' (earliest reading at or after it); tolerance is in seconds.
+        """
+        target_epochs = targets if isinstance(targets, np.ndarray) else parse_epochs(targets)
+        target_epochs = np.asarray(target_epochs, dtype=np.int64)
+        result = np.full(len(target_epochs), -1, dtype=np.int64)
+        count = len(self.sorted_epochs)
+        if count == 0 or len(target_epochs) == 0:
+            return result
+
+        # Index of the first reading at or after each target
+        right = np.searchsorted(self.sorted_epochs, target_epochs, side='left')
+        # Index of the last reading at or before each target
+        left = np.searchsorted(self.sorted_epochs, target_epochs, side='right') - 1
+
+        if direction == 'backward':
+            chosen = left
+            valid = left >= 0
+        elif direction == 'forward':
+            chosen = right
+            valid = right < count
+        elif direction == 'nearest':
+            has_left = left >= 0
+            has_right = right < count
+            left_gap = np.where(has_left, target_epochs - self.sorted_epochs[np.clip(left, 0, count - 1)], np.iinfo(np.int64).max)
+            right_gap = np.where(has_right, self.sorted_epochs[np.clip(right, 0, count - 1)] - target_epochs, np.iinfo(np.int64).max)
+            # Ties go to the earlier reading
+            chosen = np.where(left_gap <= right_gap, left, right)
+            valid = has_left | has_right
+        else:
+            raise ValueError(f"Unsupported direction: {direction}")
+
+        chosen = np.clip(chosen, 0, count - 1)
+        # Point duplicated timestamps at the first reading recorded with that value
+        chosen = np.searchsorted(self.sorted_epochs, self.sorted_epochs[chosen], side='left')
+
+        if tolerance is not None:
+            valid &= np.abs(self.sorted_epochs[chosen] - target_epochs) <= tolerance
+
+        result[valid] = self.order[chosen[valid]]
+        return result
+
+# Function to match every target timestamp with the closest reading timestamp
+def asof_join(target_timestamps, reading_timestamps, tolerance=None, direction='nearest'):
+    return AsOfIndex(reading_timestamps).match(target_timestamps, tolerance=tolerance, direction=direction)
@@ -0,0 +1,85 @@
+import random
+import time
+import tracemalloc
+import numpy as np
+from heapq import heappop, heappush
+from road_graph import RoadGraph, dijkstra, reconstruct_path
+from synthetic_network import make_grid_network
+
+# Grid sizes to benchmark (320 x 320 is a little over 100k intersections)
+GRID_SIZES = [(32, 32), (100, 100), (320, 320)]
+QUERIES = 20
+
+# Reference implementation: the original dict-of-dicts Dijkstra, without the per-node prints
+def dict_dijkstra(start, end, graph, route_weights):
+    priority_queue = [(0, start)]
+    shortest_paths = {node: float('inf') for node in graph}
+    shortest_paths[start] = 0
+    previous_nodes = {}
+    while priority_queue:
+        current_weight, current_intersection = heappop(priority_queue)
+        if current_intersection == end:
+            break
+        for neighbor in graph[current_intersection]:
+            new_weight = current_weight + route_weights.get((current_intersection, neighbor), float('inf'))
+            if new_weight < shortest_paths[neighbor]:
+                shortest_paths[neighbor] = new_weight
+                previous_nodes[neighbor] = current_intersection
+                heappush(priority_queue, (new_weight, neighbor))
+    return shortest_paths[end]
+
+# Function to measure the memory allocated while building an object
+def traced_size(build):
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+def main():
+    # CSR MB: the NumPy arrays; lists MB: the list copies of indptr/indices cached for the searches;
+    # query MB: the weight list and the dist/prev lists every Dijkstra query builds
+    print(f"{'nodes':>8} {'edges':>8} {'dict MB':>8} {'CSR MB':>8} {'lists MB':>9} {'query MB':>9} {'total MB':>9} "
+          f"{'dict ms':>9} {'CSR ms':>8}")
+    for rows, cols in GRID_SIZES:
+        rng = random.Random(rows)
+        graph, dict_bytes = traced_size(lambda: make_grid_network(rows, cols))
+        route_weights, weights_bytes = traced_size(lambda: {
+            (start, end): distance * rng.uniform(0.5, 2.0)
+            for start, neighbors in graph.items() for end, distance in neighbors.items()
+        })
+        dict_bytes += weights_bytes
+
+        road_network = RoadGraph.from_dict(graph)
+        weights = road_network.weights_from_map(route_weights)
+        csr_bytes = road_network.nbytes + weights.nbytes
+        # weights_from_map already built the list cache, so measure it on a fresh copy of the arrays
+        fresh_network = RoadGraph(road_network.node_names, road_network.indptr, road_network.indices, road_network.distances)
+        _, list_bytes = traced_size(fresh_network.adjacency_lists)
+        _, query_bytes = traced_size(lambda: (weights.tolist(), [0.0] * road_network.num_nodes,
+                                              [-1] * road_network.num_nodes))
+
+        names = list(graph)
+        queries = [(rng.choice(names), rng.choice(names)) for _ in range(QUERIES)]
+
+        start_time = time.perf_counter()
+        dict_costs = [dict_dijkstra(start, end, graph, route_weights) for start, end in queries]
+        dict_time = (time.perf_counter() - start_time) / QUERIES
+
+        start_time = time.perf_counter()
+        csr_costs = []
+        for start, end in queries:
+            source, target = road_network.node_index[start], road_network.node_index[end]
+            dist, prev, _ = dijkstra(road_network, weights, source, target)
+            reconstruct_path(prev, source, target)
+            csr_costs.append(dist[target])
+        csr_time = (time.perf_counter() - start_time) / QUERIES
+
+        assert np.allclose(dict_costs, csr_costs)
+        total_bytes = csr_bytes + list_bytes + query_bytes
+        print(f"{road_network.num_nodes:>8} {road_network.num_edges:>8} {dict_bytes / 1e6:>8.1f} "
+              f"{csr_bytes / 1e6:>8.1f} {list_bytes / 1e6:>9.1f} {query_bytes / 1e6:>9.1f} {total_bytes / 1e6:>9.1f} "
+              f"{dict_time * 1e3:>9.1f} {csr_time * 1e3:>8.1f}")
+
+if __name__ == "__main__":
+    main()
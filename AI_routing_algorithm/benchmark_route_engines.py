@@ -0,0 +1,55 @@
+import random
+import time
+import numpy as np
+from road_graph import RoadGraph
+from route_engines import ContractionHierarchy, Landmarks, astar, bidirectional_dijkstra, dijkstra_route
+from synthetic_network import make_grid_coordinates, make_grid_network
+
+# Grid sizes to benchmark, and number of random queries per size
+GRID_SIZES = [(30, 30), (70, 70)]
+QUERIES = 50
+
+def main():
+    for rows, cols in GRID_SIZES:
+        rng = random.Random(rows)
+        road_network = RoadGraph.from_dict(make_grid_network(rows, cols), make_grid_coordinates(rows, cols))
+        # Near-static weights: the road distances themselves
+        weights = road_network.distances
+        queries = [(rng.randrange(road_network.num_nodes), rng.randrange(road_network.num_nodes))
+                   for _ in range(QUERIES)]
+
+        start_time = time.perf_counter()
+        hierarchy = ContractionHierarchy(road_network, weights)
+        ch_time = time.perf_counter() - start_time
+        start_time = time.perf_counter()
+        landmarks = Landmarks(road_network, weights)
+        landmark_time = time.perf_counter() - start_time
+
+        engines = {
+            'dijkstra': lambda s, t: dijkstra_route(road_network, weights, s, t),
+            'bidirectional': lambda s, t: bidirectional_dijkstra(road_network, weights, s, t),
+            'astar (distance)': lambda s, t: astar(road_network, weights, s, t),
+            'astar (landmarks)': lambda s, t: astar(road_network, weights, s, t, landmarks.heuristic(t)),
+            'ch': lambda s, t: hierarchy.query(s, t)
+        }
+
+        print(f"\n{road_network.num_nodes} nodes, {road_network.num_edges} edges "
+              f"(CH preprocessing {ch_time:.1f} s, {hierarchy.shortcuts} shortcuts; landmarks {landmark_time:.1f} s)")
+        print(f"{'engine':<18} {'avg settled':>12} {'avg ms':>8}")
+        reference = None
+        for name, engine in engines.items():
+            settled = []
+            costs = []
+            start_time = time.perf_counter()
+            for source, target in queries:
+                path, cost, count = engine(source, target)
+                settled.append(count)
+                costs.append(cost)
+            elapsed = (time.perf_counter() - start_time) / QUERIES
+            if reference is None:
+                reference = costs
+            assert np.allclose(reference, costs), name
+            print(f"{name:<18} {np.mean(settled):>12.0f} {elapsed * 1e3:>8.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import time
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from synthetic_network import make_grid_network, make_intersection_readings
+from weight_engine import FEATURE_COLUMNS, build_feature_vector, calculate_route_weights
+
+# Grid sizes to benchmark (a grid of r x c intersections has about 4*r*c directed edges)
+GRID_SIZES = [(5, 5), (10, 10), (25, 25), (50, 50), (100, 100)]
+
+# The per-edge reference is only timed up to this many edges, it takes too long beyond that
+MAX_PER_EDGE_EDGES = 2000
+
+# Reference implementation: one model call per edge, like the original calculate_route_weights
+def per_edge_route_weights(graph, traffic_data, air_quality_data, model):
+    route_weights = {}
+    for start, neighbors in graph.items():
+        for end in neighbors:
+            traffic_entry = traffic_data.get(start)
+            air_data_entry = next((ad for ad in air_quality_data if ad['timestamp'] == start), None)
+            if not traffic_entry or not air_data_entry:
+                continue
+            features = build_feature_vector(traffic_entry, air_data_entry)
+            route_weights[(start, end)] = model.predict(np.array(features).reshape(1, -1))[0]
+    return route_weights
+
+# Function to train a model on random data with the routing feature layout
+def train_model(seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.uniform(0, 100, size=(200, len(FEATURE_COLUMNS)))
+    y = rng.uniform(1, 10, size=200)
+    model = RandomForestRegressor(n_estimators=100, random_state=seed)
+    model.fit(X, y)
+    return model
+
+def main():
+    model = train_model()
+    print(f"{'edges':>8} {'per-edge (s)':>14} {'batched (s)':>12} {'speedup':>9}")
+    for rows, cols in GRID_SIZES:
+        graph = make_grid_network(rows, cols)
+        traffic_data, air_quality_data = make_intersection_readings(graph)
+        edge_count = sum(len(neighbors) for neighbors in graph.values())
+
+        start = time.perf_counter()
+        batched = calculate_route_weights(graph, traffic_data, air_quality_data, model)
+        batched_time = time.perf_counter() - start
+
+        if edge_count <= MAX_PER_EDGE_EDGES:
+            start = time.perf_counter()
+            reference = per_edge_route_weights(graph, traffic_data, air_quality_data, model)
+            per_edge_time = time.perf_counter() - start
+            assert all(np.isclose(reference[key], batched[key]) for key in reference)
+            print(f"{edge_count:>8} {per_edge_time:>14.3f} {batched_time:>12.3f} {per_edge_time / batched_time:>8.1f}x")
+        else:
+            print(f"{edge_count:>8} {'-':>14} {batched_time:>12.3f} {'-':>9}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import json
+import os
+import tempfile
+import time
+import numpy as np
+import ai_routing
+from telemetry_store import TelemetryStore
+
+# Readings per dataset, one every READING_INTERVAL seconds (200000 readings span about 9 days)
+READINGS = 200000
+READING_INTERVAL = 4
+# The range read for training: one day in the middle of the history
+RANGE_START = '2025-03-18 00:00:00'
+RANGE_END = '2025-03-19 00:00:00'
+
+# Function to generate traffic and sensor histories shaped like intersection_data.json and sensor_data.json
+def make_histories(count, seed=0):
+    rng = np.random.default_rng(seed)
+    epochs = 1741996800 + np.arange(count) * READING_INTERVAL
+    timestamps = epochs.astype('datetime64[s]').astype(str)
+    traffic = [{
+        'timestamp': timestamp.replace('T', ' '), 'traffic_volume': int(volume), 'average_speed': round(float(speed), 2),
+        'vehicle_count': int(vehicles), 'light_status': 'red' if red else 'green', 'rain': int(rain)
+    } for timestamp, volume, speed, vehicles, red, rain in zip(
+        timestamps, rng.integers(20, 70, count), rng.uniform(30, 50, count), rng.integers(15, 50, count),
+        rng.random(count) < 0.5, rng.integers(100, 700, count))]
+    sensor = [{
+        'timestamp': timestamp.replace('T', ' '), 'co': round(float(co), 1), 'no2': round(float(no2), 1),
+        'pm25': int(pm25), 'temperature': round(float(temperature), 2), 'humidity': round(float(humidity), 2)
+    } for timestamp, co, no2, pm25, temperature, humidity in zip(
+        timestamps, rng.uniform(2, 6, count), rng.uniform(4, 8, count), rng.integers(6, 16, count),
+        rng.uniform(20, 26, count), rng.uniform(45, 65, count))]
+    return traffic, sensor
+
+def main():
+    traffic, sensor = make_histories(READINGS)
+    with tempfile.TemporaryDirectory() as directory:
+        traffic_file = os.path.join(directory, 'intersection_data.json')
+        sensor_file = os.path.join(directory, 'sensor_data.json')
+        for path, records in ((traffic_file, traffic), (sensor_file, sensor)):
+            with open(path, 'w') as file:
+                json.dump(records, file, indent=4)
+
+        store = TelemetryStore(os.path.join(directory, 'store'))
+        started = time.perf_counter()
+        store.write('intersection', traffic)
+        store.write('sensor', sensor)
+        print(f"Converted {2 * READINGS} readings into {len(store.partitions('sensor'))} day partitions "
+              f"in {time.perf_counter() - started:.2f} s")
+
+        # Reference: parse both JSON files and join the whole history, as training does today
+        started = time.perf_counter()
+        X_json, _ = ai_routing.generate_training_data(ai_routing.load_traffic_data(traffic_file),
+                                                      ai_routing.load_air_quality_data(sensor_file))
+        json_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        X_store, _ = ai_routing.generate_training_data(store.read('intersection'), store.read('sensor'))
+        store_time = time.perf_counter() - started
+        assert np.allclose(X_json, X_store)
+
+        started = time.perf_counter()
+        X_day, _ = ai_routing.generate_training_data(store.read('intersection', RANGE_START, RANGE_END),
+                                                     store.read('sensor', RANGE_START, RANGE_END))
+        day_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for _ in range(100):
+            store.read('sensor', RANGE_START, RANGE_END, fields=['co'])
+        slice_time = (time.perf_counter() - started) / 100
+
+    print(f"{'training data':<34} {'rows':>8} {'seconds':>9} {'speedup':>9}")
+    print(f"{'JSON files, whole history':<34} {len(X_json):>8} {json_time:>9.3f} {'':>9}")
+    print(f"{'store, whole history':<34} {len(X_store):>8} {store_time:>9.3f} {json_time / store_time:>8.1f}x")
+    print(f"{'store, one day':<34} {len(X_day):>8} {day_time:>9.3f} {json_time / day_time:>8.1f}x")
+    print(f"One-day slice of one column (memory-mapped view): {slice_time * 1000:.3f} ms")
+
+if __name__ == "__main__":
+    main()
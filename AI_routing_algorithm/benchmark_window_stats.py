@@ -0,0 +1,44 @@
+import time
+import numpy as np
+from window_stats import AIR_QUALITY_FIELDS, WindowAggregator
+
+# History lengths to benchmark (readings of one intersection, one per second)
+HISTORY_SIZES = [1000, 5000, 20000]
+# Window the statistics are asked for after every reading
+WINDOW = 300
+
+# Function to generate one intersection's air quality readings, one per second
+def make_readings(count, seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.normal([4, 6, 12, 24, 55], [1, 1, 3, 2, 5], size=(count, len(AIR_QUALITY_FIELDS)))
+    return [dict(zip(AIR_QUALITY_FIELDS, row), timestamp=1741996800 + index) for index, row in enumerate(values.tolist())]
+
+# Reference implementation: rescan the history with np.mean after every reading, like the original averages
+def rescan_means(history, now):
+    recent = [entry for entry in history if entry['timestamp'] > now - WINDOW]
+    return {field: np.mean([entry[field] for entry in recent]) for field in AIR_QUALITY_FIELDS}
+
+def main():
+    print(f"{'readings':>9} {'rescan (s)':>11} {'streaming (s)':>14} {'speedup':>9}")
+    for count in HISTORY_SIZES:
+        readings = make_readings(count)
+
+        start = time.perf_counter()
+        history = []
+        for entry in readings:
+            history.append(entry)
+            reference = rescan_means(history, entry['timestamp'])
+        rescan_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        aggregator = WindowAggregator(AIR_QUALITY_FIELDS, windows=(WINDOW,))
+        for entry in readings:
+            aggregator.feed(entry)
+            means = aggregator.means(window=WINDOW)
+        streaming_time = time.perf_counter() - start
+
+        assert all(np.isclose(reference[field], means[field]) for field in AIR_QUALITY_FIELDS)
+        print(f"{count:>9} {rescan_time:>11.3f} {streaming_time:>14.3f} {rescan_time / streaming_time:>8.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+from collections import OrderedDict
+from heapq import heappop, heappush
+from road_graph import INF, dijkstra, reconstruct_path
+from weight_engine import (AIR_QUALITY_ENTRY_FIELDS, TRAFFIC_ENTRY_FIELDS, calculate_edge_weights,
+                           index_air_quality, predict_source_weights)
+
+class ShortestPathTree:
+    """Cached single-source shortest-path tree: distances, parents and children per node."""
+
+    def __init__(self, source, dist, prev):
+        self.source = source
+        self.dist = dist
+        self.prev = prev
+        self.children = [[] for _ in dist]
+        for node, parent in enumerate(prev):
+            if parent != -1:
+                self.children[parent].append(node)
+
+    def set_parent(self, node, parent):
+        old_parent = self.prev[node]
+        if old_parent != -1:
+            self.children[old_parent].remove(node)
+        self.prev[node] = parent
+        if parent != -1:
+            self.children[parent].append(node)
+
+    def subtree(self, root):
+        nodes = [root]
+        for node in nodes:
+            nodes.extend(self.children[node])
+        return nodes
+
+class IncrementalRouter:
+    """Routing state that follows telemetry changes one intersection at a time.
+
+    When an intersection's readings change, only its outgoing edges are re-predicted and
+    the cached shortest-path trees are repaired around the changed edges instead of
+    being recomputed from scratch.
+    """
+
+    def __init__(self, road_network, traffic_data, air_quality_data, model, max_trees=64):
+        self.graph = road_network
+        self.model = model
+        self.traffic_data = dict(traffic_data)
+        self.air_quality_index = index_air_quality(air_quality_data)
+        self.weights = calculate_edge_weights(road_network, traffic_data, air_quality_data, model)
+        self._weight_list = self.weights.tolist()
+        # Bumped every time an edge weight changes, so caches can tell stale results apart
+        self.weight_version = 0
+        self.max_trees = max_trees
+        self.trees = OrderedDict()
+
+        reverse_graph, order = road_network.reverse()
+        self._reverse_adjacency = reverse_graph.adjacency_lists()
+        self._reverse_order = order.tolist()
+
+        # Totals of the work done and saved by the incremental updates
+        self.stats = {
+            'updates': 0,
+            'edges_repredicted': 0,
+            'edges_saved': 0,
+            'trees_repaired': 0,
+            'nodes_touched': 0,
+            'nodes_saved': 0,
+            'full_tree_builds': 0
+        }
+
+    def tree(self, source):
+        """Shortest-path tree from source, computed once and then kept up to date."""
+        tree = self.trees.get(source)
+        if tree is None:
+            dist, prev, _ = dijkstra(self.graph, self._weight_list, source)
+            tree = ShortestPathTree(source, dist, prev)
+            self.stats['full_tree_builds'] += 1
+            self.trees[source] = tree
+            if len(self.trees) > self.max_trees:
+                self.trees.popitem(last=False)
+        else:
+            self.trees.move_to_end(source)
+        return tree
+
+    def route(self, start, end):
+        """Return (route, total_weight) like find_optimal_route, using the cached trees."""
+        source = self.graph.node_index[start]
+        target = self.graph.node_index[end]
+        tree = self.tree(source)
+        path = reconstruct_path(tree.prev, source, target)
+        route = [self.graph.node_names[node] for node in path] if path else [start]
+        return route, tree.dist[target]
+
+    def update_intersection(self, name, traffic_entry=None, air_data_entry=None):
+        """Apply new telemetry for one intersection and return the work report of the update.
+
+        The entries may be partial: they are merged over the intersection's current records,
+        and the merged records must hold every feature field. Nothing is stored unless the
+        new weights were computed, and a failure halfway through restores the previous state.
+        """
+        traffic = self._merge_entry(name, self.traffic_data.get(name), traffic_entry, TRAFFIC_ENTRY_FIELDS, 'traffic')
+        air = self._merge_entry(name, self.air_quality_index.get(name), air_data_entry, AIR_QUALITY_ENTRY_FIELDS,
+                                'air quality')
+
+        node = self.graph.node_index[name]
+        begin, stop = self.graph.indptr[node], self.graph.indptr[node + 1]
+        report = {
+            'edges_repredicted': int(stop - begin),
+            'edges_saved': self.graph.num_edges - int(stop - begin),
+            'trees_repaired': 0,
+            'nodes_touched': 0,
+            'nodes_saved': 0
+        }
+
+        # Re-predict only the outgoing edges of this intersection (they share one feature row)
+        new_weight = INF
+        if stop > begin:
+            sources, predictions = predict_source_weights(
+                {name: int(stop - begin)},
+                {name: traffic} if traffic is not None else {},
+                {name: air} if air is not None else {},
+                self.model
+            )
+            if sources:
+                new_weight = float(predictions[0])
+
+        changed = []
+        for e in range(begin, stop):
+            if self._weight_list[e] != new_weight:
+                changed.append((e, self._weight_list[e], new_weight))
+
+        previous = (self.traffic_data.get(name), self.air_quality_index.get(name))
+        try:
+            if traffic is not None:
+                self.traffic_data[name] = traffic
+            if air is not None:
+                self.air_quality_index[name] = air
+            for e, _, weight in changed:
+                self._weight_list[e] = weight
+                self.weights[e] = weight
+            if changed:
+                self.weight_version += 1
+                for tree in self.trees.values():
+                    report['nodes_touched'] += self._repair(tree, node, changed)
+                    report['nodes_saved'] += self.graph.num_nodes
+                    report['trees_repaired'] += 1
+                report['nodes_saved'] -= report['nodes_touched']
+        except Exception:
+            self._restore_entry(self.traffic_data, name, previous[0])
+            self._restore_entry(self.air_quality_index, name, previous[1])
+            for e, weight, _ in changed:
+                self._weight_list[e] = weight
+                self.weights[e] = weight
+            # Trees may be half repaired; drop them so they are rebuilt from the restored weights
+            self.trees.clear()
+            raise
+
+        self.stats['updates'] += 1
+        for key, value in report.items():
+            self.stats[key] += value
+        return report
+
+    @staticmethod
+    def _merge_entry(name, current, update, fields, kind):
+        """current updated with the fields of update; raises ValueError if a feature field is missing."""
+        if update is None:
+            return current
+        merged = dict(current or {}, **update)
+        missing = [field for field in fields if field not in merged]
+        if missing:
+            raise ValueError(f"Incomplete {kind} data for {name}: missing {', '.join(missing)}")
+        return merged
+
+    @staticmethod
+    def _restore_entry(entries, name, entry):
+        if entry is None:
+            entries.pop(name, None)
+        else:
+            entries[name] = entry
+
+    def _repair(self, tree, start, changed):
+        """Repair one tree after the edges start -> v in changed got new weights.
+
+        Returns the number of nodes whose distance had to be re-evaluated.
+        """
+        indptr, indices = self.graph.adjacency_lists()
+        reverse_indptr, reverse_indices = self._reverse_adjacency
+        reverse_order = self._reverse_order
+        weights = self._weight_list
+        dist, prev = tree.dist, tree.prev
+        touched = 0
+
+        # Increases on tree edges: everything below them loses its distance and is rebuilt
+        affected = set()
+        for e, old_weight, new_weight in changed:
+            v = indices[e]
+            if new_weight > old_weight and prev[v] == start and v not in affected:
+                affected.update(tree.subtree(v))
+        if affected:
+            for node in affected:
+                tree.set_parent(node, -1)
+                dist[node] = INF
+            # Seed every affected node with its best entry from the unaffected part of the tree
+            priority_queue = []
+            for node in affected:
+                for r in range(reverse_indptr[node], reverse_indptr[node + 1]):
+                    parent = reverse_indices[r]
+                    if parent in affected:
+                        continue
+                    candidate = dist[parent] + weights[reverse_order[r]]
+                    if candidate < dist[node]:
+                        dist[node] = candidate
+                        prev[node] = parent
+                heappush(priority_queue, (dist[node], node))
+            for node in affected:
+                if prev[node] != -1:
+                    tree.children[prev[node]].append(node)
+            # Dijkstra restricted to the affected nodes
+            settled = set()
+            while priority_queue:
+                current_weight, u = heappop(priority_queue)
+                if u in settled or current_weight > dist[u]:
+                    continue
+                settled.add(u)
+                for e in range(indptr[u], indptr[u + 1]):
+                    v = indices[e]
+                    if v in affected and current_weight + weights[e] < dist[v]:
+                        dist[v] = current_weight + weights[e]
+                        tree.set_parent(v, u)
+                        heappush(priority_queue, (dist[v], v))
+            touched += len(affected)
+
+        # Decreases: propagate the improvement from every edge that now offers a shorter path
+        priority_queue = []
+        for e, old_weight, new_weight in changed:
+            v = indices[e]
+            if new_weight < old_weight and dist[start] + new_weight < dist[v]:
+                dist[v] = dist[start] + new_weight
+                tree.set_parent(v, start)
+                heappush(priority_queue, (dist[v], v))
+        while priority_queue:
+            current_weight, u = heappop(priority_queue)
+            if current_weight > dist[u]:
+                continue
+            touched += 1
+            for e in range(indptr[u], indptr[u + 1]):
+                v = indices[e]
+                if current_weight + weights[e] < dist[v]:
+                    dist[v] = current_weight + weights[e]
+                    tree.set_parent(v, u)
+                    heappush(priority_queue, (dist[v], v))
+
+        return touched
@@ -0,0 +1,68 @@
+import hashlib
+import json
+import os
+import pickle
+import sklearn
+
+# Default location of the persisted routing model
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model_store')
+MODEL_FILE = os.path.join(MODEL_DIR, 'route_model.pkl')
+
+# Function to hash the training inputs: data file contents, feature schema and model settings
+def compute_training_hash(data_paths, feature_columns, model_params):
+    digest = hashlib.sha256()
+    for path in data_paths:
+        digest.update(os.path.basename(path).encode('utf-8'))
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                digest.update(chunk)
+    schema = {
+        'feature_columns': list(feature_columns),
+        'model_params': model_params,
+        'sklearn_version': sklearn.__version__
+    }
+    digest.update(json.dumps(schema, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+# Function to save a fitted model together with the hash of what it was trained on
+def save_model(model, training_hash, feature_columns, path=MODEL_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    artifact = {
+        'training_hash': training_hash,
+        'feature_columns': list(feature_columns),
+        'model': model
+    }
+    # Write to a temporary file first so an interrupted save never leaves a broken artifact
+    temporary_path = path + '.tmp'
+    with open(temporary_path, 'wb') as file:
+        pickle.dump(artifact, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary_path, path)
+
+# Function to load the saved model, or None when it is missing or was trained on other inputs
+def load_model(training_hash, path=MODEL_FILE):
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as file:
+            artifact = pickle.load(file)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+        print(f"Could not read the saved model at {path}: {e}")
+        return None
+    if artifact.get('training_hash') != training_hash:
+        return None
+    return artifact['model']
+
+# Function to reuse the saved model when the training inputs are unchanged, retraining otherwise
+def load_or_train(train, data_paths, feature_columns, model_params, path=MODEL_FILE):
+    """Return the model; train() is only called when the data or feature schema changed."""
+    training_hash = compute_training_hash(data_paths, feature_columns, model_params)
+    model = load_model(training_hash, path)
+    if model is not None:
+        print(f"Loaded saved model {training_hash[:12]} from {path}")
+        return model
+
+    print("Training data changed or no saved model found. Training a new model.")
+    model = train()
+    save_model(model, training_hash, feature_columns, path)
+    print(f"Saved model {training_hash[:12]} to {path}")
+    return model
@@ -0,0 +1,194 @@
+import numpy as np
+from heapq import heappop, heappush
+
+INF = float('inf')
+
+class RoadGraph:
+    """Road network with intersection names interned to integers and CSR adjacency arrays.
+
+    The outgoing edges of node u are indices[indptr[u]:indptr[u + 1]], and every per-edge
+    array (distances, route weights) is aligned with that edge order.
+    """
+
+    def __init__(self, node_names, indptr, indices, distances, coordinates=None):
+        self.node_names = list(node_names)
+        self.node_index = {name: i for i, name in enumerate(self.node_names)}
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.distances = np.asarray(distances, dtype=np.float64)
+        # Optional (num_nodes, 2) array of planar positions, used by the A* distance heuristic
+        self.coordinates = None if coordinates is None else np.asarray(coordinates, dtype=np.float64)
+        self._adjacency = None
+        self._reverse = None
+
+    @classmethod
+    def from_edges(cls, node_names, sources, targets, distances, coordinates=None):
+        """Build the CSR arrays from parallel arrays of integer edge endpoints."""
+        node_names = list(node_names)
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int32)
+        distances = np.asarray(distances, dtype=np.float64)
+
+        # Group the edges by source node, keeping their original order inside a group
+        order = np.argsort(sources, kind='stable')
+        indptr = np.zeros(len(node_names) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=len(node_names)), out=indptr[1:])
+        return cls(node_names, indptr, targets[order], distances[order], coordinates)
+
+    @classmethod
+    def from_dict(cls, graph, coordinates=None):
+        """Load a dict-of-dicts graph like road_graph ({start: {end: distance}}).
+
+        coordinates optionally maps intersection names to (x, y) positions.
+        """
+        node_index = {name: i for i, name in enumerate(graph)}
+        sources = []
+        targets = []
+        distances = []
+        for start, neighbors in graph.items():
+            source = node_index[start]
+            for end, distance in neighbors.items():
+                if end not in node_index:
+                    node_index[end] = len(node_index)
+                sources.append(source)
+                targets.append(node_index[end])
+                distances.append(distance)
+        if coordinates is not None:
+            coordinates = [coordinates[name] for name in node_index]
+        return cls.from_edges(node_index, sources, targets, distances, coordinates)
+
+    @property
+    def num_nodes(self):
+        return len(self.node_names)
+
+    @property
+    def num_edges(self):
+        return len(self.indices)
+
+    @property
+    def nbytes(self):
+        # The NumPy arrays only; the adjacency_lists() cache comes on top once a search ran
+        return self.indptr.nbytes + self.indices.nbytes + self.distances.nbytes
+
+    def out_degrees(self):
+        return np.diff(self.indptr)
+
+    def edge_sources(self):
+        """Source node of every edge, aligned with indices."""
+        return np.repeat(np.arange(self.num_nodes, dtype=np.int32), self.out_degrees())
+
+    def edge_index(self, start, end):
+        """Position of the edge start -> end in the edge arrays, or -1."""
+        begin, stop = self.indptr[start], self.indptr[start + 1]
+        positions = np.flatnonzero(self.indices[begin:stop] == end)
+        return int(begin + positions[0]) if positions.size else -1
+
+    def neighbors(self, node):
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+
+    def adjacency_lists(self):
+        """Plain list copies of indptr/indices, cached for the heap-based searches.
+
+        The lists take about twice the memory of the arrays (a pointer plus an int object per
+        entry) and stay resident with the graph; Python-level loops index them much faster.
+        """
+        if self._adjacency is None:
+            self._adjacency = (self.indptr.tolist(), self.indices.tolist())
+        return self._adjacency
+
+    def reverse(self):
+        """Graph with every edge flipped, plus the position of each flipped edge in this graph.
+
+        Per-edge arrays of this graph are aligned with the reverse graph by indexing them
+        with the returned order (e.g. weights[order]).
+        """
+        if self._reverse is None:
+            order = np.argsort(self.indices, kind='stable')
+            indptr = np.zeros(self.num_nodes + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.indices, minlength=self.num_nodes), out=indptr[1:])
+            reverse_graph = RoadGraph(self.node_names, indptr, self.edge_sources()[order],
+                                      self.distances[order], self.coordinates)
+            self._reverse = (reverse_graph, order)
+        return self._reverse
+
+    def __getstate__(self):
+        # The list caches are rebuilt on demand, no need to pickle them (e.g. for worker processes)
+        state = self.__dict__.copy()
+        state['_adjacency'] = None
+        state['_reverse'] = None
+        return state
+
+    def weights_from_map(self, route_weights, default=INF):
+        """Align a {(start, end): weight} map with the edge arrays."""
+        weights = np.full(self.num_edges, default, dtype=np.float64)
+        node_index = self.node_index
+        indptr, indices = self.adjacency_lists()
+        for (start, end), weight in route_weights.items():
+            u = node_index.get(start)
+            v = node_index.get(end)
+            if u is None or v is None:
+                continue
+            for e in range(indptr[u], indptr[u + 1]):
+                if indices[e] == v:
+                    weights[e] = weight
+                    break
+        return weights
+
+    def to_dict(self, weights=None):
+        """Convert back to the dict-of-dicts format (with distances unless weights are given)."""
+        values = (self.distances if weights is None else np.asarray(weights)).tolist()
+        indptr, indices = self.adjacency_lists()
+        return {
+            name: {self.node_names[indices[e]]: values[e] for e in range(indptr[u], indptr[u + 1])}
+            for u, name in enumerate(self.node_names)
+        }
+
+# Dijkstra's algorithm over the CSR arrays; stops early once target (or all of targets) is settled
+def dijkstra(graph, weights, source, target=None, targets=None):
+    """Return (dist, prev, settled) lists indexed by node id.
+
+    Each query converts weights to a list (one float object per edge) next to the dist and
+    prev lists, so it allocates about num_edges * 32 + num_nodes * 16 bytes on top of the graph.
+    """
+    remaining = set(targets) if targets is not None else None
+    indptr, indices = graph.adjacency_lists()
+    weight_list = weights.tolist() if isinstance(weights, np.ndarray) else weights
+    dist = [INF] * graph.num_nodes
+    prev = [-1] * graph.num_nodes
+    dist[source] = 0.0
+    priority_queue = [(0.0, source)]
+    settled = 0
+
+    while priority_queue:
+        current_weight, u = heappop(priority_queue)
+        if current_weight > dist[u]:
+            continue  # Stale queue entry
+        settled += 1
+        if u == target:
+            break
+        if remaining is not None:
+            remaining.discard(u)
+            if not remaining:
+                break
+
+        for e in range(indptr[u], indptr[u + 1]):
+            new_weight = current_weight + weight_list[e]
+            v = indices[e]
+            if new_weight < dist[v]:
+                dist[v] = new_weight
+                prev[v] = u
+                heappush(priority_queue, (new_weight, v))
+
+    return dist, prev, settled
+
+# Function to walk the predecessor list back from target (empty if target was not reached)
+def reconstruct_path(prev, source, target):
+    if source == target:
+        return [source]
+    if prev[target] == -1:
+        return []
+    path = [target]
+    while path[-1] != source:
+        path.append(prev[path[-1]])
+    path.reverse()
+    return path
@@ -0,0 +1,393 @@
+import hashlib
+import random
+import numpy as np
+from collections import OrderedDict
+from heapq import heappop, heappush
+from road_graph import INF, dijkstra, reconstruct_path
+
+# Contraction hierarchies built by the 'ch' engine, by digest of the graph structure and weights
+_hierarchies = OrderedDict()
+# Hierarchies kept (the least recently used is dropped first)
+MAX_HIERARCHIES = 4
+
+# Every engine returns (path, cost, settled): the node ids of the route (empty if target
+# is unreachable), its total weight and the number of nodes settled by the search.
+
+# Plain Dijkstra with early exit at the target
+def dijkstra_route(graph, weights, source, target):
+    dist, prev, settled = dijkstra(graph, weights, source, target)
+    return reconstruct_path(prev, source, target), dist[target], settled
+
+# Bidirectional Dijkstra: grow one search from the source and one backwards from the target
+def bidirectional_dijkstra(graph, weights, source, target):
+    if source == target:
+        return [source], 0.0, 1
+
+    reverse_graph, order = graph.reverse()
+    weights = np.asarray(weights, dtype=np.float64)
+    sides = [
+        (graph.adjacency_lists(), weights.tolist()),
+        (reverse_graph.adjacency_lists(), weights[order].tolist())
+    ]
+    dist = [{source: 0.0}, {target: 0.0}]
+    prev = [{source: -1}, {target: -1}]
+    queues = [[(0.0, source)], [(0.0, target)]]
+    done = [set(), set()]
+    best = INF
+    meeting = -1
+    settled = 0
+
+    while queues[0] and queues[1]:
+        # Stop once no path through an unsettled node can beat the best one found
+        if queues[0][0][0] + queues[1][0][0] >= best:
+            break
+        # Expand the side with the smaller frontier
+        side = 0 if len(queues[0]) <= len(queues[1]) else 1
+        current_weight, u = heappop(queues[side])
+        if u in done[side]:
+            continue
+        done[side].add(u)
+        settled += 1
+
+        (indptr, indices), weight_list = sides[side]
+        side_dist, side_prev, other_dist = dist[side], prev[side], dist[1 - side]
+        for e in range(indptr[u], indptr[u + 1]):
+            v = indices[e]
+            new_weight = current_weight + weight_list[e]
+            if new_weight < side_dist.get(v, INF):
+                side_dist[v] = new_weight
+                side_prev[v] = u
+                heappush(queues[side], (new_weight, v))
+            if v in other_dist and new_weight + other_dist[v] < best:
+                best = new_weight + other_dist[v]
+                meeting = v
+
+    if meeting == -1:
+        return [], INF, settled
+
+    # Join the forward half (source -> meeting) with the backward half (meeting -> target)
+    path = []
+    node = meeting
+    while node != -1:
+        path.append(node)
+        node = prev[0][node]
+    path.reverse()
+    node = prev[1][meeting]
+    while node != -1:
+        path.append(node)
+        node = prev[1][node]
+    return path, best, settled
+
+# Function to build the admissible straight-line heuristic towards target
+def distance_heuristic(graph, weights, target):
+    """h(v) = straight-line distance to target times the smallest weight per unit of length.
+
+    The smallest ratio over all edges keeps h a lower bound of the remaining route weight.
+    """
+    if graph.coordinates is None:
+        raise ValueError("The distance heuristic needs a RoadGraph with coordinates.")
+    weights = np.asarray(weights, dtype=np.float64)
+    sources = graph.edge_sources()
+    lengths = np.hypot(*(graph.coordinates[graph.indices] - graph.coordinates[sources]).T)
+    usable = (lengths > 0) & np.isfinite(weights)
+    ratio = float(np.min(weights[usable] / lengths[usable])) if usable.any() else 0.0
+    ratio = max(ratio, 0.0)
+    return ratio * np.hypot(*(graph.coordinates - graph.coordinates[target]).T)
+
+class Landmarks:
+    """Landmark (ALT) lower bounds, for A* on graphs without coordinates.
+
+    Uses the triangle inequality on precomputed distances from and to a few far-apart nodes.
+    """
+
+    def __init__(self, graph, weights, count=8, seed=0):
+        reverse_graph, order = graph.reverse()
+        weights = np.asarray(weights, dtype=np.float64)
+        reverse_weights = weights[order]
+        self.nodes = []
+        from_rows = []
+        to_rows = []
+        # Farthest-point selection: every new landmark is the node farthest from the previous ones
+        node = random.Random(seed).randrange(graph.num_nodes)
+        closest = np.full(graph.num_nodes, INF)
+        for _ in range(min(count, graph.num_nodes)):
+            self.nodes.append(node)
+            from_rows.append(np.array(dijkstra(graph, weights, node)[0]))
+            to_rows.append(np.array(dijkstra(reverse_graph, reverse_weights, node)[0]))
+            closest = np.minimum(closest, np.where(np.isfinite(from_rows[-1]), from_rows[-1], INF))
+            closest[self.nodes] = -1
+            candidates = np.isfinite(closest) & (closest >= 0)
+            if not candidates.any():
+                break
+            node = int(np.argmax(np.where(candidates, closest, -1)))
+        self.from_landmark = np.vstack(from_rows)
+        self.to_landmark = np.vstack(to_rows)
+
+    def heuristic(self, target):
+        """Lower bounds of the distance from every node to target."""
+        with np.errstate(invalid='ignore'):
+            forward = self.from_landmark[:, [target]]
+            backward = self.to_landmark[:, [target]]
+            # d(L, t) <= d(L, v) + d(v, t)  and  d(v, L) <= d(v, t) + d(t, L)
+            bounds = np.concatenate([forward - self.from_landmark, self.to_landmark - backward])
+        bounds[~np.isfinite(bounds)] = 0.0
+        return np.maximum(bounds.max(axis=0), 0.0)
+
+# A* search guided by a per-node lower bound of the remaining weight
+def astar(graph, weights, source, target, heuristic=None):
+    """heuristic is an array of lower bounds to target; by default the distance heuristic."""
+    if heuristic is None:
+        heuristic = distance_heuristic(graph, weights, target)
+    estimate = heuristic.tolist() if isinstance(heuristic, np.ndarray) else heuristic
+    indptr, indices = graph.adjacency_lists()
+    weight_list = weights.tolist() if isinstance(weights, np.ndarray) else weights
+    dist = {source: 0.0}
+    prev = {source: -1}
+    closed = set()
+    priority_queue = [(estimate[source], source)]
+    settled = 0
+
+    while priority_queue:
+        _, u = heappop(priority_queue)
+        if u in closed:
+            continue
+        closed.add(u)
+        settled += 1
+        if u == target:
+            break
+
+        current_weight = dist[u]
+        for e in range(indptr[u], indptr[u + 1]):
+            v = indices[e]
+            new_weight = current_weight + weight_list[e]
+            if new_weight < dist.get(v, INF):
+                dist[v] = new_weight
+                prev[v] = u
+                heappush(priority_queue, (new_weight + estimate[v], v))
+
+    if target not in closed:
+        return [], INF, settled
+    path = [target]
+    while path[-1] != source:
+        path.append(prev[path[-1]])
+    path.reverse()
+    return path, dist[target], settled
+
+class ContractionHierarchy:
+    """Contraction hierarchy preprocessed for one fixed set of edge weights.
+
+    Meant for the near-static distance graph: build it once, then every query only
+    searches upwards in the hierarchy from both ends.
+    """
+
+    def __init__(self, graph, weights=None, witness_limit=500):
+        weights = graph.distances if weights is None else np.asarray(weights, dtype=np.float64)
+        self.num_nodes = graph.num_nodes
+        self.witness_limit = witness_limit
+        self.shortcuts = 0
+
+        # Remaining graph while contracting: out_edges[u][v] = weight (cheapest parallel edge)
+        self._out = [dict() for _ in range(graph.num_nodes)]
+        self._in = [dict() for _ in range(graph.num_nodes)]
+        # Middle node of every hierarchy edge, -1 for original edges
+        self.middle = {}
+        indptr, indices = graph.adjacency_lists()
+        weight_list = weights.tolist()
+        for u in range(graph.num_nodes):
+            for e in range(indptr[u], indptr[u + 1]):
+                v, weight = indices[e], weight_list[e]
+                if u != v and weight < INF and weight < self._out[u].get(v, INF):
+                    self._out[u][v] = weight
+                    self._in[v][u] = weight
+                    self.middle[(u, v)] = -1
+
+        self.rank = [0] * graph.num_nodes
+        # up_out[v]: edges v -> x with rank x > v, up_in[v]: edges u -> v with rank u > v
+        self.up_out = [[] for _ in range(graph.num_nodes)]
+        self.up_in = [[] for _ in range(graph.num_nodes)]
+        self._contract_all()
+        del self._out, self._in
+
+    def _shortcuts_needed(self, v):
+        """List of (u, x, weight) shortcuts that contracting v would require."""
+        needed = []
+        out_edges = self._out[v]
+        for u, weight_in in self._in[v].items():
+            targets = {x: weight_in + weight_out for x, weight_out in out_edges.items() if x != u}
+            if not targets:
+                continue
+            witness = self._witness_search(u, v, max(targets.values()), targets)
+            for x, via_weight in targets.items():
+                if witness.get(x, INF) > via_weight:
+                    needed.append((u, x, via_weight))
+        return needed
+
+    def _witness_search(self, source, skipped, limit, targets):
+        """Bounded Dijkstra from source in the remaining graph, avoiding the node being contracted."""
+        dist = {source: 0.0}
+        priority_queue = [(0.0, source)]
+        remaining = len(targets)
+        settled = 0
+        while priority_queue and settled < self.witness_limit:
+            current_weight, u = heappop(priority_queue)
+            if current_weight > dist[u]:
+                continue
+            if current_weight > limit:
+                break
+            settled += 1
+            if u in targets:
+                remaining -= 1
+                if remaining == 0:
+                    break
+            for v, weight in self._out[u].items():
+                if v == skipped:
+                    continue
+                new_weight = current_weight + weight
+                if new_weight < dist.get(v, INF):
+                    dist[v] = new_weight
+                    heappush(priority_queue, (new_weight, v))
+        return dist
+
+    def _priority(self, v, contracted_neighbors, depth):
+        """(priority, shortcuts) of contracting v now.
+
+        Edge difference, plus the already contracted neighbours and the depth of v in the
+        hierarchy so far, which spread the contraction evenly over the graph and keep the
+        number of shortcuts close to the number of edges.
+        """
+        shortcuts = self._shortcuts_needed(v)
+        removed = len(self._in[v]) + len(self._out[v])
+        return 2 * (len(shortcuts) - removed) + contracted_neighbors[v] + depth[v], shortcuts
+
+    def _contract_all(self):
+        contracted_neighbors = [0] * self.num_nodes
+        depth = [0] * self.num_nodes
+        queue = [(self._priority(v, contracted_neighbors, depth)[0], v) for v in range(self.num_nodes)]
+        queue.sort()
+        next_rank = 0
+        while queue:
+            _, v = heappop(queue)
+            # Lazy update: re-evaluate and put back if v is no longer the cheapest node
+            priority, shortcuts = self._priority(v, contracted_neighbors, depth)
+            if queue and priority > queue[0][0]:
+                heappush(queue, (priority, v))
+                continue
+
+            self.rank[v] = next_rank
+            next_rank += 1
+            for neighbor in list(self._out[v]) + list(self._in[v]):
+                depth[neighbor] = max(depth[neighbor], depth[v] + 1)
+            for u, x, weight in shortcuts:
+                if weight < self._out[u].get(x, INF):
+                    self._out[u][x] = weight
+                    self._in[x][u] = weight
+                    self.middle[(u, x)] = v
+                    self.shortcuts += 1
+
+            # The remaining neighbours all get a higher rank, so v's edges become upward edges
+            for x, weight in self._out[v].items():
+                self.up_out[v].append((x, weight))
+                del self._in[x][v]
+                contracted_neighbors[x] += 1
+            for u, weight in self._in[v].items():
+                self.up_in[v].append((u, weight))
+                del self._out[u][v]
+                contracted_neighbors[u] += 1
+            self._out[v] = {}
+            self._in[v] = {}
+
+    def _unpack(self, u, x, path):
+        v = self.middle[(u, x)]
+        if v == -1:
+            path.append(x)
+        else:
+            self._unpack(u, v, path)
+            self._unpack(v, x, path)
+
+    def query(self, source, target):
+        """Return (path, cost, settled) like the other engines."""
+        if source == target:
+            return [source], 0.0, 1
+
+        dist = [{source: 0.0}, {target: 0.0}]
+        prev = [{source: -1}, {target: -1}]
+        queues = [[(0.0, source)], [(0.0, target)]]
+        edges = [self.up_out, self.up_in]
+        best = INF
+        meeting = -1
+        settled = 0
+
+        # Both upward searches run until their frontier can no longer improve the best meeting
+        while queues[0] or queues[1]:
+            for side in (0, 1):
+                if not queues[side]:
+                    continue
+                current_weight, u = heappop(queues[side])
+                if current_weight > dist[side][u]:
+                    continue
+                if current_weight >= best:
+                    queues[side] = []
+                    continue
+                settled += 1
+                other = dist[1 - side].get(u)
+                if other is not None and current_weight + other < best:
+                    best = current_weight + other
+                    meeting = u
+                for v, weight in edges[side][u]:
+                    new_weight = current_weight + weight
+                    if new_weight < dist[side].get(v, INF):
+                        dist[side][v] = new_weight
+                        prev[side][v] = u
+                        heappush(queues[side], (new_weight, v))
+
+        if meeting == -1:
+            return [], INF, settled
+
+        # Hierarchy path: source -> ... -> meeting -> ... -> target, then unpack the shortcuts
+        forward = []
+        node = meeting
+        while node != -1:
+            forward.append(node)
+            node = prev[0][node]
+        forward.reverse()
+        node = meeting
+        while prev[1][node] != -1:
+            forward.append(prev[1][node])
+            node = prev[1][node]
+
+        path = [forward[0]]
+        for u, x in zip(forward, forward[1:]):
+            self._unpack(u, x, path)
+        return path, best, settled
+
+# Function to get the contraction hierarchy of graph with these weights, preprocessing it only once
+def cached_hierarchy(graph, weights):
+    weights = graph.distances if weights is None else np.ascontiguousarray(weights, dtype=np.float64)
+    # Keyed by content rather than by object, so graphs rebuilt from the same dict share the hierarchy
+    digest = hashlib.blake2b(digest_size=16)
+    for array in (graph.indptr, graph.indices, weights):
+        digest.update(array.tobytes())
+    key = digest.digest()
+    hierarchy = _hierarchies.get(key)
+    if hierarchy is None:
+        print("Preprocessing a contraction hierarchy for these weights; later queries reuse it.")
+        hierarchy = _hierarchies[key] = ContractionHierarchy(graph, weights)
+        if len(_hierarchies) > MAX_HIERARCHIES:
+            _hierarchies.popitem(last=False)
+    else:
+        _hierarchies.move_to_end(key)
+    return hierarchy
+
+# Function to answer a query with a contraction hierarchy (the given one, or the cached one for these weights)
+def contraction_hierarchy_route(graph, weights, source, target, hierarchy=None):
+    if hierarchy is None:
+        hierarchy = cached_hierarchy(graph, weights)
+    return hierarchy.query(source, target)
+
+# Query engines selectable by name in find_optimal_route
+ENGINES = {
+    'dijkstra': dijkstra_route,
+    'bidirectional': bidirectional_dijkstra,
+    'astar': astar,
+    'ch': contraction_hierarchy_route
+}
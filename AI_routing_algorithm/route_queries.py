@@ -0,0 +1,157 @@
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from road_graph import dijkstra, reconstruct_path
+
+class RouteCache:
+    """LRU cache of route results with a time-to-live, keyed by (source, target, weight_version).
+
+    Entries from an older weight version can never be returned, since the version is part
+    of the key; they are not cleared when the weights change but age out through the LRU
+    order and the TTL, so the entries of the current version are kept.
+    """
+
+    def __init__(self, max_entries=10000, ttl=60.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, source, target, version):
+        key = (source, target, version)
+        entry = self._entries.get(key)
+        if entry is None or self.clock() - entry[0] > self.ttl:
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, source, target, version, value):
+        self._entries[(source, target, version)] = (self.clock(), value)
+        self._entries.move_to_end((source, target, version))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+# Function to answer all queries from one source with a single shortest-path tree
+def shortest_routes_from(graph, weights, source, targets):
+    """Return {target: (path, cost)}; the search stops once every target is settled."""
+    dist, prev, _ = dijkstra(graph, weights, source, targets=targets)
+    return {target: (reconstruct_path(prev, source, target), dist[target]) for target in targets}
+
+# Worker process state for many-to-many queries: the graph is sent once per worker, the
+# weights with every chunk of work and converted to a list once per weight version
+_worker_graph = None
+_worker_version = None
+_worker_weights = None
+
+def _init_worker(graph):
+    global _worker_graph
+    _worker_graph = graph
+
+def _worker_routes(chunk):
+    global _worker_version, _worker_weights
+    version, weights, tasks = chunk
+    if version != _worker_version:
+        _worker_version, _worker_weights = version, weights.tolist()
+    return [(source, shortest_routes_from(_worker_graph, _worker_weights, source, targets)) for source, targets in tasks]
+
+class BatchRouter:
+    """One-to-many and many-to-many route queries behind a RouteCache.
+
+    weight_source is anything with an edge-aligned .weights array and a .weight_version,
+    such as an IncrementalRouter; routes are cached per weight version. When the weight
+    source keeps shortest-path trees (a .tree(source) method), cache misses are read from
+    those trees, which telemetry updates repair in place; otherwise each source is searched
+    with Dijkstra, fanned out over a process pool kept for the router's lifetime when
+    workers is set. Call close() to stop the pool.
+    """
+
+    def __init__(self, road_network, weight_source, cache=None, workers=None):
+        self.graph = road_network
+        self.weight_source = weight_source
+        self.cache = cache if cache is not None else RouteCache()
+        # Number of processes used to fan many-to-many work across sources (None = in process)
+        self.workers = workers
+        self._pool = None
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _to_route(self, start, path, cost):
+        route = [self.graph.node_names[node] for node in path] if path else [start]
+        return route, cost
+
+    def _lookup(self, start, ends, version):
+        """Split the queries of one source into cached results and the targets still to compute."""
+        results = {}
+        missing = []
+        for end in ends:
+            cached = self.cache.get(start, end, version)
+            if cached is None:
+                missing.append(self.graph.node_index[end])
+            else:
+                results[end] = cached
+        return results, missing
+
+    def _store(self, start, routes, version, results):
+        for target, (path, cost) in routes.items():
+            end = self.graph.node_names[target]
+            results[end] = self._to_route(start, path, cost)
+            self.cache.put(start, end, version, results[end])
+
+    def _routes_from(self, source, targets, weights):
+        if hasattr(self.weight_source, 'tree'):
+            tree = self.weight_source.tree(source)
+            return {target: (reconstruct_path(tree.prev, source, target), tree.dist[target]) for target in targets}
+        return shortest_routes_from(self.graph, weights, source, targets)
+
+    def one_to_many(self, start, ends):
+        """Return {end: (route, total_weight)} from one shortest-path tree rooted at start."""
+        version = self.weight_source.weight_version
+        results, missing = self._lookup(start, ends, version)
+        if missing:
+            source = self.graph.node_index[start]
+            routes = self._routes_from(source, missing, self.weight_source.weights)
+            self._store(start, routes, version, results)
+        return results
+
+    def many_to_many(self, starts, ends):
+        """Return {(start, end): (route, total_weight)} for every pair."""
+        version = self.weight_source.weight_version
+        per_source = {}
+        tasks = []
+        for start in starts:
+            if start in per_source:
+                continue
+            results, missing = self._lookup(start, ends, version)
+            per_source[start] = results
+            if missing:
+                tasks.append((self.graph.node_index[start], missing))
+
+        if self.workers and len(tasks) > 1 and not hasattr(self.weight_source, 'tree'):
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                                 initargs=(self.graph,))
+            # One chunk per worker, so the weights are sent at most once per worker and call
+            chunk_count = min(self.workers, len(tasks))
+            chunks = [(version, self.weight_source.weights, tasks[i::chunk_count]) for i in range(chunk_count)]
+            computed = [result for results in self._pool.map(_worker_routes, chunks) for result in results]
+        else:
+            weight_list = None if hasattr(self.weight_source, 'tree') else self.weight_source.weights.tolist()
+            computed = [(source, self._routes_from(source, targets, weight_list)) for source, targets in tasks]
+
+        for source, routes in computed:
+            start = self.graph.node_names[source]
+            self._store(start, routes, version, per_source[start])
+
+        return {(start, end): per_source[start][end] for start in starts for end in ends}
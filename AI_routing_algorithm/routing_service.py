@@ -0,0 +1,325 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import time
+from collections import deque
+from urllib.parse import parse_qs, urlsplit
+import ai_routing
+from incremental_routing import IncrementalRouter
+from road_graph import RoadGraph
+from route_queries import BatchRouter, RouteCache
+from window_stats import AIR_QUALITY_FIELDS, ALL, WindowAggregator, to_seconds
+
+# HTTP status lines used by the service
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+# Function to make a payload valid JSON: unreachable routes have an infinite weight, sent as null
+def json_safe(value):
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, dict):
+        return {key: json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_safe(item) for item in value]
+    return value
+
+class RoutingService:
+    """Routing state kept resident between requests: road graph, model, weights and route trees.
+
+    All requests are handled on the event loop thread, so telemetry updates and route
+    queries never interleave halfway; only reloading the input files runs in a worker thread.
+    Routes go through a BatchRouter over the router: answers are cached per weight version,
+    and misses are read from the router's shortest-path trees, which telemetry updates
+    repair in place. Telemetry received through /telemetry is kept and applied again on top of the
+    file data after every reload.
+    """
+
+    def __init__(self, graph=None, data_files=None, max_trees=64, smoothing_window=None):
+        self.graph = graph if graph is not None else ai_routing.road_graph
+        self.data_files = data_files or [ai_routing.INTERSECTION_DATA_FILE, ai_routing.SENSOR_DATA_FILE]
+        self.max_trees = max_trees
+        # With a smoothing window, edges are predicted from the window means of the air quality readings
+        self.smoothing_window = smoothing_window
+        # Telemetry posted since start: intersection -> {'traffic': {...}, 'air_quality': {...}}
+        self.overrides = {}
+        # Posted readings still inside the longest statistics window: (intersection, seconds, values)
+        self.live_readings = deque()
+        self.requests = 0
+        # Shared by the batch routers of successive reloads; the weight version in its keys keeps them apart
+        self.route_cache = RouteCache()
+        self.batch_router = None
+        self.router = None
+        self.window_stats = None
+        self._mtimes = None
+        self.install(self.build_state())
+
+    def build_state(self):
+        """Load the JSON inputs and the saved model, and compute every edge weight once."""
+        air_quality_data = ai_routing.load_air_quality_data()
+        traffic_data = ai_routing.load_traffic_data()
+        model = ai_routing.load_model(traffic_data, air_quality_data)
+        road_network = RoadGraph.from_dict(self.graph)
+        router = IncrementalRouter(road_network, traffic_data, air_quality_data, model, max_trees=self.max_trees)
+        window_stats = WindowAggregator()
+        window_stats.consume(air_quality_data)
+        return router, window_stats, self._current_mtimes()
+
+    def install(self, state):
+        router, window_stats, mtimes = state
+        # Keep the weight versions increasing across reloads so clients can tell the states apart
+        if self.router is not None:
+            router.weight_version = self.router.weight_version + 1
+        # Apply the posted telemetry again on top of the reloaded files
+        for name, entries in self.overrides.items():
+            try:
+                router.update_intersection(name, entries.get('traffic'), entries.get('air_quality'))
+            except (KeyError, ValueError) as e:
+                print(f"Could not apply the telemetry of {name} after reloading: {e}")
+        for name, timestamp, values in self.live_readings:
+            try:
+                window_stats.add(name, timestamp, values)
+            except ValueError as e:
+                print(f"Could not add a reading of {name} after reloading: {e}")
+        self.router = router
+        self.batch_router = BatchRouter(router.graph, router, cache=self.route_cache)
+        self.window_stats = window_stats
+        self._mtimes = mtimes
+
+    def _current_mtimes(self):
+        return [os.path.getmtime(path) if os.path.exists(path) else None for path in self.data_files]
+
+    def files_changed(self):
+        return self._current_mtimes() != self._mtimes
+
+    async def reload(self):
+        loop = asyncio.get_running_loop()
+        self.install(await loop.run_in_executor(None, self.build_state))
+
+    def route(self, start, end):
+        route, total_weight = self.batch_router.one_to_many(start, [end])[end]
+        return {"optimal_route": route, "total_weight": total_weight}
+
+    def routes(self, starts, ends):
+        """Every start-end pair; one cached (or repaired) shortest-path tree per start answers all of its ends."""
+        results = self.batch_router.many_to_many(starts, ends)
+        return [
+            {"start": start, "end": end, "optimal_route": results[(start, end)][0], "total_weight": results[(start, end)][1]}
+            for start in starts for end in ends
+        ]
+
+    def smoothed_air_quality(self, name, values, seconds):
+        """Window means of the air quality fields with this reading counted in, without adding it."""
+        stats = self.window_stats.stats(name, self.smoothing_window, now=seconds)
+        means = {}
+        for field in AIR_QUALITY_FIELDS:
+            field_stats = stats.get(field, {'count': 0, 'mean': None})
+            count, mean = field_stats['count'], field_stats['mean']
+            if values.get(field) is not None:
+                means[field] = (mean * count + float(values[field])) / (count + 1) if count else float(values[field])
+            elif count:
+                means[field] = mean
+        return means
+
+    def apply_telemetry(self, name, traffic_entry, air_data_entry, timestamp=None):
+        """Update the router with one intersection's telemetry, then its window statistics.
+
+        A reading the router rejects raises and leaves the statistics alone; a reading the
+        statistics reject (out of time order) keeps its routing update. Returns the router's
+        work report and the statistics' error message (None when they took the reading).
+        """
+        values = dict(traffic_entry or {}, **(air_data_entry or {}))
+        seconds = to_seconds(timestamp)
+        if air_data_entry is not None:
+            air_data_entry = dict(air_data_entry, timestamp=name)
+            if self.smoothing_window:
+                air_data_entry.update(self.smoothed_air_quality(name, air_data_entry, seconds))
+        report = self.router.update_intersection(name, traffic_entry, air_data_entry)
+
+        entries = self.overrides.setdefault(name, {})
+        if traffic_entry is not None:
+            entries['traffic'] = dict(entries.get('traffic', {}), **traffic_entry)
+        if air_data_entry is not None:
+            entries['air_quality'] = dict(entries.get('air_quality', {}), **air_data_entry)
+
+        try:
+            self.window_stats.add(name, seconds, values)
+        except ValueError as e:
+            return report, str(e)
+        self.live_readings.append((name, seconds, values))
+        longest = max(self.window_stats.windows)
+        while self.live_readings and self.live_readings[0][1] <= seconds - longest:
+            self.live_readings.popleft()
+        return report, None
+
+    async def handle_request(self, method, path, body):
+        """Return (status, payload) for one request."""
+        url = urlsplit(path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        payload = json.loads(body) if body else {}
+        if not isinstance(payload, dict):
+            return 400, {"error": f"The request body must be a JSON object, not {type(payload).__name__}"}
+        node_index = self.router.graph.node_index
+
+        if url.path == '/health':
+            return 200, {
+                "status": "ok",
+                "requests": self.requests,
+                "weight_version": self.router.weight_version,
+                "update_stats": self.router.stats,
+                "trees": len(self.router.trees),
+                "route_cache": {"entries": len(self.route_cache), "hits": self.route_cache.hits,
+                                "misses": self.route_cache.misses}
+            }
+
+        if url.path == '/route':
+            start = query.get('start', payload.get('start'))
+            end = query.get('end', payload.get('end'))
+            if start not in node_index or end not in node_index:
+                return 400, {"error": f"Unknown intersection in query: {start!r} -> {end!r}"}
+            return 200, self.route(start, end)
+
+        if url.path == '/routes':
+            if method != 'POST':
+                return 405, {"error": "Use POST with {\"starts\": [...], \"ends\": [...]}"}
+            starts, ends = payload.get('starts', []), payload.get('ends', [])
+            if not isinstance(starts, list) or not isinstance(ends, list):
+                return 400, {"error": "starts and ends must be JSON arrays"}
+            unknown = [name for name in starts + ends if name not in node_index]
+            if unknown:
+                return 400, {"error": f"Unknown intersections: {unknown}"}
+            return 200, {"routes": self.routes(starts, ends)}
+
+        if url.path == '/telemetry':
+            if method != 'POST':
+                return 405, {"error": "Use POST with {\"intersection\": ..., \"traffic\": {...}, \"air_quality\": {...}}"}
+            name = payload.get('intersection')
+            if name not in node_index:
+                return 400, {"error": f"Unknown intersection: {name!r}"}
+            for field in ('traffic', 'air_quality'):
+                if payload.get(field) is not None and not isinstance(payload[field], dict):
+                    return 400, {"error": f"{field} must be a JSON object"}
+            report, stats_error = self.apply_telemetry(name, payload.get('traffic'), payload.get('air_quality'),
+                                                       payload.get('timestamp'))
+            response = {"weight_version": self.router.weight_version, "update": report}
+            if stats_error:
+                response["window_stats_error"] = stats_error
+            return 200, response
+
+        if url.path == '/stats':
+            key = query.get('intersection', ALL)
+            if key != ALL and key not in node_index:
+                return 400, {"error": f"Unknown intersection: {key!r}"}
+            window = float(query['window']) if 'window' in query else None
+            if window is not None and window not in self.window_stats.windows:
+                return 400, {"error": f"Unknown window {window:g}, use one of {list(self.window_stats.windows)}"}
+            return 200, {
+                "intersection": key,
+                "window": window or max(self.window_stats.windows),
+                "readings": self.window_stats.readings,
+                "fields": self.window_stats.stats(key, window),
+                "air_quality_penalty": ai_routing.calculate_window_penalty(self.window_stats, key, window)
+            }
+
+        if url.path == '/reload':
+            if method != 'POST':
+                return 405, {"error": "Use POST to reload the input files"}
+            await self.reload()
+            return 200, {"weight_version": self.router.weight_version}
+
+        return 404, {"error": f"Unknown endpoint: {url.path}"}
+
+    async def handle_connection(self, reader, writer):
+        """Minimal HTTP/1.1 with JSON bodies and keep-alive."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                parts = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+
+                started = time.perf_counter()
+                self.requests += 1
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                length = headers.get('content-length', '0')
+                if len(parts) != 3 or not length.isdigit():
+                    # The rest of the stream cannot be trusted after a malformed request
+                    status, payload = 400, {"error": f"Malformed request: {request_line[:100]!r}"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(int(length))
+                    try:
+                        status, payload = await self.handle_request(parts[0], parts[1], body)
+                    except (ValueError, KeyError, TypeError) as e:
+                        status, payload = 400, {"error": str(e)}
+                    except Exception as e:
+                        status, payload = 500, {"error": str(e)}
+                payload["latency_ms"] = round((time.perf_counter() - started) * 1000, 3)
+
+                data = json.dumps(json_safe(payload), allow_nan=False).encode('utf-8')
+                writer.write(
+                    f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def watch_files(self, interval):
+        """Reload the model and weights whenever the input JSON files change on disk."""
+        while True:
+            await asyncio.sleep(interval)
+            if self.files_changed():
+                print("Input files changed, reloading routing state.")
+                await self.reload()
+
+# Start the service on a TCP port or a Unix socket and serve until cancelled
+async def serve(service, host='127.0.0.1', port=8765, unix_path=None, watch_interval=5.0):
+    if unix_path:
+        server = await asyncio.start_unix_server(service.handle_connection, path=unix_path)
+        print(f"Routing service listening on {unix_path}")
+    else:
+        server = await asyncio.start_server(service.handle_connection, host, port)
+        print(f"Routing service listening on http://{host}:{port}")
+
+    watcher = asyncio.create_task(service.watch_files(watch_interval)) if watch_interval else None
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if watcher:
+            watcher.cancel()
+
+def main():
+    parser = argparse.ArgumentParser(description="Resident routing service (HTTP/JSON).")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', dest='unix_path', help="Serve on this Unix socket instead of TCP")
+    parser.add_argument('--watch-interval', type=float, default=5.0,
+                        help="Seconds between input file checks (0 disables hot reload)")
+    parser.add_argument('--smoothing-window', type=float, choices=WindowAggregator().windows,
+                        help="Predict from the air quality means over this many seconds instead of the latest reading")
+    args = parser.parse_args()
+
+    service = RoutingService(smoothing_window=args.smoothing_window)
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.unix_path, args.watch_interval))
+    except KeyboardInterrupt:
+        print("Routing service stopped.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import random
+
+# Function to build a grid-shaped road network in the same dict-of-dicts format as road_graph
+def make_grid_network(rows, cols, seed=0):
+    rng = random.Random(seed)
+    graph = {}
+    for r in range(rows):
+        for c in range(cols):
+            graph[f"Intersection {r}-{c}"] = {}
+
+    for r in range(rows):
+        for c in range(cols):
+            name = f"Intersection {r}-{c}"
+            for dr, dc in ((0, 1), (1, 0)):
+                nr, nc = r + dr, c + dc
+                if nr < rows and nc < cols:
+                    neighbor = f"Intersection {nr}-{nc}"
+                    distance = rng.randint(3, 12)
+                    graph[name][neighbor] = distance
+                    graph[neighbor][name] = distance
+    return graph
+
+# Function to place the grid intersections on a plane, one spacing unit per block
+def make_grid_coordinates(rows, cols, spacing=3):
+    return {
+        f"Intersection {r}-{c}": (c * spacing, r * spacing)
+        for r in range(rows)
+        for c in range(cols)
+    }
+
+# Function to generate traffic and air quality readings keyed by intersection, like the routing inputs
+def make_intersection_readings(graph, seed=0):
+    rng = random.Random(seed)
+    traffic_data = {}
+    air_quality_data = []
+    for name in graph:
+        traffic_data[name] = {
+            'traffic_volume': rng.randint(10, 60),
+            'average_speed': rng.uniform(20, 60),
+            'vehicle_count': rng.randint(5, 40),
+            'light_status': rng.choice(['red', 'green']),
+            'rain': rng.randint(0, 800)
+        }
+        air_quality_data.append({
+            'timestamp': name,
+            'co': rng.uniform(1, 6),
+            'no2': rng.uniform(3, 9),
+            'pm25': rng.randint(5, 20),
+            'temperature': rng.uniform(15, 30),
+            'humidity': rng.uniform(40, 70)
+        })
+    return traffic_data, air_quality_data
@@ -0,0 +1,365 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import numpy as np
+from asof_join import parse_epochs
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Default location of the columnar history, one directory per dataset
+STORE_DIR = os.path.join(BASE_DIR, 'telemetry_history')
+SCHEMA_FILE = '_schema.json'
+TIME_FIELD = 'timestamp'
+
+# JSON histories converted by default: dataset name -> source file
+SOURCES = {
+    'intersection': os.path.join(BASE_DIR, 'intersection_data.json'),
+    'sensor': os.path.join(BASE_DIR, 'sensor_data.json'),
+    'air_quality': os.path.join(BASE_DIR, 'air_quality_PROC.json')
+}
+
+SENSOR_DIR = os.path.join(BASE_DIR, '../SimulatedDevices/Air_Quality_Sensor_Simulation')
+# Telemetry logs written by the simulators: dataset name -> log directory. Their segments are
+# deleted once every consumer has read them, so these datasets grow through the log's 'store'
+# consumer instead of being rebuilt from a file
+TELEMETRY_LOGS = {
+    'air_quality_sensor': os.path.join(SENSOR_DIR, 'air_quality_sensor_data.log')
+}
+# Log records written to the store per batch (and per consumer commit)
+LOG_BATCH_SIZE = 10000
+# Fields identifying a log reading, like the MongoDB upsert key: a batch read again after a
+# crash between the store write and the consumer commit is merged without duplicates
+LOG_KEY_FIELDS = ('sensorType',)
+
+SECONDS_PER_DAY = 86400
+
+# Function to flatten a reading: sensor messages keep their values under "data"
+def flatten_record(record):
+    if isinstance(record.get('data'), dict):
+        flat = {key: value for key, value in record.items() if key != 'data'}
+        flat.update(record['data'])
+        return flat
+    return record
+
+# Function to load the readings of a JSON array file or of a telemetry frame file (.tlm)
+def load_source(path):
+    if path.endswith('.tlm'):
+        root_dir = os.path.join(BASE_DIR, '..')
+        if root_dir not in sys.path:
+            sys.path.insert(0, root_dir)
+        from telemetry_codec import load_records
+        return load_records(path)
+    with open(path, 'r') as file:
+        return json.load(file)
+
+def day_of(epoch):
+    return str(np.datetime64(int(epoch) // SECONDS_PER_DAY * SECONDS_PER_DAY, 's').astype('datetime64[D]'))
+
+def day_bounds(day):
+    start = int(np.datetime64(day, 'D').astype('datetime64[s]').astype(np.int64))
+    return start, start + SECONDS_PER_DAY
+
+class Columns(dict):
+    """{field: array} of a time range, with the categories of the text fields' codes."""
+
+    def __init__(self, columns, categories):
+        super().__init__(columns)
+        self.categories = categories
+
+class TelemetryStore:
+    """Columnar telemetry history: one .npy file per field, partitioned by day.
+
+    Each dataset directory holds a _schema.json (field dtypes, and the categories of text
+    fields, which are stored as int32 codes) and one directory per day. Inside a day the
+    readings are sorted by their int64 epoch timestamp, which serves as the time index,
+    and the columns are opened memory-mapped, so a time range within one day is a
+    zero-copy view of the files.
+
+    Numeric fields are int64 when every reading has an integer value, float64 otherwise,
+    with NaN where a reading lacks the field; missing text values get code -1.
+    """
+
+    def __init__(self, path=STORE_DIR):
+        self.path = path
+
+    def datasets(self):
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(name for name in os.listdir(self.path) if os.path.exists(self._schema_path(name)))
+
+    def _dataset_dir(self, dataset):
+        return os.path.join(self.path, dataset)
+
+    def _schema_path(self, dataset):
+        return os.path.join(self._dataset_dir(dataset), SCHEMA_FILE)
+
+    def schema(self, dataset):
+        path = self._schema_path(dataset)
+        if not os.path.exists(path):
+            raise ValueError(f"No dataset {dataset!r} in {self.path}")
+        with open(path, 'r') as file:
+            return json.load(file)
+
+    def _save_schema(self, dataset, schema):
+        temporary_path = self._schema_path(dataset) + '.tmp'
+        with open(temporary_path, 'w') as file:
+            json.dump(schema, file, indent=4)
+        os.replace(temporary_path, self._schema_path(dataset))
+
+    def partitions(self, dataset):
+        """Days of the dataset, sorted ("YYYY-mm-dd")."""
+        directory = self._dataset_dir(dataset)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name for name in os.listdir(directory)
+                      if os.path.exists(os.path.join(directory, name, TIME_FIELD + '.npy')))
+
+    def write(self, dataset, records, key_fields=None):
+        """Add readings to a dataset, merging them into the day partitions they fall in.
+
+        With key_fields, a reading whose timestamp and key fields match one already in its
+        day is dropped, so replayed readings are stored once. Returns the number of readings
+        added.
+        """
+        records = [flatten_record(record) for record in records]
+        if not records:
+            return 0
+        os.makedirs(self._dataset_dir(dataset), exist_ok=True)
+        schema = self.schema(dataset) if os.path.exists(self._schema_path(dataset)) else {'fields': {}}
+        epochs = parse_epochs(record[TIME_FIELD] for record in records)
+        columns = self._encode_columns(schema, records)
+
+        days = np.array([day_of(epoch) for epoch in epochs])
+        added = 0
+        for day in np.unique(days).tolist():
+            rows = np.flatnonzero(days == day)
+            new = {field: values[rows] for field, values in columns.items()}
+            new[TIME_FIELD] = epochs[rows]
+            added += self._write_partition(dataset, day, schema, new, key_fields)
+        self._save_schema(dataset, schema)
+        return added
+
+    def _encode_columns(self, schema, records):
+        fields = schema['fields']
+        for record in records:
+            for field, value in record.items():
+                if field == TIME_FIELD or value is None:
+                    continue
+                kind = 'text' if isinstance(value, str) else 'int' if isinstance(value, int) and not isinstance(value, bool) else 'float'
+                known = fields.get(field)
+                if known is None:
+                    fields[field] = {'dtype': kind}
+                    if kind == 'text':
+                        fields[field]['categories'] = []
+                elif known['dtype'] == 'int' and kind == 'float':
+                    known['dtype'] = 'float'
+                elif (known['dtype'] == 'text') != (kind == 'text'):
+                    raise ValueError(f"Field {field!r} mixes text and numbers")
+
+        columns = {}
+        for field, spec in fields.items():
+            values = [record.get(field) for record in records]
+            if spec['dtype'] == 'text':
+                codes = {category: code for code, category in enumerate(spec['categories'])}
+                for value in values:
+                    if value is not None and value not in codes:
+                        codes[value] = len(spec['categories'])
+                        spec['categories'].append(value)
+                columns[field] = np.array([codes.get(value, -1) for value in values], dtype=np.int32)
+            elif spec['dtype'] == 'int' and all(value is not None for value in values):
+                columns[field] = np.array(values, dtype=np.int64)
+            else:
+                if spec['dtype'] == 'int':
+                    spec['dtype'] = 'float'  # Integers with gaps become floats with NaN
+                columns[field] = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+        return columns
+
+    def _write_partition(self, dataset, day, schema, new, key_fields=None):
+        directory = os.path.join(self._dataset_dir(dataset), day)
+        existing = self._read_partition(dataset, day, schema, copy=True) if os.path.isdir(directory) else None
+        count = len(existing[TIME_FIELD]) if existing else 0
+        if existing:
+            merged = {TIME_FIELD: np.concatenate([existing[TIME_FIELD], new[TIME_FIELD]])}
+            for field in schema['fields']:
+                merged[field] = np.concatenate([
+                    existing.get(field, self._missing(schema, field, count)),
+                    new.get(field, self._missing(schema, field, len(new[TIME_FIELD])))
+                ])
+            new = merged
+        # Stable sort so readings with the same timestamp keep the order they were recorded in
+        order = np.argsort(new[TIME_FIELD], kind='stable')
+        if key_fields:
+            # Keep the first reading of each (timestamp, key) in that order: the stored one wins over a replay
+            keys = np.stack([new[field][order].astype(np.float64) for field in (TIME_FIELD,) + tuple(key_fields) if field in new])
+            _, first = np.unique(keys, axis=1, return_index=True)
+            order = order[np.sort(first)]
+
+        # Write the day into a temporary directory first so readers never see half a partition
+        temporary_dir = directory + '.tmp'
+        shutil.rmtree(temporary_dir, ignore_errors=True)
+        os.makedirs(temporary_dir)
+        for field, values in new.items():
+            values = values[order]
+            spec = schema['fields'].get(field)
+            if spec and spec['dtype'] == 'int' and values.dtype.kind == 'f':
+                spec['dtype'] = 'float'  # Readings merged in without this field left gaps
+            if spec and spec['dtype'] == 'float':
+                values = values.astype(np.float64)
+            np.save(os.path.join(temporary_dir, field + '.npy'), values)
+        if os.path.isdir(directory):
+            shutil.rmtree(directory)
+        os.replace(temporary_dir, directory)
+        return len(order) - count
+
+    def _missing(self, schema, field, count):
+        if schema['fields'][field]['dtype'] == 'text':
+            return np.full(count, -1, dtype=np.int32)
+        return np.full(count, np.nan)
+
+    def _read_partition(self, dataset, day, schema, fields=None, copy=False):
+        directory = os.path.join(self._dataset_dir(dataset), day)
+        columns = {}
+        for field in [TIME_FIELD] + list(fields or schema['fields']):
+            path = os.path.join(directory, field + '.npy')
+            if os.path.exists(path):
+                columns[field] = np.load(path) if copy else np.load(path, mmap_mode='r')
+            elif field in schema['fields']:
+                columns[field] = self._missing(schema, field, len(columns[TIME_FIELD]))
+            else:
+                raise ValueError(f"Dataset {dataset!r} has no field {field!r}")
+        return columns
+
+    def scan(self, dataset, start=None, end=None, fields=None):
+        """Yield (day, columns) for every day overlapping [start, end) that has readings in it.
+
+        start and end are epoch seconds or "YYYY-mm-dd HH:MM:SS" strings; the columns are
+        memory-mapped views, found with a binary search on the sorted timestamps.
+        """
+        schema = self.schema(dataset)
+        start = to_epoch_bound(start)
+        end = to_epoch_bound(end)
+        for day in self.partitions(dataset):
+            day_start, day_end = day_bounds(day)
+            if (end is not None and day_start >= end) or (start is not None and day_end <= start):
+                continue
+            columns = self._read_partition(dataset, day, schema, fields)
+            timestamps = columns[TIME_FIELD]
+            first = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+            stop = len(timestamps) if end is None else int(np.searchsorted(timestamps, end, side='left'))
+            if stop > first:
+                yield day, {field: values[first:stop] for field, values in columns.items()}
+
+    def read(self, dataset, start=None, end=None, fields=None):
+        """Columns of the readings in [start, end) as {field: array}, timestamps as epoch seconds.
+
+        The result also carries .categories, the values of each text field's codes.
+        A range inside one day is returned as memory-mapped views; ranges over several days
+        are concatenated into memory.
+        """
+        schema = self.schema(dataset)
+        categories = {field: spec['categories'] for field, spec in schema['fields'].items() if spec['dtype'] == 'text'}
+        parts = [columns for _, columns in self.scan(dataset, start, end, fields)]
+        if len(parts) == 1:
+            return Columns(parts[0], categories)
+        if not parts:
+            columns = {TIME_FIELD: np.zeros(0, dtype=np.int64)}
+            columns.update((field, self._missing(schema, field, 0)) for field in fields or schema['fields'])
+            return Columns(columns, categories)
+        return Columns({field: np.concatenate([columns[field] for columns in parts]) for field in parts[0]}, categories)
+
+    def decode(self, dataset, field, codes):
+        """Text values of a text field's codes (None for missing values)."""
+        categories = self.schema(dataset)['fields'][field]['categories']
+        return [categories[code] if code >= 0 else None for code in np.asarray(codes).tolist()]
+
+    def records(self, dataset, start=None, end=None):
+        """The readings in [start, end) as flat dicts, like the JSON files hold them."""
+        schema = self.schema(dataset)
+        columns = self.read(dataset, start, end)
+        values = {}
+        for field, spec in schema['fields'].items():
+            if spec['dtype'] == 'text':
+                values[field] = self.decode(dataset, field, columns[field])
+            else:
+                values[field] = [None if value != value else value for value in columns[field].tolist()]
+        timestamps = np.asarray(columns[TIME_FIELD]).astype('datetime64[s]').astype(str).tolist()
+        result = []
+        for row, timestamp in enumerate(timestamps):
+            record = {TIME_FIELD: timestamp.replace('T', ' ')}
+            record.update((field, column[row]) for field, column in values.items() if column[row] is not None)
+            result.append(record)
+        return result
+
+# Function to turn a range bound into epoch seconds
+def to_epoch_bound(bound):
+    if bound is None or isinstance(bound, (int, float, np.integer)):
+        return bound
+    return int(parse_epochs([bound])[0])
+
+# Function to convert JSON histories into datasets of the store (rebuilding each dataset)
+def convert(sources=None, store=None):
+    store = store or TelemetryStore()
+    written = {}
+    for dataset, path in (sources or SOURCES).items():
+        if not os.path.exists(path):
+            print(f"Skipping {dataset}: {path} not found")
+            continue
+        shutil.rmtree(os.path.join(store.path, dataset), ignore_errors=True)
+        written[dataset] = store.write(dataset, load_source(path))
+        print(f"{dataset}: {written[dataset]} readings from {path} in {len(store.partitions(dataset))} day partitions")
+    return written
+
+# Function to add the records of a simulator's telemetry log not yet stored, through its 'store' consumer
+def append_log(dataset, log_dir, store=None, batch_size=LOG_BATCH_SIZE):
+    store = store or TelemetryStore()
+    if SENSOR_DIR not in sys.path:
+        sys.path.insert(0, SENSOR_DIR)
+    from telemetry_log import SENSOR_LOG_CONSUMERS, TelemetryLog
+    consumer = TelemetryLog(log_dir, consumers=SENSOR_LOG_CONSUMERS).consumer('store')
+    written = 0
+    try:
+        while True:
+            records = consumer.read(batch_size)
+            if not records:
+                break
+            written += store.write(dataset, records, key_fields=LOG_KEY_FIELDS)
+            # Commit only once the batch is in the store: a crash in between reads it again, and the key fields drop the repeats
+            consumer.commit()
+    finally:
+        consumer.close()
+    return written
+
+# Function to add the new records of every known telemetry log to its dataset
+def append_logs(logs=None, store=None):
+    store = store or TelemetryStore()
+    written = {}
+    for dataset, log_dir in (logs or TELEMETRY_LOGS).items():
+        if not os.path.isdir(log_dir):
+            print(f"Skipping {dataset}: {log_dir} not found")
+            continue
+        written[dataset] = append_log(dataset, log_dir, store)
+        print(f"{dataset}: {written[dataset]} new readings from {log_dir}")
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert JSON telemetry histories into the columnar store.")
+    parser.add_argument('--store', default=STORE_DIR)
+    parser.add_argument('--dataset', help="Name of the dataset to build from --file")
+    parser.add_argument('--file', help="JSON array or .tlm file to convert (default: the known histories)")
+    parser.add_argument('--append', action='store_true', help="Add the readings of --file to the dataset instead of rebuilding it")
+    args = parser.parse_args()
+
+    store = TelemetryStore(args.store)
+    if args.file:
+        dataset = args.dataset or os.path.splitext(os.path.basename(args.file))[0]
+        if args.append:
+            print(f"{dataset}: {store.write(dataset, load_source(args.file))} readings added from {args.file}")
+        else:
+            convert({dataset: args.file}, store)
+    else:
+        convert(store=store)
+        append_logs(store=store)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import numpy as np
+
+# Order of the features fed to the RandomForest model (traffic data + air quality data)
+FEATURE_COLUMNS = [
+    'traffic_volume',
+    'average_speed',
+    'vehicle_count',
+    'red_light',
+    'rain',
+    'co',
+    'no2',
+    'pm25',
+    'temperature',
+    'humidity'
+]
+
+# Fields a traffic entry and an air quality entry need for their part of the feature vector
+TRAFFIC_ENTRY_FIELDS = ['traffic_volume', 'average_speed', 'vehicle_count', 'light_status', 'rain']
+AIR_QUALITY_ENTRY_FIELDS = ['co', 'no2', 'pm25', 'temperature', 'humidity']
+
+# Weight used when the model returns an invalid value (large value to signal a penalty)
+INVALID_WEIGHT = 9999
+
+# Function to extract the traffic part of a feature vector
+def traffic_features(traffic_entry):
+    return [
+        traffic_entry['traffic_volume'],
+        traffic_entry['average_speed'],
+        traffic_entry['vehicle_count'],
+        1 if traffic_entry['light_status'] == 'red' else 0,  # Red light factor
+        traffic_entry['rain']
+    ]
+
+# Function to extract the air quality part of a feature vector
+def air_quality_features(air_data_entry):
+    return [
+        air_data_entry['co'],
+        air_data_entry['no2'],
+        air_data_entry['pm25'],
+        air_data_entry['temperature'],
+        air_data_entry['humidity']
+    ]
+
+# Function to build the feature vector of one intersection
+def build_feature_vector(traffic_entry, air_data_entry):
+    return traffic_features(traffic_entry) + air_quality_features(air_data_entry)
+
+# Function to index the air quality entries by key (first entry wins, like a linear scan would)
+def index_air_quality(air_quality_data, key='timestamp'):
+    index = {}
+    for entry in air_quality_data:
+        index.setdefault(entry[key], entry)
+    return index
+
+# Function to build one feature matrix with a row per source intersection
+def build_source_feature_matrix(out_degrees, traffic_data, air_quality_index):
+    sources = []
+    rows = []
+    for start, degree in out_degrees.items():
+        if not degree:
+            continue
+
+        traffic_entry = traffic_data.get(start)
+        if not traffic_entry:
+            print(f"Missing traffic data for {start}. Skipping its {degree} routes.")
+            continue
+
+        air_data_entry = air_quality_index.get(start)
+        if not air_data_entry:
+            print(f"Missing air quality data for {start}. Skipping its {degree} routes.")
+            continue
+
+        sources.append(start)
+        rows.append(build_feature_vector(traffic_entry, air_data_entry))
+
+    features = np.array(rows, dtype=float).reshape(len(rows), len(FEATURE_COLUMNS))
+    return sources, features
+
+# Function to predict one weight per source intersection with a single model call
+def predict_source_weights(out_degrees, traffic_data, air_quality_index, model):
+    # All outgoing edges of an intersection share the same features, so predict once per source
+    sources, features = build_source_feature_matrix(out_degrees, traffic_data, air_quality_index)
+    if not sources:
+        return sources, np.zeros(0)
+
+    predictions = np.asarray(model.predict(features), dtype=float)
+    invalid = ~np.isfinite(predictions)
+    for row in np.flatnonzero(invalid):
+        print(f"Invalid weight for routes from {sources[row]}: {predictions[row]}. Setting default value.")
+    predictions[invalid] = INVALID_WEIGHT
+    return sources, predictions
+
+# Calculate route weights using the trained RandomForest model
+def calculate_route_weights(graph, traffic_data, air_quality_data, model):
+    """Predict every edge weight of the graph with a single model call."""
+    out_degrees = {start: len(neighbors) for start, neighbors in graph.items()}
+    air_quality_index = index_air_quality(air_quality_data)
+    sources, predictions = predict_source_weights(out_degrees, traffic_data, air_quality_index, model)
+
+    # Scatter the per-source predictions back onto the edges
+    route_weights = {}
+    for start, weight in zip(sources, predictions.tolist()):
+        for end in graph[start]:
+            route_weights[(start, end)] = weight
+
+    return route_weights
+
+# Calculate the route weights of a RoadGraph as an array aligned with its edges
+def calculate_edge_weights(road_network, traffic_data, air_quality_data, model):
+    """Like calculate_route_weights, but edges without data get inf instead of being left out."""
+    out_degrees = dict(zip(road_network.node_names, road_network.out_degrees().tolist()))
+    air_quality_index = index_air_quality(air_quality_data)
+    sources, predictions = predict_source_weights(out_degrees, traffic_data, air_quality_index, model)
+
+    node_weights = np.full(road_network.num_nodes, np.inf)
+    node_weights[np.array([road_network.node_index[start] for start in sources], dtype=np.int64)] = predictions
+    return node_weights[road_network.edge_sources()]
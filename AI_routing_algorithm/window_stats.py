@@ -0,0 +1,264 @@
+import os
+import sys
+import time
+from collections import deque
+
+# Window lengths in seconds (1 minute, 5 minutes, 15 minutes)
+DEFAULT_WINDOWS = (60, 300, 900)
+# Most readings kept per intersection and field; the oldest leave every window once the ring is full
+CAPACITY = 4096
+# Ring size a series starts with; it doubles up to CAPACITY only while its windows need the room
+INITIAL_SIZE = 16
+# Fields aggregated by default: the air quality readings and the numeric traffic readings
+AIR_QUALITY_FIELDS = ['co', 'no2', 'pm25', 'temperature', 'humidity']
+TRAFFIC_FIELDS = ['traffic_volume', 'average_speed', 'vehicle_count', 'rain']
+# Key under which the readings of every intersection are aggregated together
+ALL = '*'
+
+# Function to make the repository root's modules (telemetry_codec) importable
+def add_root_to_path():
+    root_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+    if root_dir not in sys.path:
+        sys.path.insert(0, root_dir)
+
+# Function to turn a reading's timestamp into seconds (epoch numbers pass through, None is now)
+def to_seconds(timestamp):
+    if timestamp is None:
+        return time.time()
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
+    add_root_to_path()
+    from telemetry_codec import to_epoch
+    return float(to_epoch(timestamp))
+
+class RollingSeries:
+    """Rolling mean, variance, min and max of one value over several time windows.
+
+    Readings go into a ring buffer shared by all windows; each window only keeps the
+    ring position of its oldest reading. The ring starts small and doubles while every
+    slot still holds a reading inside some window, up to capacity; past that the oldest
+    reading is dropped from the windows holding it and stats() reports them as truncated.
+    Mean and variance are updated with Welford's formula as readings enter and leave a
+    window, and min and max with monotonic deques, so a reading costs O(1) amortised per
+    window however long the history is. Readings must arrive in time order: push()
+    raises ValueError for a timestamp older than the newest one.
+    """
+
+    def __init__(self, windows=DEFAULT_WINDOWS, capacity=CAPACITY):
+        self.windows = tuple(windows)
+        self.capacity = capacity
+        self.size = min(INITIAL_SIZE, capacity)
+        self.times = [0.0] * self.size
+        self.values = [0.0] * self.size
+        self.pushed = 0  # Readings ever pushed; reading i lives at ring position i % size
+        self.latest = None
+        self.first = [0] * len(self.windows)  # Oldest reading still inside each window
+        self.means = [0.0] * len(self.windows)
+        self.m2 = [0.0] * len(self.windows)  # Sum of squared differences from the mean
+        self.minima = [deque() for _ in self.windows]  # (reading, value), values increasing
+        self.maxima = [deque() for _ in self.windows]  # (reading, value), values decreasing
+        self.truncated = [None] * len(self.windows)  # Time of the newest reading the full ring pushed out
+
+    def push(self, timestamp, value):
+        if self.latest is not None and timestamp < self.latest:
+            raise ValueError(f"Reading at {timestamp:.3f} is older than the newest reading at {self.latest:.3f}")
+        value = float(value)
+        if self.pushed - min(self.first) >= self.size:
+            if self.size < self.capacity:
+                self._grow()
+            else:
+                # The ring is full: the reading about to be overwritten leaves every window holding it
+                self._expire_before(self.pushed - self.size + 1)
+        position = self.pushed % self.size
+        self.times[position] = timestamp
+        self.values[position] = value
+        reading = self.pushed
+        self.pushed += 1
+        self.latest = timestamp
+
+        for w in range(len(self.windows)):
+            count = self.pushed - self.first[w]
+            delta = value - self.means[w]
+            self.means[w] += delta / count
+            self.m2[w] += delta * (value - self.means[w])
+            minima, maxima = self.minima[w], self.maxima[w]
+            while minima and minima[-1][1] >= value:
+                minima.pop()
+            minima.append((reading, value))
+            while maxima and maxima[-1][1] <= value:
+                maxima.pop()
+            maxima.append((reading, value))
+        self.advance(self.latest)
+
+    def _grow(self):
+        # Move the live readings into a ring twice the size, keeping reading i at position i % size
+        size = min(2 * self.size, self.capacity)
+        times, values = [0.0] * size, [0.0] * size
+        for reading in range(min(self.first), self.pushed):
+            times[reading % size] = self.times[reading % self.size]
+            values[reading % size] = self.values[reading % self.size]
+        self.times, self.values, self.size = times, values, size
+
+    def advance(self, now):
+        """Drop the readings that are older than each window at time now."""
+        for w, seconds in enumerate(self.windows):
+            cutoff = now - seconds
+            while self.first[w] < self.pushed and self.times[self.first[w] % self.size] <= cutoff:
+                self._remove_oldest(w)
+
+    def _expire_before(self, reading):
+        for w in range(len(self.windows)):
+            while self.first[w] < reading:
+                self.truncated[w] = self.times[self.first[w] % self.size]
+                self._remove_oldest(w)
+
+    def _remove_oldest(self, w):
+        value = self.values[self.first[w] % self.size]
+        self.first[w] += 1
+        count = self.pushed - self.first[w]
+        if count == 0:
+            self.means[w] = self.m2[w] = 0.0
+        else:
+            # Welford's update run backwards
+            delta = value - self.means[w]
+            self.means[w] -= delta / count
+            self.m2[w] = max(self.m2[w] - delta * (value - self.means[w]), 0.0)
+        for extremes in (self.minima[w], self.maxima[w]):
+            while extremes and extremes[0][0] < self.first[w]:
+                extremes.popleft()
+
+    def stats(self, window=None, now=None):
+        """count, mean, (population) variance, min and max of one window (default: the longest).
+
+        truncated is True when the ring dropped readings that would still be inside the window.
+        """
+        w = self.windows.index(window) if window is not None else self.windows.index(max(self.windows))
+        if now is not None:
+            self.advance(now)
+        now = max(now, self.latest) if now is not None and self.latest is not None else self.latest
+        truncated = self.truncated[w] is not None and self.truncated[w] > now - self.windows[w]
+        count = self.pushed - self.first[w]
+        if count == 0:
+            return {'count': 0, 'mean': None, 'variance': None, 'min': None, 'max': None, 'truncated': truncated}
+        return {
+            'count': count,
+            'mean': self.means[w],
+            'variance': self.m2[w] / count,
+            'min': self.minima[w][0][1],
+            'max': self.maxima[w][0][1],
+            'truncated': truncated
+        }
+
+# Function to combine the window statistics of several series (Chan's parallel form of Welford's formula)
+def combine_stats(parts):
+    count, mean, m2 = 0, 0.0, 0.0
+    minimum = maximum = None
+    truncated = False
+    for part in parts:
+        truncated = truncated or part['truncated']
+        if not part['count']:
+            continue
+        total = count + part['count']
+        delta = part['mean'] - mean
+        mean += delta * part['count'] / total
+        m2 += part['variance'] * part['count'] + delta * delta * count * part['count'] / total
+        count = total
+        minimum = part['min'] if minimum is None else min(minimum, part['min'])
+        maximum = part['max'] if maximum is None else max(maximum, part['max'])
+    if count == 0:
+        return {'count': 0, 'mean': None, 'variance': None, 'min': None, 'max': None, 'truncated': truncated}
+    return {'count': count, 'mean': mean, 'variance': m2 / count, 'min': minimum, 'max': maximum, 'truncated': truncated}
+
+class WindowAggregator:
+    """Window statistics of the telemetry fields per intersection, fed reading by reading.
+
+    Every reading updates the series of its intersection only; the statistics under ALL
+    combine those of every intersection when asked for, measured at the newest timestamp
+    seen overall, so a busy network cannot crowd readings out of a shared ring. Readings
+    without an intersection are kept as one more series under ALL. Routing and penalty
+    calculations can ask for the current window of one intersection or of the whole
+    network without rescanning the history. Each intersection's readings must arrive in
+    time order; add() raises ValueError for an older one.
+    """
+
+    def __init__(self, fields=None, windows=DEFAULT_WINDOWS, capacity=CAPACITY):
+        self.fields = list(fields or AIR_QUALITY_FIELDS + TRAFFIC_FIELDS)
+        self.windows = tuple(windows)
+        self.capacity = capacity
+        self.series = {}  # (key, field) -> RollingSeries
+        self.by_field = {field: [] for field in self.fields}  # field -> the series of every key
+        self.latest = {}  # key -> timestamp of its newest reading
+        self.newest = None
+        self.readings = 0
+
+    def _series(self, key, field):
+        series = self.series.get((key, field))
+        if series is None:
+            series = self.series[(key, field)] = RollingSeries(self.windows, self.capacity)
+            self.by_field[field].append(series)
+        return series
+
+    def add(self, key, timestamp, values):
+        """Add one reading of intersection key; fields missing from values are left alone."""
+        timestamp = to_seconds(timestamp)
+        if key in self.latest and timestamp < self.latest[key]:
+            raise ValueError(f"Reading of {key} at {timestamp:.3f} is older than its newest reading at {self.latest[key]:.3f}")
+        for field in self.fields:
+            value = values.get(field)
+            if value is not None:
+                self._series(key, field).push(timestamp, value)
+        self.latest[key] = timestamp
+        self.newest = timestamp if self.newest is None else max(self.newest, timestamp)
+        self.readings += 1
+
+    def feed(self, record, key=None):
+        """Add a telemetry reading: a flat record, or a sensor message with its values under "data"."""
+        values = record.get('data', record)
+        key = key or record.get('intersection') or ALL
+        self.add(key, record.get('timestamp'), values)
+
+    def consume(self, records, key=None):
+        """Feed every record, skipping (and counting) the ones out of time order or unreadable."""
+        skipped = 0
+        for record in records:
+            try:
+                self.feed(record, key)
+            except ValueError:
+                skipped += 1
+        if skipped:
+            print(f"Skipped {skipped} readings that were out of time order or had unreadable timestamps")
+
+    def consume_messages(self, messages):
+        """Add the readings of hub messages, as returned by LocalIoTHub.read_messages(), per device."""
+        add_root_to_path()
+        from telemetry_codec import decode_message
+        for device_id, _, message in messages:
+            try:
+                records = decode_message(message.data)
+            except ValueError as e:
+                print(f"Skipping unreadable message from {device_id}: {e}")
+                continue
+            self.consume(records, device_id)
+
+    def keys(self):
+        return sorted({key for key, _ in self.series})
+
+    def stats(self, key=ALL, window=None, now=None):
+        """Window statistics of every field seen for key: {field: {count, mean, variance, min, max, truncated}}."""
+        if key == ALL:
+            now = now if now is not None else self.newest
+            return {
+                field: combine_stats(series.stats(window, now) for series in self.by_field[field])
+                for field in self.fields if self.by_field[field]
+            }
+        return {
+            field: self.series[(key, field)].stats(window, now)
+            for field in self.fields if (key, field) in self.series
+        }
+
+    def means(self, key=ALL, window=None, now=None):
+        """Mean of every field over the window, leaving out the fields with no reading in it."""
+        return {
+            field: stats['mean']
+            for field, stats in self.stats(key, window, now).items() if stats['count']
+        }
@@ -0,0 +1,104 @@
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from memory_mongo import MemoryClient
+from stream_loader import stream_load
+
+# Number of readings in the generated sensor file, and readings appended before the rerun
+RECORDS = [10000, 100000, 500000]
+APPENDED = 1000
+BATCH_SIZE = 1000
+
+# Function to write a sensor file shaped like air_quality_sensor_data.json
+def write_readings(path, count, start=0):
+    rng = random.Random(count)
+    with open(path, 'w') as file:
+        file.write('[\n')
+        for i in range(start, start + count):
+            reading = {
+                "sensorType": "AirQualitySensor",
+                "timestamp": f"2025-03-14 {i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}.{i // 86400}",
+                "data": {"co": round(rng.uniform(0, 10), 1), "no2": round(rng.uniform(0, 50), 1), "pm25": rng.randint(0, 200)}
+            }
+            file.write(('' if i == start else ',\n') + json.dumps(reading, indent=4))
+        file.write('\n]\n')
+
+# Function to append readings the way the simulator does: rewrite the closing bracket
+def append_readings(path, count, start):
+    with open(path, 'rb+') as file:
+        file.seek(0, os.SEEK_END)
+        end = file.tell()
+        while end > 0:
+            file.seek(end - 1)
+            if file.read(1) == b']':
+                break
+            end -= 1
+        file.seek(end - 1)
+        file.truncate()
+        for i in range(start, start + count):
+            reading = {"sensorType": "AirQualitySensor", "timestamp": f"appended {i}", "data": {"co": 1.0, "no2": 2.0, "pm25": 3}}
+            file.write((',\n' + json.dumps(reading, indent=4)).encode('utf-8'))
+        file.write(b'\n]\n')
+
+# Collection that only counts what it receives, so the memory figures are the loader's own
+class CountingCollection:
+    def __init__(self):
+        self.documents = 0
+
+    def insert_many(self, documents, ordered=True):
+        self.documents += len(documents)
+
+# Reference implementation: the original json.load + single insert_many
+def load_whole(collection, path):
+    with open(path) as data_file:
+        data = json.load(data_file)
+    collection.insert_many(data)
+    return len(data)
+
+def measure(load):
+    """(result, seconds, peak bytes); timed without tracemalloc, whose hooks slow Python-level parsing far more than json.load."""
+    started = time.perf_counter()
+    result = load()
+    seconds = time.perf_counter() - started
+    tracemalloc.start()
+    load()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak
+
+def main():
+    print(f"{'records':>8} {'whole docs/s':>13} {'whole MB':>9} {'stream docs/s':>14} {'stream MB':>10} "
+          f"{'rerun docs':>11} {'append docs':>12} {'upsert rerun':>13}")
+    with tempfile.TemporaryDirectory() as directory:
+        for count in RECORDS:
+            path = os.path.join(directory, f"readings_{count}.json")
+            checkpoint = os.path.join(directory, f"readings_{count}.checkpoint.json")
+            write_readings(path, count)
+
+            whole_count, whole_seconds, whole_peak = measure(lambda: load_whole(CountingCollection(), path))
+            stats, stream_seconds, stream_peak = measure(lambda: stream_load(CountingCollection(), path, None, BATCH_SIZE))
+            assert stats['documents'] == whole_count
+
+            collection = MemoryClient()['db']['stream']
+            stream_load(collection, path, checkpoint, BATCH_SIZE)
+            assert collection.count_documents({}) == count
+
+            # Nothing new: the checkpoint makes the rerun load no documents
+            rerun = stream_load(collection, path, checkpoint, BATCH_SIZE)
+            append_readings(path, APPENDED, count)
+            appended = stream_load(collection, path, checkpoint, BATCH_SIZE)
+            assert collection.count_documents({}) == count + APPENDED
+
+            # Without a checkpoint, upserts keyed on (sensorType, timestamp) do not duplicate documents
+            stream_load(collection, path, None, BATCH_SIZE, upsert=True)
+            assert collection.count_documents({}) == count + APPENDED
+
+            print(f"{count:>8} {whole_count / whole_seconds:>13.0f} {whole_peak / 1e6:>9.1f} "
+                  f"{stats['documents'] / stream_seconds:>14.0f} {stream_peak / 1e6:>10.1f} "
+                  f"{rerun['documents']:>11} {appended['documents']:>12} {collection.count_documents({}):>13}")
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,43 @@
-import sys
+import argparse
+import os
 import json
+import sys
 from pymongo import MongoClient, errors
+import stream_loader
+
+# Files are resolved next to this script, so it can run from any working directory
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CONNECTION_FILE = os.path.join(BASE_DIR, 'mongo_connection.txt')
+
+ROOT_DIR = os.path.join(BASE_DIR, "..")
+SENSOR_DIR = os.path.join(BASE_DIR, "../SimulatedDevices/Air_Quality_Sensor_Simulation")
+# Extension of binary telemetry frame files (see telemetry_codec.py)
+FRAME_SUFFIX = ".tlm"
+
+# JSON file loaded into each supported collection
+JSON_FILES = {
+    "SensorReadings": os.path.join(SENSOR_DIR, "air_quality_sensor_data.json"),
+    "OptimalRouteResults": os.path.join(BASE_DIR, "../AI_routing_algorithm/optimal_route_results.json")
+}
+
+# Telemetry logs written by the simulators; in stream mode they are read through their 'mongo' consumer
+TELEMETRY_LOGS = {
+    "SensorReadings": os.path.join(SENSOR_DIR, "air_quality_sensor_data.log")
+}
+
+# Function to open the 'mongo' consumer of a simulator telemetry log
+def open_log_consumer(log_dir):
+    if SENSOR_DIR not in sys.path:
+        sys.path.insert(0, SENSOR_DIR)
+    from telemetry_log import SENSOR_LOG_CONSUMERS, TelemetryLog
+    return TelemetryLog(log_dir, consumers=SENSOR_LOG_CONSUMERS).consumer('mongo')
+
+# Function to iterate over the readings of a telemetry frame file, one decoded frame at a time
+def read_frame_batches(frames_path):
+    if ROOT_DIR not in sys.path:
+        sys.path.insert(0, ROOT_DIR)
+    from telemetry_codec import read_frames
+    return read_frames(frames_path)
 
 def read_mongo_connection(file_path):
     """Read MongoDB connection details from a file."""
@@ -10,64 +47,138 @@ def read_mongo_connection(file_path):
         database_name = lines[1].strip()
     return connection_string, database_name
 
-try:
-    # Step 1: Get collection_name from the first command line argument
-    if len(sys.argv) < 2:
-        raise ValueError("Collection name is missing. Please provide it as the first argument.")
-    
-    collection_name = sys.argv[1]
-
-    # Set the path to the JSON file based on the collection name
-    if collection_name == "SensorReadings":
-        json_file_path = "../SimulatedDevices/Air_Quality_Sensor_Simulation/air_quality_sensor_data.json"
-    elif collection_name == "OptimalRouteResults":
-        json_file_path = "../AI_routing_algorithm/optimal_route_results.json"
-    else:
-        raise ValueError("Unsupported collection name. Please use 'SensorReadings' or 'OptimalRouteResults'.")
-
-    # Read MongoDB connection details from file
-    connection_string, database_name = read_mongo_connection('mongo_connection.txt')
-
-    # Verify if essential connection details are present
-    if not all([connection_string, database_name, collection_name]):
-        raise ValueError("Missing essential connection information in mongo_connection.txt.")
-
-    # Step 2: Connect to MongoDB
+def connect(connection_string):
+    """Connect to MongoDB and check the server answers. Returns None when it does not."""
     try:
         client = MongoClient(connection_string, serverSelectionTimeoutMS=5000)  # 5 seconds timeout
         client.admin.command('ping')  # Try to ping the server to check the connection
         print("Successfully connected to MongoDB!")
     except errors.ServerSelectionTimeoutError as err:
         print(f"Failed to connect to MongoDB: {err}")
-        client = None
+        return None
+    return client
 
-    # Proceed only if the connection is successful
-    if client:
-        db = client[database_name]
-        collection = db[collection_name]
+def load_json_to_mongo(collection_name, connection_file=CONNECTION_FILE, stream=False, upsert=False,
+                       batch_size=stream_loader.DEFAULT_BATCH_SIZE, client=None, data_path=None):
+    """Insert the JSON file of the collection into MongoDB. Returns True on success.
 
-        # Step 3: Load data from the JSON file
+    With stream=True the file is parsed incrementally and sent in batches, and only the
+    records added since the last run are loaded; upsert=True makes replays idempotent.
+    A client (e.g. memory_mongo.MemoryClient) can be passed instead of connecting.
+    data_path replaces the default file; a FRAME_SUFFIX file is decoded as binary telemetry frames.
+    """
+    # Set the path to the JSON file based on the collection name
+    if collection_name not in JSON_FILES:
+        raise ValueError("Unsupported collection name. Please use 'SensorReadings' or 'OptimalRouteResults'.")
+    json_file_path = data_path or JSON_FILES[collection_name]
+
+    if client is None:
+        # Read MongoDB connection details from file
+        connection_string, database_name = read_mongo_connection(connection_file)
+
+        # Verify if essential connection details are present
+        if not all([connection_string, database_name, collection_name]):
+            raise ValueError("Missing essential connection information in mongo_connection.txt.")
+
+        # Step 2: Connect to MongoDB
+        client = connect(connection_string)
+        if client is None:
+            return False
+    else:
+        database_name = read_mongo_connection(connection_file)[1] if os.path.exists(connection_file) else 'test'
+
+    db = client[database_name]
+    collection = db[collection_name]
+
+    if json_file_path.endswith(FRAME_SUFFIX):
+        return load_frames_to_mongo(collection, json_file_path, upsert)
+
+    if stream:
+        return stream_json_to_mongo(collection, collection_name, json_file_path, upsert, batch_size)
+
+    # Step 3: Load data from the JSON file
+    try:
+        with open(json_file_path) as data_file:
+            data = json.load(data_file)
+        print("Data loaded from JSON file successfully.")
+    except FileNotFoundError:
+        print(f"Data JSON file not found at {json_file_path}. Please check the file path.")
+        return False
+    except json.JSONDecodeError:
+        print("Error decoding JSON. Please ensure the JSON file is valid.")
+        return False
+
+    # Step 4: Insert data into MongoDB
+    if data:
         try:
-            with open(json_file_path) as data_file:
-                data = json.load(data_file)
-            print("Data loaded from JSON file successfully.")
-        except FileNotFoundError:
-            print(f"Data JSON file not found at {json_file_path}. Please check the file path.")
-            data = None
-        except json.JSONDecodeError:
-            print("Error decoding JSON. Please ensure the JSON file is valid.")
-            data = None
-
-        # Step 4: Insert data into MongoDB
-        if data:
+            if isinstance(data, list):
+                collection.insert_many(data)
+                print("List of documents successfully inserted into MongoDB!")
+            else:
+                collection.insert_one(data)
+                print("Single document successfully inserted into MongoDB!")
+        except errors.PyMongoError as e:
+            print(f"Error inserting data into MongoDB: {e}")
+            return False
+    return True
+
+def stream_json_to_mongo(collection, collection_name, json_file_path, upsert, batch_size):
+    log_dir = TELEMETRY_LOGS.get(collection_name)
+    try:
+        if log_dir and os.path.isdir(log_dir):
+            consumer = open_log_consumer(log_dir)
             try:
-                if isinstance(data, list):
-                    collection.insert_many(data)
-                    print("List of documents successfully inserted into MongoDB!")
-                else:
-                    collection.insert_one(data)
-                    print("Single document successfully inserted into MongoDB!")
-            except errors.PyMongoError as e:
-                print(f"Error inserting data into MongoDB: {e}")
-except Exception as e:
-    print(f"An error occurred: {e}")
\ No newline at end of file
+                stats = stream_loader.stream_consumer(collection, consumer, batch_size=batch_size, upsert=upsert)
+            finally:
+                consumer.close()
+        else:
+            stats = stream_loader.stream_load(
+                collection, json_file_path,
+                checkpoint_path=stream_loader.checkpoint_path_for(collection_name),
+                batch_size=batch_size, upsert=upsert
+            )
+    except FileNotFoundError:
+        print(f"Data JSON file not found at {json_file_path}. Please check the file path.")
+        return False
+    except (json.JSONDecodeError, ValueError) as e:
+        print(f"Error decoding JSON: {e}")
+        return False
+    except errors.PyMongoError as e:
+        print(f"Error inserting data into MongoDB: {e}")
+        return False
+    print(f"Streamed {stats['documents']} new documents in {stats['batches']} batches "
+          f"({stats['documents_per_second']:.0f} documents/s, resumed at byte {stats['resumed_from_offset']}).")
+    return True
+
+def load_frames_to_mongo(collection, frames_path, upsert):
+    try:
+        stats = stream_loader.stream_batches(collection, read_frame_batches(frames_path), upsert=upsert)
+    except FileNotFoundError:
+        print(f"Telemetry frame file not found at {frames_path}. Please check the file path.")
+        return False
+    except ValueError as e:
+        print(f"Error decoding telemetry frames: {e}")
+        return False
+    except errors.PyMongoError as e:
+        print(f"Error inserting data into MongoDB: {e}")
+        return False
+    print(f"Loaded {stats['documents']} documents from {stats['batches']} telemetry frames "
+          f"({stats['documents_per_second']:.0f} documents/s).")
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load a JSON data file into a MongoDB collection.")
+    parser.add_argument('collection_name', choices=sorted(JSON_FILES))
+    parser.add_argument('--stream', action='store_true',
+                        help="Parse the file incrementally and only load records added since the last run")
+    parser.add_argument('--upsert', action='store_true',
+                        help="With --stream, upsert on (sensorType, timestamp) instead of inserting")
+    parser.add_argument('--batch-size', type=int, default=stream_loader.DEFAULT_BATCH_SIZE)
+    parser.add_argument('--file', help=f"Load this file instead of the default one; {FRAME_SUFFIX} files "
+                                       "hold binary telemetry frames")
+    args = parser.parse_args()
+    try:
+        load_json_to_mongo(args.collection_name, stream=args.stream, upsert=args.upsert, batch_size=args.batch_size,
+                           data_path=args.file)
+    except Exception as e:
+        print(f"An error occurred: {e}")
@@ -0,0 +1,120 @@
+import copy
+import itertools
+from pymongo import InsertOne, UpdateOne, errors
+
+class MemoryCollection:
+    """In-memory stand-in for a pymongo collection, covering what the loaders use.
+
+    Documents are kept in insertion order; equality filters on the upsert key are answered
+    from an index that is built the first time those fields are queried.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._documents = {}
+        self._ids = itertools.count(1)
+        self._indexes = {}
+
+    def _store(self, document):
+        document = copy.deepcopy(document)
+        document.setdefault('_id', next(self._ids))
+        if document['_id'] in self._documents:
+            return {'code': 11000, 'errmsg': f"E11000 duplicate key error _id: {document['_id']}"}
+        self._documents[document['_id']] = document
+        for fields, index in self._indexes.items():
+            index.setdefault(self._key(document, fields), document['_id'])
+        return None
+
+    @staticmethod
+    def _key(document, fields):
+        return tuple(repr(document.get(field)) for field in fields)
+
+    def _index_for(self, fields):
+        if fields not in self._indexes:
+            index = {}
+            for _id, document in self._documents.items():
+                index.setdefault(self._key(document, fields), _id)
+            self._indexes[fields] = index
+        return self._indexes[fields]
+
+    def _find_one_id(self, query):
+        fields = tuple(sorted(query))
+        return self._index_for(fields).get(self._key(query, fields))
+
+    def _update(self, query, update, upsert):
+        _id = self._find_one_id(query)
+        if _id is None:
+            if upsert:
+                self._store(dict(query, **update.get('$set', {})))
+                return 'upserted'
+            return None
+        document = self._documents[_id]
+        old_keys = {fields: self._key(document, fields) for fields in self._indexes}
+        document.update(copy.deepcopy(update.get('$set', {})))
+        for fields, index in self._indexes.items():
+            if old_keys[fields] != self._key(document, fields):
+                index.pop(old_keys[fields], None)
+                index.setdefault(self._key(document, fields), _id)
+        return 'modified'
+
+    def insert_one(self, document):
+        error = self._store(document)
+        if error:
+            raise errors.DuplicateKeyError(error['errmsg'], 11000)
+
+    def insert_many(self, documents, ordered=True):
+        write_errors = []
+        for position, document in enumerate(documents):
+            error = self._store(document)
+            if error:
+                write_errors.append(dict(error, index=position))
+                if ordered:
+                    break
+        if write_errors:
+            raise errors.BulkWriteError({'writeErrors': write_errors, 'nInserted': len(documents) - len(write_errors)})
+
+    def bulk_write(self, requests, ordered=True):
+        counts = {'nInserted': 0, 'nUpserted': 0, 'nModified': 0}
+        for request in requests:
+            if isinstance(request, InsertOne):
+                self.insert_one(request._doc)
+                counts['nInserted'] += 1
+            elif isinstance(request, UpdateOne):
+                result = self._update(request._filter, request._doc, request._upsert)
+                if result == 'upserted':
+                    counts['nUpserted'] += 1
+                elif result == 'modified':
+                    counts['nModified'] += 1
+            else:
+                raise TypeError(f"Unsupported bulk request: {type(request).__name__}")
+        return counts
+
+    def find(self, query=None):
+        query = query or {}
+        return [copy.deepcopy(document) for document in self._documents.values()
+                if all(document.get(field) == value for field, value in query.items())]
+
+    def count_documents(self, query):
+        return len(self.find(query)) if query else len(self._documents)
+
+class MemoryDatabase(dict):
+    def __missing__(self, name):
+        self[name] = MemoryCollection(name)
+        return self[name]
+
+class MemoryAdmin:
+    def command(self, name):
+        if name != 'ping':
+            raise ValueError(f"Unsupported admin command: {name}")
+        return {'ok': 1.0}
+
+class MemoryClient(dict):
+    """Drop-in for MongoClient(connection_string) when no MongoDB server is available."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.admin = MemoryAdmin()
+
+    def __missing__(self, name):
+        self[name] = MemoryDatabase()
+        return self[name]
@@ -0,0 +1,299 @@
+import codecs
+import hashlib
+import json
+import os
+import re
+import time
+from pymongo import InsertOne, UpdateOne, errors
+
+# Records sent to MongoDB per insert_many / bulk_write call
+DEFAULT_BATCH_SIZE = 1000
+# Fields that identify one telemetry reading, used as the upsert filter
+UPSERT_KEY = ('sensorType', 'timestamp')
+# Bytes before the checkpoint offset that must be unchanged for the checkpoint to be reused
+CHECKPOINT_WINDOW = 256
+WHITESPACE = re.compile(r'[ \t\r\n]*')
+# The separator between two array values, matched in one step on the fast path
+SEPARATOR = re.compile(r'[ \t\r\n]*,[ \t\r\n]*')
+# Characters that can continue a number: a number followed only by these up to the end of the
+# buffer may be cut short ("994" decoded from "994." while the fraction is still unread)
+NUMBER_TAIL = re.compile(r'[0-9.eE+\-]*\Z')
+
+CHECKPOINT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.checkpoints')
+
+class JsonRecordReader:
+    """Incremental reader for a JSON array file or a JSONL file.
+
+    Records are parsed chunk by chunk, so the file is never loaded whole. offset is the byte
+    position just after the last record returned, and a new reader can resume from it.
+    Yielding record by record from Python costs throughput: expect about 1.3x fewer
+    records/s than json.load on the whole file, in exchange for constant memory.
+    A .json file holding a single object yields that object as its only record.
+    """
+
+    def __init__(self, path, offset=0, chunk_size=1 << 20):
+        self.path = path
+        self.offset = offset
+        self.chunk_size = chunk_size
+        self.jsonl = path.endswith(('.jsonl', '.ndjson'))
+
+    def __iter__(self):
+        if self.jsonl:
+            return self._iter_lines()
+        return self._iter_array()
+
+    def _iter_lines(self):
+        with open(self.path, 'rb') as file:
+            file.seek(self.offset)
+            while True:
+                line = file.readline()
+                if not line:
+                    return
+                if line.strip():
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        if not line.endswith(b'\n'):
+                            return  # Last line still being written, pick it up next time
+                        raise
+                    self.offset += len(line)
+                    yield record
+                else:
+                    self.offset += len(line)
+
+    def _iter_array(self):
+        decoder = json.JSONDecoder()
+        utf8 = codecs.getincrementaldecoder('utf-8')()
+        with open(self.path, 'rb') as file:
+            file.seek(self.offset)
+            buffer = ''
+            # buffer[mark] sits at byte mark_offset of the file; only the text after mark is re-encoded
+            mark = 0
+            mark_offset = self.offset
+            position = 0
+            eof = False
+            # While the buffer is pure ASCII, characters and bytes line up and offsets need no encoding
+            ascii_buffer = True
+            state = 'start' if self.offset == 0 else 'after'
+            raw_decode = decoder.raw_decode
+            separator = SEPARATOR.match
+            number_tail = NUMBER_TAIL.match
+
+            def byte_offset(index):
+                if ascii_buffer:
+                    return mark_offset + index - mark
+                return mark_offset + len(buffer[mark:index].encode('utf-8'))
+
+            def refill():
+                nonlocal buffer, mark, mark_offset, position, eof, ascii_buffer
+                # Drop the consumed part of the buffer before reading more
+                mark_offset = byte_offset(position)
+                buffer = buffer[position:]
+                mark = position = 0
+                chunk = file.read(self.chunk_size)
+                eof = not chunk
+                text = utf8.decode(chunk, final=eof)
+                ascii_buffer = buffer.isascii() and text.isascii()
+                buffer += text
+
+            while True:
+                # Fast path: ", <value>" right after a record, away from the end of the buffer
+                if state == 'after':
+                    match = separator(buffer, position)
+                    if match is not None and match.end() < len(buffer):
+                        try:
+                            record, end = raw_decode(buffer, match.end())
+                        except json.JSONDecodeError:
+                            end = len(buffer)
+                        if end < len(buffer) and not (type(record) in (int, float) and number_tail(buffer, end)):
+                            mark_offset = byte_offset(end)
+                            mark = position = end
+                            self.offset = mark_offset
+                            yield record
+                            continue
+
+                position = WHITESPACE.match(buffer, position).end()
+                if position >= len(buffer):
+                    if eof:
+                        return  # A file still being written may not have its closing ']' yet
+                    refill()
+                    continue
+
+                char = buffer[position]
+                if state == 'start':
+                    if char == '[':
+                        position += 1
+                        state = 'first'
+                        continue
+                    state = 'single'
+                elif state == 'after':
+                    if char == ',':
+                        position += 1
+                        state = 'value'
+                        continue
+                    if char == ']':
+                        return
+                    raise ValueError(f"Expected ',' or ']' at byte {byte_offset(position)} of {self.path}")
+                elif state == 'first' and char == ']':
+                    return
+
+                # Decode one value; a value touching the end of the buffer may be cut short
+                try:
+                    record, end = decoder.raw_decode(buffer, position)
+                    if not eof and (end == len(buffer) or (type(record) in (int, float) and number_tail(buffer, end))):
+                        raise json.JSONDecodeError("Value reaches the end of the buffer", buffer, end)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    refill()
+                    continue
+                mark_offset = byte_offset(end)
+                mark = position = end
+                self.offset = mark_offset
+                yield record
+                if state == 'single':
+                    return
+                state = 'after'
+
+# Function to fingerprint the bytes right before an offset, to detect rewritten files
+def window_hash(path, offset):
+    start = max(0, offset - CHECKPOINT_WINDOW)
+    with open(path, 'rb') as file:
+        file.seek(start)
+        return hashlib.sha256(file.read(offset - start)).hexdigest()
+
+def checkpoint_path_for(collection_name):
+    return os.path.join(CHECKPOINT_DIR, f"{collection_name}.json")
+
+# Function to find where the previous run stopped, or 0 when the file changed underneath it
+def load_checkpoint(checkpoint_path, data_path):
+    if not checkpoint_path or not os.path.exists(checkpoint_path):
+        return 0
+    try:
+        with open(checkpoint_path, 'r') as file:
+            checkpoint = json.load(file)
+    except (OSError, json.JSONDecodeError):
+        return 0
+    offset = checkpoint.get('offset', 0)
+    if (checkpoint.get('path') != os.path.abspath(data_path)
+            or offset > os.path.getsize(data_path)
+            or window_hash(data_path, offset) != checkpoint.get('window_hash')):
+        print(f"{data_path} was rewritten since the last checkpoint. Loading it from the start.")
+        return 0
+    return offset
+
+def save_checkpoint(checkpoint_path, data_path, offset, records):
+    os.makedirs(os.path.dirname(checkpoint_path), exist_ok=True)
+    checkpoint = {
+        'path': os.path.abspath(data_path),
+        'offset': offset,
+        'window_hash': window_hash(data_path, offset),
+        'records': records
+    }
+    temporary_path = checkpoint_path + '.tmp'
+    with open(temporary_path, 'w') as file:
+        json.dump(checkpoint, file)
+    os.replace(temporary_path, checkpoint_path)
+
+# Function to send one batch, either as unordered inserts or as upserts keyed on key_fields
+def write_batch(collection, batch, upsert, key_fields):
+    if not upsert:
+        try:
+            collection.insert_many(batch, ordered=False)
+        except errors.BulkWriteError as e:
+            # A replayed batch (after an interrupted run) only fails with duplicate keys where a unique
+            # index covers the documents, e.g. on _id; without one the replayed documents are inserted again
+            other = [error for error in e.details.get('writeErrors', []) if error.get('code') != 11000]
+            if other:
+                raise
+        return
+
+    requests = []
+    for document in batch:
+        if all(field in document for field in key_fields):
+            key = {field: document[field] for field in key_fields}
+            requests.append(UpdateOne(key, {'$set': document}, upsert=True))
+        else:
+            requests.append(InsertOne(document))
+    collection.bulk_write(requests, ordered=False)
+
+# Stream a JSON array / JSONL file into a collection in fixed-size batches
+def stream_load(collection, data_path, checkpoint_path=None, batch_size=DEFAULT_BATCH_SIZE,
+                upsert=False, key_fields=UPSERT_KEY):
+    """Load the records added since the last checkpoint and return the load statistics."""
+    started = time.perf_counter()
+    offset = load_checkpoint(checkpoint_path, data_path)
+    reader = JsonRecordReader(data_path, offset)
+    documents = 0
+    batches = 0
+    batch = []
+
+    def flush():
+        nonlocal documents, batches, batch
+        if batch:
+            write_batch(collection, batch, upsert, key_fields)
+            documents += len(batch)
+            batches += 1
+            batch = []
+        # Only advance the checkpoint once the batch is safely in MongoDB
+        if checkpoint_path:
+            save_checkpoint(checkpoint_path, data_path, reader.offset, documents)
+
+    for record in reader:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+
+    seconds = time.perf_counter() - started
+    return {
+        'documents': documents,
+        'batches': batches,
+        'seconds': seconds,
+        'documents_per_second': documents / seconds if seconds > 0 else 0.0,
+        'resumed_from_offset': offset
+    }
+
+# Stream the records of a log consumer (read(n) / commit(), e.g. telemetry_log.LogConsumer) into a collection
+def stream_consumer(collection, consumer, batch_size=DEFAULT_BATCH_SIZE, upsert=False, key_fields=UPSERT_KEY):
+    """Load every record the consumer has not committed yet and return the load statistics."""
+    started = time.perf_counter()
+    resumed_from = consumer.offset
+    documents = 0
+    batches = 0
+    while True:
+        batch = consumer.read(batch_size)
+        if not batch:
+            break
+        write_batch(collection, batch, upsert, key_fields)
+        consumer.commit()  # The consumer position doubles as the checkpoint
+        documents += len(batch)
+        batches += 1
+
+    seconds = time.perf_counter() - started
+    return {
+        'documents': documents,
+        'batches': batches,
+        'seconds': seconds,
+        'documents_per_second': documents / seconds if seconds > 0 else 0.0,
+        'resumed_from_offset': resumed_from
+    }
+
+def stream_batches(collection, batches, upsert=False, key_fields=UPSERT_KEY):
+    """Write already decoded batches of documents (e.g. telemetry frames) and return the load statistics."""
+    started = time.perf_counter()
+    documents = 0
+    count = 0
+    for batch in batches:
+        if batch:
+            write_batch(collection, batch, upsert, key_fields)
+            documents += len(batch)
+        count += 1
+
+    seconds = time.perf_counter() - started
+    return {
+        'documents': documents,
+        'batches': count,
+        'seconds': seconds,
+        'documents_per_second': documents / seconds if seconds > 0 else 0.0
+    }
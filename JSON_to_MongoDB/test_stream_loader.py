@@ -0,0 +1,33 @@
+import json
+import random
+import pytest
+from stream_loader import JsonRecordReader
+
+# Function to write values as a JSON array file and return its path
+def write_array(tmp_path, values, name='values.json'):
+    path = tmp_path / name
+    path.write_text(json.dumps(values))
+    return str(path)
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 5, 7, 16])
+def test_number_arrays_split_across_chunks(tmp_path, chunk_size):
+    rng = random.Random(chunk_size)
+    values = [994.385464527811, 12, -3e5, 1.5e-7, 0, -0.25]
+    values += [rng.uniform(-1e6, 1e6) for _ in range(50)] + [rng.randint(-10**9, 10**9) for _ in range(50)]
+    path = write_array(tmp_path, values)
+    assert list(JsonRecordReader(path, chunk_size=chunk_size)) == values
+
+@pytest.mark.parametrize('chunk_size', [1, 4, 64])
+def test_mixed_records_split_across_chunks(tmp_path, chunk_size):
+    values = [{"co": 4.25, "name": "Intersection é"}, [1, 2.5], "text", 7, True, None, 3.75]
+    path = write_array(tmp_path, values)
+    assert list(JsonRecordReader(path, chunk_size=chunk_size)) == values
+
+def test_resume_from_offset(tmp_path):
+    values = [1.25, 2, {"a": 3.5}, 4e10, 5]
+    path = write_array(tmp_path, values)
+    reader = JsonRecordReader(path, chunk_size=3)
+    records = iter(reader)
+    first = [next(records), next(records)]
+    rest = list(JsonRecordReader(path, offset=reader.offset, chunk_size=3))
+    assert first + rest == values
@@ -2,7 +2,11 @@ import requests
 import time
 import json
 import os
-from azure.iot.device import IoTHubDeviceClient, Message
+import asyncio
+from azure.iot.device import Message
+from azure.iot.device.aio import IoTHubDeviceClient
+from telemetry_log import TelemetryLog, import_json_array
+from telemetry_transmitter import TelemetryTransmitter
 
 # Load connection string for Azure IoT Hub
 def load_connection_string(filename="primary_connection_string.txt"):
@@ -12,14 +16,21 @@ def load_connection_string(filename="primary_connection_string.txt"):
                 return line.split("=", 1)[1].strip()
 
 CONNECTION_STRING = load_connection_string()
-client = IoTHubDeviceClient.create_from_connection_string(CONNECTION_STRING, websockets=True)  # Use MQTT with websockets
 
 # WAQI API configuration for Timisoara
 STATION_ID = "timisoara"  # Using 'timisoara' station for this example
 API_URL = f"http://api.waqi.info/feed/{STATION_ID}/?token=demo"  # demo token for free access
 
-# Local file to store telemetry data
+# Local file that buffered telemetry data before the append-only log
 DATA_FILE = "telemetry_data.json"
+# Append-only log buffering telemetry until it is sent
+LOG_DIR = "telemetry_data.log"
+
+new_log = not os.path.exists(LOG_DIR)
+telemetry_log = TelemetryLog(LOG_DIR, consumers=('iothub',))
+if new_log and os.path.exists(DATA_FILE):
+    print(f"Imported {import_json_array(telemetry_log, DATA_FILE)} buffered records from {DATA_FILE}")
+iothub_consumer = telemetry_log.consumer('iothub')
 
 # Function to get air quality data from WAQI API
 def get_air_quality_data():
@@ -51,45 +62,19 @@ def get_air_quality_data():
         print(f"Failed to connect to WAQI API. HTTP Status Code: {response.status_code}")
         return None
 
-# Function to save telemetry data locally to a JSON file
+# Function to save telemetry data locally by appending it to the telemetry log
 def save_telemetry_data_locally(telemetry_data):
-    if not os.path.exists(DATA_FILE):
-        with open(DATA_FILE, 'w') as file:
-            json.dump([], file)  # Initialize with an empty list
-    
-    with open(DATA_FILE, 'r+') as file:
-        # Load existing data
-        data = json.load(file)
-        
-        # Append new telemetry data
-        data.append(telemetry_data)
-        
-        # Write updated data back to the file
-        file.seek(0)
-        json.dump(data, file, indent=4)
+    telemetry_log.append(telemetry_data)
     print(f"Saved data locally: {json.dumps(telemetry_data)}")
 
-# Function to send telemetry data from local storage to Azure IoT Hub
-def send_telemetry_to_iothub():
-    with open(DATA_FILE, 'r+') as file:
-        # Load all telemetry data
-        data = json.load(file)
-        
-        if data:
-            for telemetry_data in data:
-                message = Message(json.dumps(telemetry_data))
-                message.content_encoding = "utf-8"
-                message.content_type = "application/json"
-                
-                client.send_message(message)
-                print(f"Sent data: {json.dumps(telemetry_data)}")
-            
-            # Clear the file after sending
-            file.seek(0)
-            file.truncate()
-            json.dump([], file)
-        else:
-            print("No data to send.")
+# Function to send one telemetry record to Azure IoT Hub
+async def send_telemetry_to_iothub(client, telemetry_data):
+    message = Message(json.dumps(telemetry_data))
+    message.content_encoding = "utf-8"
+    message.content_type = "application/json"
+    
+    await client.send_message(message)
+    print(f"Sent data: {json.dumps(telemetry_data)}")
 
 # Main loop for data acquisition and storage
 def acquire_data_loop():
@@ -102,10 +87,22 @@ def acquire_data_loop():
         time.sleep(8)  # Adjust frequency as needed
 
 # Transmission loop for sending data to Azure IoT Hub
+async def transmit_data():
+    client = IoTHubDeviceClient.create_from_connection_string(CONNECTION_STRING, websockets=True)  # Use MQTT with websockets
+    await client.connect()
+    transmitter = TelemetryTransmitter(iothub_consumer, lambda record: send_telemetry_to_iothub(client, record))
+    try:
+        while True:
+            # Send the whole backlog in batches, several messages in flight at once
+            if not await transmitter.drain():
+                print("No data to send.")
+            print(f"Transmitter metrics: {transmitter.metrics()}")
+            await asyncio.sleep(60)  # Send every 60 seconds, adjust as needed
+    finally:
+        await client.shutdown()
+
 def transmit_data_loop():
-    while True:
-        send_telemetry_to_iothub()
-        time.sleep(60)  # Send every 60 seconds, adjust as needed
+    asyncio.run(transmit_data())
 
 # Run the data acquisition and transmission loops
 if __name__ == "__main__":
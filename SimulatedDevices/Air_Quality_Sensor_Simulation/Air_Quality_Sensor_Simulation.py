@@ -3,7 +3,11 @@ import time
 import json
 import os
 import threading
-from azure.iot.device import IoTHubDeviceClient, Message
+import asyncio
+from azure.iot.device import Message
+from azure.iot.device.aio import IoTHubDeviceClient
+from telemetry_log import SENSOR_LOG_CONSUMERS, TelemetryLog, import_json_array
+from telemetry_transmitter import TelemetryTransmitter
 
 # Load connection string for Azure IoT Hub
 def load_connection_string(filename="primary_connection_string.txt"):
@@ -13,17 +17,21 @@ def load_connection_string(filename="primary_connection_string.txt"):
                 return line.split("=", 1)[1].strip()
 
 CONNECTION_STRING = load_connection_string()
-client = IoTHubDeviceClient.create_from_connection_string(CONNECTION_STRING)
 
 # WAQI API configuration for Timisoara
 STATION_ID = "timisoara"
 API_URL = f"http://api.waqi.info/feed/{STATION_ID}/?token=demo"  # demo token
 
-# Local file to store telemetry data
+# Local file that buffered telemetry data before the append-only log
 DATA_FILE = "air_quality_sensor_data.json"
+# Append-only log buffering telemetry until it is sent; MongoDB loading and the telemetry store read it as further consumers
+LOG_DIR = "air_quality_sensor_data.log"
 
-# Lock to ensure thread-safe access to the local JSON file
-data_lock = threading.Lock()
+new_log = not os.path.exists(LOG_DIR)
+telemetry_log = TelemetryLog(LOG_DIR, consumers=SENSOR_LOG_CONSUMERS)
+if new_log and os.path.exists(DATA_FILE):
+    print(f"Imported {import_json_array(telemetry_log, DATA_FILE)} buffered records from {DATA_FILE}")
+iothub_consumer = telemetry_log.consumer('iothub')
 
 # Function to get air quality data from WAQI API
 def get_air_quality_data():
@@ -49,18 +57,9 @@ def get_air_quality_data():
         print(f"Failed to connect to WAQI API. HTTP Status Code: {response.status_code}")
         return None
 
-# Function to save telemetry data locally to a JSON file
+# Function to save telemetry data locally by appending it to the telemetry log
 def save_telemetry_data_locally(telemetry_data):
-    with data_lock:  # Ensure that only one thread can access the file at a time
-        if not os.path.exists(DATA_FILE):
-            with open(DATA_FILE, 'w') as file:
-                json.dump([], file)  # Initialize with an empty list
-
-        with open(DATA_FILE, 'r+') as file:
-            data = json.load(file)
-            data.append(telemetry_data)
-            file.seek(0)
-            json.dump(data, file, indent=4)
+    telemetry_log.append(telemetry_data)  # The log has its own lock, so both threads can use it
     print(f"Saved data locally: {json.dumps(telemetry_data)}")
 
 # Function to fetch and save data continuously
@@ -72,27 +71,25 @@ def data_fetcher():
         time.sleep(8)  # Fetch every 8 seconds
 
 # Function to send telemetry data to Azure IoT Hub
-def send_telemetry_to_iothub(telemetry_data):
+async def send_telemetry_to_iothub(client, telemetry_data):
     message = Message(json.dumps(telemetry_data))
     message.content_encoding = "utf-8"
     message.content_type = "application/json"
-    client.send_message(message)
+    await client.send_message(message)
     print(f"Sent data to IoT Hub: {json.dumps(telemetry_data)}")
 
-# Function to send data from local JSON to Azure IoT Hub
+# Function to drain the local log to Azure IoT Hub in batches, several messages in flight at once
+async def transmit():
+    client = IoTHubDeviceClient.create_from_connection_string(CONNECTION_STRING)
+    await client.connect()
+    transmitter = TelemetryTransmitter(iothub_consumer, lambda record: send_telemetry_to_iothub(client, record))
+    try:
+        await transmitter.run(report_interval=60)  # Print queue depth and send rate every minute
+    finally:
+        await client.shutdown()
+
 def data_sender():
-    while True:
-        with data_lock:  # Ensure thread-safe access to the file
-            if os.path.exists(DATA_FILE):
-                with open(DATA_FILE, 'r+') as file:
-                    data = json.load(file)
-                    if data:
-                        telemetry_data = data.pop(0)  # Remove the first entry
-                        file.seek(0)
-                        json.dump(data, file, indent=4)
-                        file.truncate()  # Remove leftover data
-                        send_telemetry_to_iothub(telemetry_data)
-        time.sleep(10)  # Send every 10 seconds
+    asyncio.run(transmit())
 
 # Starting the threads
 fetch_thread = threading.Thread(target=data_fetcher)
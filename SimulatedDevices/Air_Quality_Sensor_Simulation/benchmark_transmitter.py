@@ -0,0 +1,60 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from telemetry_log import TelemetryLog
+from telemetry_transmitter import TelemetryTransmitter
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+sys.path.insert(0, ROOT_DIR)
+from local_iot_hub import LocalIoTHub, Message
+
+# Backlog drained per run, and the hub behaviour it is drained against
+RECORDS = 1000
+HUB_LATENCY = 0.02
+HUB_JITTER = 0.01
+FAILURE_RATE = 0.02
+# (batch size, messages in flight); (1, 1) is the old one-message-at-a-time sender
+SETTINGS = [(1, 1), (50, 4), (50, 16), (200, 64)]
+
+def make_backlog(directory, count):
+    log = TelemetryLog(directory, consumers=('iothub',))
+    for i in range(count):
+        log.append({"sensorType": "AirQualitySensor", "timestamp": f"2025-03-14 00:00:{i}",
+                    "data": {"co": 4.7, "no2": 6.4, "pm25": 13}})
+    log.close()
+    return log
+
+async def drain(log, hub, batch_size, max_in_flight):
+    client = hub.create_device_client("AirQualitySensor")
+    await client.connect()
+
+    async def send(record):
+        message = Message(json.dumps(record), content_encoding="utf-8", content_type="application/json")
+        await client.send_message(message)
+
+    transmitter = TelemetryTransmitter(log.consumer('iothub'), send, batch_size=batch_size,
+                                       max_in_flight=max_in_flight, backoff=0.01, seed=0)
+    started = time.perf_counter()
+    await transmitter.drain()
+    seconds = time.perf_counter() - started
+    await client.shutdown()
+    return transmitter, seconds
+
+def main():
+    print(f"{'batch':>6} {'in flight':>10} {'msgs/s':>9} {'seconds':>8} {'retries':>8} {'left':>5} {'delivered':>10}")
+    for batch_size, max_in_flight in SETTINGS:
+        with tempfile.TemporaryDirectory() as directory:
+            log = make_backlog(os.path.join(directory, 'telemetry.log'), RECORDS)
+            hub = LocalIoTHub(latency=HUB_LATENCY, jitter=HUB_JITTER, failure_rate=FAILURE_RATE, seed=batch_size)
+            transmitter, seconds = asyncio.run(drain(log, hub, batch_size, max_in_flight))
+            metrics = transmitter.metrics()
+            delivered = len({message.data for _, _, message in hub.received})
+            assert metrics['queue_depth_bytes'] == 0 and delivered == RECORDS
+            print(f"{batch_size:>6} {max_in_flight:>10} {transmitter.sent / seconds:>9.1f} {seconds:>8.2f} "
+                  f"{metrics['retries']:>8} {metrics['queue_depth_bytes']:>5} {delivered:>10}")
+
+if __name__ == "__main__":
+    main()
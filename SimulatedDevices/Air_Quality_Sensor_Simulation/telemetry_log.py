@@ -0,0 +1,233 @@
+import json
+import os
+import threading
+import time
+
+# Size at which the active segment is closed and a new one started
+SEGMENT_BYTES = 1 << 20
+# Appended records are fsynced after this many records or this many seconds, whichever comes first
+FSYNC_RECORDS = 16
+FSYNC_SECONDS = 1.0
+# Consumers of the air quality sensor's log: the IoT Hub sender, the MongoDB loader and the
+# columnar telemetry store; every process opening that log must list all of them
+SENSOR_LOG_CONSUMERS = ('iothub', 'mongo', 'store')
+
+def segment_name(segment_id):
+    return f"{segment_id:012d}.jsonl"
+
+# Function to write a small file so readers see either the old or the new content, never half
+def write_atomic(path, content):
+    temporary_path = path + '.tmp'
+    with open(temporary_path, 'w') as file:
+        file.write(content)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary_path, path)
+
+class TelemetryLog:
+    """Append-only telemetry buffer stored as numbered JSONL segments in a directory.
+
+    Each record is one line, so an append writes only that line and a consumer reads only
+    the next line, whatever the size of the backlog. Every consumer keeps its own position
+    (segment, byte offset) in consumers/<name>.json; a segment is deleted once all the
+    consumers listed in `consumers` have moved past it.
+    """
+
+    def __init__(self, directory, consumers=('iothub',), segment_bytes=SEGMENT_BYTES,
+                 fsync_records=FSYNC_RECORDS, fsync_seconds=FSYNC_SECONDS):
+        self.directory = directory
+        self.consumer_names = list(consumers)
+        self.segment_bytes = segment_bytes
+        self.fsync_records = fsync_records
+        self.fsync_seconds = fsync_seconds
+        self.lock = threading.Lock()
+        self._file = None  # Opened on the first append, so read-only users never touch the segments
+        self._segment_id = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        os.makedirs(os.path.join(directory, 'consumers'), exist_ok=True)
+
+    def segment_path(self, segment_id):
+        return os.path.join(self.directory, segment_name(segment_id))
+
+    def segment_ids(self):
+        return sorted(int(name[:-len('.jsonl')]) for name in os.listdir(self.directory) if name.endswith('.jsonl'))
+
+    def _open_active(self):
+        segment_ids = self.segment_ids()
+        self._segment_id = segment_ids[-1] if segment_ids else 1
+        path = self.segment_path(self._segment_id)
+        if os.path.exists(path):
+            # A crash can leave half a line at the end: cut the segment back to the last full record
+            with open(path, 'rb+') as file:
+                content = file.read()
+                end = content.rfind(b'\n') + 1
+                if end != len(content):
+                    print(f"Dropping {len(content) - end} bytes of an incomplete record at the end of {path}")
+                    file.truncate(end)
+        self._file = open(path, 'ab')
+
+    def _rotate(self):
+        self._sync()
+        self._file.close()
+        self._segment_id += 1
+        self._file = open(self.segment_path(self._segment_id), 'ab')
+
+    def _sync(self):
+        if self._unsynced:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def append(self, record):
+        line = (json.dumps(record) + '\n').encode('utf-8')
+        with self.lock:
+            if self._file is None:
+                self._open_active()
+            elif self._file.tell() >= self.segment_bytes:
+                self._rotate()
+            self._file.write(line)
+            # Flush so consumers in this or another process can read the record right away
+            self._file.flush()
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_records or time.monotonic() - self._last_sync >= self.fsync_seconds:
+                self._sync()
+
+    def sync(self):
+        with self.lock:
+            if self._file is not None:
+                self._sync()
+
+    def close(self):
+        with self.lock:
+            if self._file is not None:
+                self._sync()
+                self._file.close()
+                self._file = None
+
+    def consumer(self, name):
+        if name not in self.consumer_names:
+            raise ValueError(f"Unknown consumer {name!r}; the log was opened for {self.consumer_names}")
+        return LogConsumer(self, name)
+
+    def read_position(self, name):
+        path = os.path.join(self.directory, 'consumers', f"{name}.json")
+        if not os.path.exists(path):
+            segment_ids = self.segment_ids()
+            return (segment_ids[0] if segment_ids else 1), 0
+        with open(path, 'r') as file:
+            position = json.load(file)
+        return position['segment'], position['offset']
+
+    def write_position(self, name, segment_id, offset):
+        path = os.path.join(self.directory, 'consumers', f"{name}.json")
+        write_atomic(path, json.dumps({'segment': segment_id, 'offset': offset}))
+
+    def compact(self):
+        """Delete the segments every consumer has finished. Returns the number deleted."""
+        oldest_needed = min(self.read_position(name)[0] for name in self.consumer_names)
+        deleted = 0
+        for segment_id in self.segment_ids():
+            if segment_id >= oldest_needed:
+                break
+            try:
+                os.remove(self.segment_path(segment_id))
+                deleted += 1
+            except FileNotFoundError:
+                pass  # Already removed by another process compacting the same log
+        return deleted
+
+# Function to carry over the records still waiting in an old JSON array buffer file
+def import_json_array(log, path):
+    with open(path, 'r') as file:
+        records = json.load(file)
+    for record in records:
+        log.append(record)
+    log.sync()
+    return len(records)
+
+class LogConsumer:
+    """Reads records in order from a TelemetryLog; the position only advances on commit().
+
+    Records read but not committed are read again after a restart (at-least-once delivery).
+    """
+
+    def __init__(self, log, name):
+        self.log = log
+        self.name = name
+        self.segment_id, self.offset = log.read_position(name)
+        self._read_segment, self._read_offset = self.segment_id, self.offset
+        self._file = None
+        # Totals over everything read, used to turn a byte backlog into a record estimate
+        self.records_read = 0
+        self.bytes_read = 0
+
+    def _open(self):
+        path = self.log.segment_path(self._read_segment)
+        if not os.path.exists(path):
+            return False
+        self._file = open(path, 'rb')
+        self._file.seek(self._read_offset)
+        return True
+
+    def read(self, max_records=1):
+        """Return up to max_records records after the last one read."""
+        records = []
+        while len(records) < max_records:
+            if self._file is None and not self._open():
+                break
+            line = self._file.readline()
+            if not line.endswith(b'\n'):
+                # End of this segment: move on only once the writer has started the next one
+                self._file.seek(self._read_offset)  # Re-read a line that is still being written
+                next_segment = self._read_segment + 1
+                if not os.path.exists(self.log.segment_path(next_segment)):
+                    break
+                # The writer finishes a segment before creating the next one, so look once more
+                line = self._file.readline()
+                if not line.endswith(b'\n'):
+                    self._file.close()
+                    self._file = None
+                    self._read_segment, self._read_offset = next_segment, 0
+                    continue
+            self._read_offset += len(line)
+            self.records_read += 1
+            self.bytes_read += len(line)
+            records.append(json.loads(line))
+        return records
+
+    def lag_bytes(self):
+        """Bytes appended after the committed position (one stat per remaining segment)."""
+        lag = 0
+        segment_id = self.segment_id
+        offset = self.offset
+        while True:
+            try:
+                lag += os.path.getsize(self.log.segment_path(segment_id)) - offset
+            except FileNotFoundError:
+                return lag
+            segment_id += 1
+            offset = 0
+
+    def commit(self):
+        """Persist the position after the records read so far and compact finished segments."""
+        if (self._read_segment, self._read_offset) == (self.segment_id, self.offset):
+            return
+        moved_segment = self._read_segment != self.segment_id
+        self.segment_id, self.offset = self._read_segment, self._read_offset
+        self.log.write_position(self.name, self.segment_id, self.offset)
+        if moved_segment:
+            self.log.compact()
+
+    def rewind(self):
+        """Forget the records read since the last commit, e.g. after a failed send."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._read_segment, self._read_offset = self.segment_id, self.offset
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,158 @@
+import asyncio
+import random
+import time
+from collections import deque
+
+# Records sent per batch, and how long a partial batch may wait for more records
+BATCH_SIZE = 50
+BATCH_INTERVAL = 2.0
+# Messages awaiting an acknowledgement from the hub at any moment
+MAX_IN_FLIGHT = 8
+# Attempts per message after the first one, with exponential backoff between them
+MAX_RETRIES = 5
+BACKOFF = 0.5
+BACKOFF_MAX = 30.0
+# How often the log is checked for new records when it is empty
+POLL_INTERVAL = 0.5
+# Window over which the send rate is computed
+RATE_WINDOW = 60.0
+
+class TelemetryTransmitter:
+    """Drains a telemetry log consumer into an async send function in bounded batches.
+
+    A batch is committed only when every message in it was acknowledged; when a message
+    still fails after MAX_RETRIES the consumer is rewound and the whole batch is sent
+    again later, so delivery is at-least-once.
+    """
+
+    def __init__(self, consumer, send, batch_size=BATCH_SIZE, batch_interval=BATCH_INTERVAL,
+                 max_in_flight=MAX_IN_FLIGHT, max_retries=MAX_RETRIES, backoff=BACKOFF,
+                 backoff_max=BACKOFF_MAX, poll_interval=POLL_INTERVAL, clock=time.monotonic, seed=None):
+        self.consumer = consumer
+        self.send = send
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self.rng = random.Random(seed)
+        self.running = False
+        self.in_flight = 0
+        self.sent = 0
+        self.retries = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self._sends = deque()  # (time, messages) per acknowledged batch, for the send rate
+        self.started = clock()
+
+    def backoff_delay(self, attempt):
+        # Full jitter keeps many devices that failed together from retrying together
+        return min(self.backoff_max, self.backoff * 2 ** attempt) * self.rng.uniform(0.5, 1.0)
+
+    async def _send_one(self, semaphore, record):
+        async with semaphore:
+            self.in_flight += 1
+            try:
+                for attempt in range(self.max_retries + 1):
+                    try:
+                        await self.send(record)
+                        return
+                    except Exception:
+                        if attempt == self.max_retries:
+                            raise
+                        self.retries += 1
+                        await asyncio.sleep(self.backoff_delay(attempt))
+            finally:
+                self.in_flight -= 1
+
+    async def next_batch(self, wait=True):
+        """Read up to batch_size records; with wait, give a partial batch batch_interval to fill."""
+        batch = self.consumer.read(self.batch_size)
+        first_seen = self.clock() if batch else None
+        while wait and self.running and len(batch) < self.batch_size:
+            if first_seen is not None and self.clock() - first_seen >= self.batch_interval:
+                break
+            await asyncio.sleep(self.poll_interval)
+            more = self.consumer.read(self.batch_size - len(batch))
+            if more and first_seen is None:
+                first_seen = self.clock()
+            batch += more
+        return batch
+
+    async def send_batch(self, batch):
+        """Send one batch with at most max_in_flight messages outstanding. Returns True if all were sent."""
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        results = await asyncio.gather(*(self._send_one(semaphore, record) for record in batch),
+                                       return_exceptions=True)
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors:
+            self.failed_batches += 1
+            self.consumer.rewind()
+            print(f"Batch of {len(batch)} failed ({len(errors)} messages after retries): {errors[0]}")
+            return False
+        self.consumer.commit()
+        self.sent += len(batch)
+        self.batches += 1
+        self._sends.append((self.clock(), len(batch)))
+        return True
+
+    async def drain(self):
+        """Send everything currently in the log, then return the number of messages sent."""
+        sent_before = self.sent
+        failures = 0
+        while True:
+            batch = await self.next_batch(wait=False)
+            if not batch:
+                break
+            if not await self.send_batch(batch):
+                failures += 1
+                if failures > self.max_retries:
+                    break  # The hub stays unreachable: leave the rest for the next drain
+                await asyncio.sleep(self.backoff_delay(failures))
+        return self.sent - sent_before
+
+    async def run(self, report_interval=None):
+        """Send batches until stop() is called, printing the metrics every report_interval seconds."""
+        self.running = True
+        failures = 0
+        last_report = self.clock()
+        while self.running:
+            batch = await self.next_batch()
+            if batch:
+                if await self.send_batch(batch):
+                    failures = 0
+                else:
+                    failures += 1
+                    await asyncio.sleep(self.backoff_delay(failures))
+            if report_interval and self.clock() - last_report >= report_interval:
+                print(f"Transmitter metrics: {self.metrics()}")
+                last_report = self.clock()
+
+    def stop(self):
+        self.running = False
+
+    def send_rate(self):
+        now = self.clock()
+        while self._sends and now - self._sends[0][0] > RATE_WINDOW:
+            self._sends.popleft()
+        elapsed = min(RATE_WINDOW, now - self.started)
+        if not self._sends or elapsed <= 0:
+            return 0.0
+        return sum(count for _, count in self._sends) / elapsed
+
+    def metrics(self):
+        lag_bytes = self.consumer.lag_bytes()
+        record_bytes = self.consumer.bytes_read / self.consumer.records_read if self.consumer.records_read else None
+        return {
+            "queue_depth_bytes": lag_bytes,
+            "queue_depth_records": round(lag_bytes / record_bytes) if record_bytes else None,
+            "in_flight": self.in_flight,
+            "sent": self.sent,
+            "batches": self.batches,
+            "retries": self.retries,
+            "failed_batches": self.failed_batches,
+            "send_rate": round(self.send_rate(), 3)
+        }
@@ -1,70 +1,144 @@
 import cv2
 import json
 import threading
-import random
+import queue
 import time
+import os
+import argparse
+import multiprocessing
+import numpy as np
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from multiprocessing import shared_memory
+from vehicle_counter import VehicleCounter
+
+# Frames of one source that can wait in shared memory for a worker at the same time
+FRAMES_IN_FLIGHT = 4
 
-# Initialize shared data structure with a dictionary
-camera_data = {
-    "camera_id": "Cam1",
-    "location": "Intersection A",
-    "vehicle_count": 0,
-    "timestamp": None
-}
 data_lock = threading.Lock()  # Lock for thread-safe access to shared data
 
+# Function to create the shared data structure of one camera
+def make_camera_data(index):
+    return {
+        "camera_id": f"Cam{index + 1}",
+        "location": f"Intersection {chr(ord('A') + index)}",
+        "vehicle_count": 0,
+        "timestamp": None
+    }
+
 # Function to get the current timestamp in the desired format
 def get_current_timestamp():
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-# Simulate vehicle counting (replace with actual vehicle detection logic)
-def count_vehicles(frame):
-    # Placeholder: return a random count or process frame to count vehicles
-    return random.randint(0, 20)  # Random count for demonstration
+# Worker process state: the cascade is loaded once, shared memory blocks are attached once
+_worker_counter = None
+_worker_blocks = {}
+
+def _init_worker(counter_settings):
+    global _worker_counter
+    cv2.setNumThreads(1)  # Parallelism comes from the processes
+    _worker_counter = VehicleCounter(**counter_settings)
+
+# Count vehicles in a frame that the parent process left in shared memory
+def count_vehicles(task):
+    block_name, slot, shape, dtype = task
+    block = _worker_blocks.get(block_name)
+    if block is None:
+        block = _worker_blocks[block_name] = shared_memory.SharedMemory(name=block_name)
+    frames = np.ndarray((FRAMES_IN_FLIGHT,) + shape, dtype=dtype, buffer=block.buf)
+    return _worker_counter.count(frames[slot])
 
-# Function to process frames from a camera
-def process_camera(camera_data, video_source):
+# Function to process frames from a camera: frames are read here and counted in the process pool
+def process_camera(camera_data, video_source, pool, stats):
     cap = cv2.VideoCapture(video_source)
     if not cap.isOpened():
         print(f"Error opening video source: {video_source}")
         return
 
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break  # Exit loop if no frame is captured
+    ret, frame = cap.read()
+    if not ret:
+        cap.release()
+        return
 
-        # Process frame to count vehicles
-        vehicle_count = count_vehicles(frame)
+    # One shared memory slot per in-flight frame; workers read the pixels in place instead of unpickling them
+    block = shared_memory.SharedMemory(create=True, size=FRAMES_IN_FLIGHT * frame.nbytes)
+    frames = np.ndarray((FRAMES_IN_FLIGHT,) + frame.shape, dtype=frame.dtype, buffer=block.buf)
+    free_slots = queue.Queue()
+    for slot in range(FRAMES_IN_FLIGHT):
+        free_slots.put(slot)
+    pending = deque()
 
+    def publish(vehicle_count):
         # Update camera data safely
         with data_lock:
             camera_data["vehicle_count"] = vehicle_count
             camera_data["timestamp"] = get_current_timestamp()
+            stats["frames"] += 1
 
-        # Simulate a delay for processing each frame
-        time.sleep(1)
-
-    cap.release()
+    try:
+        while ret:
+            if frame.shape != frames.shape[1:]:
+                print(f"Skipping a frame of {video_source} with a different size: {frame.shape}")
+            else:
+                slot = free_slots.get()  # Waits while FRAMES_IN_FLIGHT frames are still being counted
+                frames[slot] = frame
+                future = pool.submit(count_vehicles, (block.name, slot, frame.shape, frame.dtype.str))
+                future.add_done_callback(lambda _, slot=slot: free_slots.put(slot))
+                pending.append(future)
+            # Results are published in frame order
+            while pending and pending[0].done():
+                publish(pending.popleft().result())
+            ret, frame = cap.read()
+        while pending:
+            publish(pending.popleft().result())
+    finally:
+        for future in pending:
+            future.cancel()
+        cap.release()
+        del frames
+        block.close()
+        block.unlink()
 
 # Function to save data to JSON file
 def save_to_json(camera_data, filename):
     with open(filename, 'w') as f:
         json.dump(camera_data, f, indent=4)
 
+# Count vehicles on every source in parallel; returns aggregate frame statistics
+def process_cameras(cameras, video_sources, workers=None, counter_settings=None):
+    stats = {"frames": 0}
+    started = time.perf_counter()
+    # Spawned, not forked: forking while the reader threads are inside OpenCV can deadlock the workers
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker, initargs=(counter_settings or {},)) as pool:
+        threads = [threading.Thread(target=process_camera, args=(camera_data, source, pool, stats))
+                   for camera_data, source in zip(cameras, video_sources)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    seconds = time.perf_counter() - started
+    stats["seconds"] = seconds
+    stats["fps"] = stats["frames"] / seconds if seconds > 0 else 0.0
+    return stats
+
 # Main function
 def main():
-    # Start the camera processing thread
-    camera_thread = threading.Thread(target=process_camera, args=(camera_data, "video.mp4"))
-    camera_thread.start()
+    parser = argparse.ArgumentParser(description="Count vehicles on one or more video sources.")
+    parser.add_argument('sources', nargs='*', default=["video.mp4"], help="Video files or stream URLs")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Counting processes")
+    parser.add_argument('--output', default="camera_data.json")
+    args = parser.parse_args()
 
-    # Wait for the camera thread to finish
-    camera_thread.join()
+    cameras = [make_camera_data(index) for index in range(len(args.sources))]
+    stats = process_cameras(cameras, args.sources, args.workers)
+    print(f"Processed {stats['frames']} frames from {len(args.sources)} sources in {stats['seconds']:.2f} s "
+          f"({stats['fps']:.1f} frames/s)")
 
-    # Save the final data to a JSON file
-    save_to_json(camera_data, "camera_data.json")
-    print("Camera data saved to camera_data.json")
+    # Save the final data to a JSON file (a single camera keeps the original one-object format)
+    save_to_json(cameras[0] if len(cameras) == 1 else cameras, args.output)
+    print(f"Camera data saved to {args.output}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,47 @@
+import os
+import cv2
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+# OpenCV Haar cascade XML shipped with the repo (the file name is historical)
+CASCADE_FILE = os.path.join(ROOT_DIR, 'yolov3_weights.txt')
+
+# Frames wider than this are downscaled before detection
+DETECT_WIDTH = 640
+# detectMultiScale parameters: pyramid step, overlapping hits needed per vehicle, smallest window
+SCALE_FACTOR = 1.1
+MIN_NEIGHBORS = 4
+MIN_SIZE = (60, 20)  # The cascade's own training window
+
+# Function to turn a frame into the equalized grayscale image the cascade runs on
+def preprocess(frame, detect_width=DETECT_WIDTH):
+    """Return (image, scale) where scale maps image coordinates back to the frame."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    scale = 1.0
+    if gray.shape[1] > detect_width:
+        scale = detect_width / gray.shape[1]
+        size = (detect_width, max(1, int(round(gray.shape[0] * scale))))
+        gray = cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+    return cv2.equalizeHist(gray), scale
+
+class VehicleCounter:
+    """Counts vehicles in frames with the bundled Haar cascade."""
+
+    def __init__(self, cascade_file=CASCADE_FILE, detect_width=DETECT_WIDTH, scale_factor=SCALE_FACTOR,
+                 min_neighbors=MIN_NEIGHBORS, min_size=MIN_SIZE):
+        self.cascade = cv2.CascadeClassifier(cascade_file)
+        if self.cascade.empty():
+            raise ValueError(f"Could not load the Haar cascade from {cascade_file}")
+        self.detect_width = detect_width
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = tuple(min_size)
+
+    def detect(self, frame):
+        """Return the vehicle boxes (x1, y1, x2, y2) in frame coordinates."""
+        image, scale = preprocess(frame, self.detect_width)
+        boxes = self.cascade.detectMultiScale(image, scaleFactor=self.scale_factor,
+                                              minNeighbors=self.min_neighbors, minSize=self.min_size)
+        return [(x / scale, y / scale, (x + w) / scale, (y + h) / scale) for x, y, w, h in boxes]
+
+    def count(self, frame):
+        return len(self.detect(frame))
@@ -0,0 +1,201 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+DEFAULT_PROFILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fleet_profile.json')
+
+ROAD_CONDITIONS = ["dry", "wet", "icy"]
+TRAFFIC_LIGHT_STATES = ["Red", "Green"]
+
+# The timestamp only changes once a second, so it is formatted once a second
+_timestamp_second = None
+_timestamp_text = None
+
+def current_timestamp():
+    global _timestamp_second, _timestamp_text
+    second = int(time.time())
+    if second != _timestamp_second:
+        _timestamp_second = second
+        _timestamp_text = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(second))
+    return _timestamp_text
+
+# Telemetry of each device type, in the format of the standalone simulator scripts
+def speed_data(rng, sequence):
+    return {"speed": rng.randint(30, 80)}
+
+def road_condition_data(rng, sequence):
+    return {"road_condition": rng.choice(ROAD_CONDITIONS)}
+
+def air_quality_data(rng, sequence):
+    return {"co": round(rng.uniform(0, 10), 1), "no2": round(rng.uniform(0, 50), 1), "pm25": rng.randint(0, 150)}
+
+def traffic_light_data(rng, sequence):
+    return {"state": TRAFFIC_LIGHT_STATES[sequence % len(TRAFFIC_LIGHT_STATES)]}
+
+DEVICE_TYPES = {
+    "SpeedSensor": speed_data,
+    "RoadConditionSensor": road_condition_data,
+    "AirQualitySensor": air_quality_data,
+    "TrafficLight": traffic_light_data
+}
+
+class StdoutSink:
+    def __init__(self):
+        self.stream = sys.stdout
+
+    async def send(self, device_id, body):
+        self.stream.write(body + '\n')
+
+    async def close(self):
+        self.stream.flush()
+
+class FileSink:
+    """Appends one JSON message per line; writes go through a large buffer."""
+
+    def __init__(self, path):
+        self.file = open(path, 'a', buffering=1 << 20)
+
+    async def send(self, device_id, body):
+        self.file.write(body + '\n')
+
+    async def close(self):
+        self.file.close()
+
+class LocalHubSink:
+    """Sends through one local_iot_hub device client per virtual device."""
+
+    def __init__(self, hub):
+        if ROOT_DIR not in sys.path:
+            sys.path.insert(0, ROOT_DIR)
+        from local_iot_hub import Message
+        self.message_type = Message
+        self.hub = hub
+        self.clients = {}
+
+    async def send(self, device_id, body):
+        client = self.clients.get(device_id)
+        if client is None:
+            client = self.clients[device_id] = self.hub.create_device_client(device_id)
+            await client.connect()
+        message = self.message_type(body, content_encoding="utf-8", content_type="application/json")
+        await client.send_message(message)
+
+    async def close(self):
+        for client in self.clients.values():
+            await client.shutdown()
+
+# Function to build the sink named in the profile or on the command line
+def make_sink(settings):
+    kind = settings.get("type", "stdout")
+    if kind == "stdout":
+        return StdoutSink()
+    if kind == "file":
+        return FileSink(settings.get("path", "fleet_telemetry.jsonl"))
+    if kind == "local_hub":
+        if ROOT_DIR not in sys.path:
+            sys.path.insert(0, ROOT_DIR)
+        from local_iot_hub import LocalIoTHub
+        hub = LocalIoTHub(latency=settings.get("latency", 0.0), jitter=settings.get("jitter", 0.0),
+                          failure_rate=settings.get("failure_rate", 0.0))
+        return LocalHubSink(hub)
+    raise ValueError(f"Unknown sink type: {kind!r} (use stdout, file or local_hub)")
+
+def load_profile(path):
+    with open(path, 'r') as file:
+        profile = json.load(file)
+    unknown = [name for name in profile.get("devices", {}) if name not in DEVICE_TYPES]
+    if unknown:
+        raise ValueError(f"Unknown device types in {path}: {unknown}")
+    return profile
+
+class FleetStats:
+    def __init__(self):
+        self.sent = {name: 0 for name in DEVICE_TYPES}
+        self.errors = 0
+        self.max_lag = 0.0  # Largest delay behind a device's schedule, in seconds
+
+    def total(self):
+        return sum(self.sent.values())
+
+# One virtual device: sends on a fixed schedule until stop_at (loop time)
+async def run_device(device_type, index, interval, sink, stop_at, stats, rng):
+    loop = asyncio.get_running_loop()
+    device_id = f"{device_type}-{index:05d}"
+    make_data = DEVICE_TYPES[device_type]
+    sequence = 0
+    # Start at a random point of the interval so the fleet does not send in lockstep
+    next_send = loop.time() + rng.uniform(0, interval)
+    while next_send < stop_at:
+        delay = next_send - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            stats.max_lag = max(stats.max_lag, -delay)
+        body = json.dumps({
+            "sensorType": device_type,
+            "deviceId": device_id,
+            "timestamp": current_timestamp(),
+            "data": make_data(rng, sequence)
+        })
+        try:
+            await sink.send(device_id, body)
+            stats.sent[device_type] += 1
+        except Exception:
+            stats.errors += 1
+        sequence += 1
+        next_send += interval
+
+# Run every device of the profile for duration seconds; intervals are divided by speedup
+async def run_fleet(profile, sink, duration, speedup=1.0, seed=0):
+    loop = asyncio.get_running_loop()
+    stats = FleetStats()
+    rng = random.Random(seed)
+    stop_at = loop.time() + duration
+    tasks = []
+    for device_type, settings in profile["devices"].items():
+        interval = settings["interval"] / speedup
+        for index in range(settings["count"]):
+            tasks.append(asyncio.create_task(run_device(
+                device_type, index, interval, sink, stop_at, stats, random.Random(rng.random()))))
+    started = time.perf_counter()
+    await asyncio.gather(*tasks)
+    seconds = time.perf_counter() - started
+    await sink.close()
+    return stats, seconds
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate a fleet of sensors and traffic lights in one process.")
+    parser.add_argument('--profile', default=DEFAULT_PROFILE, help="JSON with device counts and send intervals")
+    parser.add_argument('--sink', choices=['stdout', 'file', 'local_hub'], help="Overrides the sink of the profile")
+    parser.add_argument('--output', help="Output file for the file sink")
+    parser.add_argument('--duration', type=float, help="Seconds to run (overrides the profile)")
+    parser.add_argument('--speedup', type=float, default=1.0, help="Divide every send interval by this factor")
+    args = parser.parse_args()
+
+    profile = load_profile(args.profile)
+    sink_settings = dict(profile.get("sink", {}))
+    if args.sink:
+        sink_settings["type"] = args.sink
+    if args.output:
+        sink_settings["path"] = args.output
+    duration = args.duration if args.duration is not None else profile.get("duration", 60)
+
+    devices = sum(settings["count"] for settings in profile["devices"].values())
+    expected = sum(settings["count"] * args.speedup / settings["interval"] for settings in profile["devices"].values())
+    print(f"Simulating {devices} devices for {duration} s, about {expected:.0f} messages/s "
+          f"into the {sink_settings.get('type', 'stdout')} sink.", file=sys.stderr)
+
+    stats, seconds = asyncio.run(run_fleet(profile, make_sink(sink_settings), duration, args.speedup))
+    print(f"Sent {stats.total()} messages in {seconds:.2f} s ({stats.total() / seconds:.0f} messages/s), "
+          f"{stats.errors} errors, max schedule lag {stats.max_lag * 1000:.1f} ms.", file=sys.stderr)
+    for device_type, count in stats.sent.items():
+        if count:
+            print(f"  {device_type}: {count}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+from command_dispatcher import CommandDispatcher
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, ROOT_DIR)
+from local_iot_hub import LocalIoTHub
+
+INTERSECTIONS = 200
+ROUNDS = 10
+# Share of the lights that change between two rounds
+CHANGE_RATE = 0.1
+HUB_LATENCY = 0.01
+HUB_JITTER = 0.005
+
+def desired_rounds(intersections, rounds, change_rate, seed=0):
+    rng = np.random.default_rng(seed)
+    states = rng.random(intersections) < 0.5
+    for _ in range(rounds):
+        states = states ^ (rng.random(intersections) < change_rate)
+        yield {f"Intersection {index}": 'Green' if green else 'Red' for index, green in enumerate(states)}
+
+# The old main.py: a new registry manager and the full status for every message, one device after another
+def full_sequential(hub, rounds):
+    latencies = []
+    for desired in rounds:
+        for name, state in desired.items():
+            registry_manager = hub.create_registry_manager()
+            message = json.dumps({"intersection_status": [{"name": name, "state": state}]})
+            started = time.perf_counter()
+            registry_manager.send_c2d_message(name, message)
+            latencies.append(time.perf_counter() - started)
+    return np.array(latencies) * 1000
+
+def dispatched(hub, rounds, max_in_flight):
+    names = None
+    dispatcher = None
+    for desired in rounds:
+        if dispatcher is None:
+            names = list(desired)
+            dispatcher = CommandDispatcher(hub.create_registry_manager(), devices={name: name for name in names},
+                                           max_in_flight=max_in_flight)
+        dispatcher.dispatch(desired)
+    dispatcher.close()
+    return np.array(dispatcher.send_latencies) * 1000
+
+def device_states(hub):
+    """Light state each device ends up with after applying its messages in order."""
+    states = {}
+    for _, _, message in sorted(((enqueued, device_id, message) for device_id, queue in hub.c2d_queues.items()
+                                 for enqueued, message in queue), key=lambda entry: entry[0]):
+        for status in json.loads(message.data)["intersection_status"]:
+            states[status["name"]] = status["state"]
+    return states
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-message full-status commands with the delta dispatcher.")
+    parser.add_argument('--intersections', type=int, default=INTERSECTIONS)
+    parser.add_argument('--rounds', type=int, default=ROUNDS)
+    parser.add_argument('--change-rate', type=float, default=CHANGE_RATE)
+    parser.add_argument('--latency', type=float, default=HUB_LATENCY)
+    args = parser.parse_args()
+
+    final = list(desired_rounds(args.intersections, args.rounds, args.change_rate))[-1]
+    runs = [("full status, sequential", lambda hub, rounds: full_sequential(hub, rounds))]
+    runs += [(f"delta dispatcher, {n} in flight", lambda hub, rounds, n=n: dispatched(hub, rounds, n)) for n in (1, 8, 32)]
+    print(f"{'sender':<32} {'messages':>9} {'bytes':>9} {'seconds':>8} {'p50 ms':>7} {'p99 ms':>7}")
+    for name, run in runs:
+        hub = LocalIoTHub(latency=args.latency, jitter=HUB_JITTER)
+        started = time.perf_counter()
+        latencies = run(hub, desired_rounds(args.intersections, args.rounds, args.change_rate))
+        seconds = time.perf_counter() - started
+        assert device_states(hub) == final  # Every device ends in the desired state
+        payload = sum(len(message.data) for queue in hub.c2d_queues.values() for _, message in queue)
+        print(f"{name:<32} {len(latencies):>9} {payload:>9} {seconds:>8.2f} "
+              f"{np.percentile(latencies, 50):>7.2f} {np.percentile(latencies, 99):>7.2f}")
+
+if __name__ == "__main__":
+    main()
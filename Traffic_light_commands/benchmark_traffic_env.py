@@ -0,0 +1,52 @@
+import argparse
+import time
+import numpy as np
+from traffic_env import TrafficEnv, VectorTrafficEnv
+
+STEPS = 2000
+# (environments, intersections) pairs to time
+SIZES = [(1, 4), (64, 4), (1024, 4), (1024, 32)]
+
+def scalar_rollout(envs, actions):
+    """Step a list of TrafficEnv one at a time, the way training did before VectorTrafficEnv."""
+    observations, rewards = [], []
+    for env, action in zip(envs, actions):
+        observation, reward, _, _ = env.step(action)
+        observations.append(observation)
+        rewards.append(reward)
+    return np.array(observations), np.array(rewards)
+
+def time_steps(step, actions):
+    started = time.perf_counter()
+    for batch in actions:
+        step(batch)
+    return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare TrafficEnv and VectorTrafficEnv steps per second.")
+    parser.add_argument('--steps', type=int, default=STEPS)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'envs':>6} {'lights':>7} {'scalar steps/s':>15} {'vector steps/s':>15} {'speedup':>8}")
+    for num_envs, num_intersections in SIZES:
+        actions = rng.integers(0, num_intersections, size=(args.steps, num_envs))
+        envs = [TrafficEnv(num_intersections, optimal_route=None) for _ in range(num_envs)]
+        vector_env = VectorTrafficEnv(num_envs, num_intersections)
+
+        # Both must agree before their speed is compared
+        expected = scalar_rollout(envs, actions[0])
+        observations, rewards, _, _ = vector_env.step(actions[0])
+        assert np.array_equal(observations, expected[0]) and np.array_equal(rewards, expected[1])
+
+        # The scalar loop gets fewer steps so large batches finish in reasonable time
+        scalar_steps = max(1, args.steps // num_envs)
+        scalar_seconds = time_steps(lambda batch: scalar_rollout(envs, batch), actions[:scalar_steps])
+        vector_seconds = time_steps(vector_env.step, actions)
+        scalar_rate = scalar_steps * num_envs / scalar_seconds
+        vector_rate = args.steps * num_envs / vector_seconds
+        print(f"{num_envs:>6} {num_intersections:>7} {scalar_rate:>15.0f} {vector_rate:>15.0f} "
+              f"{vector_rate / scalar_rate:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import argparse
+import time
+import numpy as np
+from traffic_microsim import QueueSimulation, load_intersection_data
+
+SIMULATED_SECONDS = 600
+# Lights change every this many simulated seconds
+SWITCH_INTERVAL = 10
+SIZES = [4, 1000, 10000, 100000]
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure simulated seconds per wall second of the queue microsimulation.")
+    parser.add_argument('--seconds', type=int, default=SIMULATED_SECONDS, help="Simulated seconds per run")
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help="Intersection counts")
+    args = parser.parse_args()
+
+    records = load_intersection_data()
+    rng = np.random.default_rng(0)
+    print(f"{'intersections':>13} {'sim s/wall s':>13} {'intersection-s/wall s':>22} {'queued':>9}")
+    for size in args.sizes:
+        simulation = QueueSimulation.from_data(size, records, seed=0)
+        started = time.perf_counter()
+        for _ in range(args.seconds // SWITCH_INTERVAL):
+            simulation.set_lights(rng.random(size) < 0.5)
+            simulation.advance(SWITCH_INTERVAL)
+        seconds = time.perf_counter() - started
+        rate = simulation.time / seconds
+        print(f"{size:>13} {rate:>13.0f} {rate * size:>22.3g} {simulation.queued().mean():>9.1f}")
+
+if __name__ == "__main__":
+    main()
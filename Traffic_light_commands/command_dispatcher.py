@@ -0,0 +1,105 @@
+import json
+import os
+import time
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Devices sent to at the same time
+MAX_IN_FLIGHT = 8
+# Send times kept for the latency statistics
+LATENCY_WINDOW = 1000
+
+class CommandDispatcher:
+    """Sends traffic light changes to intersection devices through one registry manager.
+
+    The desired state of every intersection is compared with the last state sent to its
+    device, and only the changes are sent: one message per device, with up to max_in_flight
+    devices in flight at a time. A change counts as sent once the hub accepts the message
+    (send_c2d_message returns); nothing confirms that the device received or applied it,
+    since the devices send no reply. A send that fails leaves the old state recorded, so
+    the change goes out again with the next dispatch.
+    """
+
+    def __init__(self, registry_manager, devices=None, default_device=None, max_in_flight=MAX_IN_FLIGHT,
+                 state_file=None):
+        self.registry_manager = registry_manager
+        self.devices = devices or {}  # Intersection name -> device id
+        self.default_device = default_device
+        self.max_in_flight = max_in_flight
+        self.state_file = state_file
+        self.sent_states = self.load_state()  # Intersection name -> last state the hub accepted
+        self.send_latencies = deque(maxlen=LATENCY_WINDOW)  # Seconds each send_c2d_message call took
+        self.sent = 0
+        self.failed = 0
+        self.pool = ThreadPoolExecutor(max_workers=max_in_flight)
+
+    def load_state(self):
+        if self.state_file and os.path.exists(self.state_file):
+            with open(self.state_file, 'r') as file:
+                return json.load(file)
+        return {}
+
+    def save_state(self):
+        if not self.state_file:
+            return
+        temporary_path = self.state_file + '.tmp'
+        with open(temporary_path, 'w') as file:
+            json.dump(self.sent_states, file, indent=4)
+        os.replace(temporary_path, self.state_file)
+
+    def device_for(self, intersection):
+        device_id = self.devices.get(intersection, self.default_device)
+        if device_id is None:
+            raise ValueError(f"No device is configured for {intersection}")
+        return device_id
+
+    def pending_changes(self, desired):
+        """The entries of desired (intersection -> state) that differ from the last state sent."""
+        return {name: state for name, state in desired.items() if self.sent_states.get(name) != state}
+
+    def _send(self, device_id, changes):
+        message = json.dumps({
+            "intersection_status": [{"name": name, "state": state} for name, state in changes.items()]
+        })
+        started = time.perf_counter()
+        self.registry_manager.send_c2d_message(device_id, message)
+        return time.perf_counter() - started
+
+    def dispatch(self, desired):
+        """Send the changes in desired to their devices. Returns the number of messages and changes sent."""
+        by_device = {}
+        for name, state in self.pending_changes(desired).items():
+            by_device.setdefault(self.device_for(name), {})[name] = state
+
+        futures = {device_id: self.pool.submit(self._send, device_id, changes) for device_id, changes in by_device.items()}
+        summary = {"messages": 0, "changes": 0, "failed": 0}
+        for device_id, future in futures.items():
+            try:
+                self.send_latencies.append(future.result())
+            except Exception as e:
+                print(f"Error sending message to {device_id}: {e}")
+                summary["failed"] += 1
+                continue
+            self.sent_states.update(by_device[device_id])
+            summary["messages"] += 1
+            summary["changes"] += len(by_device[device_id])
+        self.sent += summary["messages"]
+        self.failed += summary["failed"]
+        self.save_state()
+        return summary
+
+    def send_latency_stats(self):
+        """Time the recent send_c2d_message calls took until the hub accepted them, in milliseconds."""
+        if not self.send_latencies:
+            return {"count": 0, "p50_ms": None, "p99_ms": None, "mean_ms": None}
+        latencies = np.array(self.send_latencies) * 1000
+        return {
+            "count": len(latencies),
+            "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+            "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+            "mean_ms": round(float(latencies.mean()), 2)
+        }
+
+    def close(self):
+        self.pool.shutdown(wait=True)
@@ -2,6 +2,9 @@ import numpy as np
 import json
 from azure.iot.hub import IoTHubRegistryManager
 from traffic_env import TrafficEnv
+from q_learning_agent import QLearningAgent
+from traffic_microsim import QueueSimulation
+from command_dispatcher import CommandDispatcher
 
 # Function to load the connection string from a file
 def load_connection_string(filename="primary_connection_string.txt"):
@@ -13,45 +16,86 @@ def load_connection_string(filename="primary_connection_string.txt"):
 # Load the connection string
 CONNECTION_STRING = load_connection_string()
 DEVICE_ID = "RaspberryPi5"  # The device ID you registered in Azure IoT Hub
+# Intersections with a device of their own (name -> device ID); the others are sent to DEVICE_ID
+INTERSECTION_DEVICES = {}
+POLICY_FILE = "q_table.npy"  # Written by train.py
+STATE_FILE = "sent_lights.json"  # Light states last accepted by the hub for the devices
 
-def send_message_to_device(message):
+# Function to send the light states that changed since the last ones sent
+def send_light_states(desired_states):
     try:
-        # Create an IoT Hub registry manager
+        # One IoT Hub registry manager for all the messages
         registry_manager = IoTHubRegistryManager(CONNECTION_STRING)
+    except Exception as e:
+        print(f"Error connecting to IoT Hub: {e}")
+        return
 
-        # Send the message to the device
-        registry_manager.send_c2d_message(DEVICE_ID, message)
-
-        print(f"Message sent to device {DEVICE_ID}: {message}")
+    dispatcher = CommandDispatcher(registry_manager, devices=INTERSECTION_DEVICES, default_device=DEVICE_ID,
+                                   state_file=STATE_FILE)
+    try:
+        summary = dispatcher.dispatch(desired_states)
+    finally:
+        dispatcher.close()
+    print(f"Sent {summary['changes']} light changes in {summary['messages']} messages "
+          f"({summary['failed']} failed), send latency {dispatcher.send_latency_stats()}")
 
-    except Exception as e:
-        print(f"Error sending message: {e}")
+# Function to load the trained traffic light policy; None when there is no usable one
+def load_policy(env, path=POLICY_FILE):
+    try:
+        agent = QLearningAgent.load(path)
+    except (OSError, ValueError, EOFError) as e:
+        print(f"No usable policy in {path} ({e}); run train.py to create one.")
+        return None
+    if agent.num_intersections != env.num_intersections or agent.observation_size != env.observation_size:
+        print(f"The policy in {path} is for {agent.num_intersections} intersections, the route has {env.num_intersections}.")
+        return None
+    return agent
 
 # Load the optimal route from the JSON file
 with open("../AI_routing_algorithm/optimal_route_results.json", 'r') as file:
     optimal_route_data = json.load(file)
     optimal_route = optimal_route_data["optimal_route"]
 
-# Initialize the TrafficEnv environment
-env = TrafficEnv(num_intersections=len(optimal_route), optimal_route=optimal_route)
+# Initialize the TrafficEnv environment, with queues fed by the recorded traffic volumes
+simulation = QueueSimulation.from_data(len(optimal_route))
+env = TrafficEnv(num_intersections=len(optimal_route), optimal_route=optimal_route, simulation=simulation)
 
 # Reset the environment to get the initial state
 initial_state = env.reset()
 
-# Update traffic light states based on the optimal route
+agent = load_policy(env)
+
 intersection_status = []  # List of dictionaries
-for i, intersection in enumerate(optimal_route):
-    intersection_name = f"Intersection {chr(ord('A') + i)}"
-    intersection_status.append({"name": intersection_name, "state": 'Green'})
-    print(f"{intersection_name}: Green")
-    # Reset previous intersection to Red if not the first one
-    if i > 0:
-        previous_intersection_name = f"Intersection {chr(ord('A') + i - 1)}"
-        intersection_status.append({"name": previous_intersection_name, "state": 'Red'})
-        print(f"{previous_intersection_name}: Red")
-
-# Send the updated traffic light states to the device
-message = json.dumps({
-    "intersection_status": intersection_status  # List of dictionaries
-})
-send_message_to_device(message)
\ No newline at end of file
+if agent is not None:
+    # Let the learned policy pick the intersection to turn green from the simulated queues, one step per intersection on the route
+    observation = initial_state
+    green = None
+    for _ in optimal_route:
+        action = agent.greedy_action(observation)
+        observation, reward, done, _ = env.step(action)
+        if action == green:
+            continue
+        intersection_name = f"Intersection {chr(ord('A') + action)}"
+        intersection_status.append({"name": intersection_name, "state": 'Green'})
+        print(f"{intersection_name}: Green")
+        # Reset the previously green intersection to Red
+        if green is not None:
+            previous_intersection_name = f"Intersection {chr(ord('A') + green)}"
+            intersection_status.append({"name": previous_intersection_name, "state": 'Red'})
+            print(f"{previous_intersection_name}: Red")
+        green = action
+else:
+    # Update traffic light states based on the optimal route
+    for i, intersection in enumerate(optimal_route):
+        intersection_name = f"Intersection {chr(ord('A') + i)}"
+        intersection_status.append({"name": intersection_name, "state": 'Green'})
+        print(f"{intersection_name}: Green")
+        # Reset previous intersection to Red if not the first one
+        if i > 0:
+            previous_intersection_name = f"Intersection {chr(ord('A') + i - 1)}"
+            intersection_status.append({"name": previous_intersection_name, "state": 'Red'})
+            print(f"{previous_intersection_name}: Red")
+
+# Each intersection ends up in the last state given to it above; only changes are sent
+desired_states = {status["name"]: status["state"] for status in intersection_status}
+send_light_states(desired_states)
\ No newline at end of file
@@ -0,0 +1,84 @@
+import numpy as np
+
+# The Q-table has 2 ** observation_size rows, so the observation size is bounded
+MAX_OBSERVATION_BITS = 20
+LEARNING_RATE = 0.02
+DISCOUNT = 0.9
+EPSILON = 0.1
+
+class QLearningAgent:
+    """Tabular Q-learning over TrafficEnv observations.
+
+    An observation (observation_size 0/1 values, by default one light per intersection) is
+    encoded as the integer with those bits, which indexes a row of the dense Q-table; action i
+    turns intersection i Green. Action selection and updates work on whole batches of
+    environments at once.
+    """
+
+    def __init__(self, num_intersections, learning_rate=LEARNING_RATE, discount=DISCOUNT, epsilon=EPSILON,
+                 q_table=None, seed=None, observation_size=None):
+        observation_size = observation_size or num_intersections
+        if num_intersections < 1 or not 0 < observation_size <= MAX_OBSERVATION_BITS:
+            raise ValueError(f"Observations must have between 1 and {MAX_OBSERVATION_BITS} bits")
+        self.num_intersections = num_intersections
+        self.observation_size = observation_size
+        self.num_states = 2 ** observation_size
+        self.num_actions = num_intersections
+        self.learning_rate = learning_rate
+        self.discount = discount
+        self.epsilon = epsilon
+        self.rng = np.random.default_rng(seed)
+        if q_table is None:
+            q_table = np.zeros((self.num_states, self.num_actions), dtype=np.float32)
+        elif q_table.shape != (self.num_states, self.num_actions):
+            raise ValueError(f"Q-table shape {q_table.shape} does not match {num_intersections} intersections "
+                             f"and {observation_size} observation bits")
+        self.q_table = np.ascontiguousarray(q_table)  # Updates write through a flat view
+        self._bits = 1 << np.arange(observation_size, dtype=np.int64)
+
+    def encode(self, observations):
+        """State index of each observation row (or of a single observation)."""
+        return np.asarray(observations, dtype=np.int64) @ self._bits
+
+    def act(self, states, epsilon=None):
+        """Epsilon-greedy actions for a batch of states."""
+        epsilon = self.epsilon if epsilon is None else epsilon
+        states = np.atleast_1d(states)
+        actions = np.argmax(self.q_table[states], axis=1)
+        explore = self.rng.random(len(states)) < epsilon
+        actions[explore] = self.rng.integers(0, self.num_actions, size=int(explore.sum()))
+        return actions
+
+    def greedy_action(self, observation):
+        return int(np.argmax(self.q_table[self.encode(observation)]))
+
+    def update(self, states, actions, rewards, next_states, dones):
+        """Apply one batched TD(0) update; repeated (state, action) pairs move by their mean TD error.
+
+        Returns the visit count of each Q-table entry in the batch (flattened).
+        """
+        bootstrap = np.where(dones, 0.0, self.q_table[next_states].max(axis=1))
+        cells = states * self.num_actions + actions
+        td_errors = rewards + self.discount * bootstrap - self.q_table.ravel()[cells]
+        size = self.q_table.size
+        visits = np.bincount(cells, minlength=size)
+        totals = np.bincount(cells, weights=td_errors, minlength=size)
+        visited = visits > 0
+        self.q_table.ravel()[visited] += (self.learning_rate * totals[visited] / visits[visited]).astype(self.q_table.dtype)
+        return visits
+
+    def policy(self):
+        """Greedy action of every state."""
+        return np.argmax(self.q_table, axis=1)
+
+    def save(self, path):
+        # A plain float32 .npy file; the intersection count and observation size follow from its shape
+        np.save(path, self.q_table.astype(np.float32))
+
+    @classmethod
+    def load(cls, path, **options):
+        q_table = np.load(path, allow_pickle=False)
+        observation_size = int(q_table.shape[0]).bit_length() - 1 if q_table.ndim == 2 else 0
+        if q_table.ndim != 2 or q_table.shape[0] != 2 ** observation_size:
+            raise ValueError(f"{path} does not hold a Q-table")
+        return cls(q_table.shape[1], q_table=q_table.astype(np.float32), observation_size=observation_size, **options)
@@ -1,10 +1,23 @@
 import numpy as np
 
+# With a queue simulation: simulated seconds between decisions, and per episode
+DECISION_INTERVAL = 10.0
+EPISODE_SECONDS = 600.0
+
 class TrafficEnv:
-    def __init__(self, num_intersections, optimal_route):
+    def __init__(self, num_intersections, optimal_route, simulation=None, decision_interval=DECISION_INTERVAL,
+                 episode_seconds=EPISODE_SECONDS):
         self.num_intersections = num_intersections
         self.optimal_route = optimal_route  # List of intersections
         self.light_states = ['Red'] * num_intersections  # Initial light states: All red
+        # Optional traffic_microsim.QueueSimulation with num_intersections intersections. With it, a step
+        # runs decision_interval simulated seconds, the reward is minus the growth of the queued vehicles
+        # (info["waiting"] holds the vehicle-seconds waited), episodes last episode_seconds, and
+        # observations are the queue pressure bits followed by the light bits.
+        self.simulation = simulation
+        self.decision_interval = decision_interval
+        self.episode_seconds = episode_seconds
+        self.observation_size = num_intersections if simulation is None else 2 * num_intersections
         
         # Define the observation space and action space
         self.observation_space = np.array([0] * num_intersections)  # Example observation space
@@ -12,13 +25,24 @@ class TrafficEnv:
         
     def reset(self):
         self.light_states = ['Red'] * self.num_intersections
+        if self.simulation is not None:
+            self.simulation.reset()
         return self.get_observation()
     
     def step(self, action):
         self.update_traffic_lights(action)
-        reward = self.calculate_reward()
-        done = True  # Each step is a complete episode
-        return self.get_observation(), reward, done, {}
+        if self.simulation is None:
+            reward = self.calculate_reward()
+            done = True  # Each step is a complete episode
+            info = {}
+        else:
+            self.simulation.set_lights([state == 'Green' for state in self.light_states])
+            queued = self.simulation.queued().sum()
+            waiting = self.simulation.advance(self.decision_interval)
+            reward = -float(self.simulation.queued().sum() - queued)
+            done = self.simulation.time >= self.episode_seconds
+            info = {"waiting": float(waiting.sum())}
+        return self.get_observation(), reward, done, info
     
     def update_traffic_lights(self, action):
         for i in range(self.num_intersections):
@@ -30,7 +54,83 @@ class TrafficEnv:
         return reward
     
     def get_observation(self):
-        return np.array([1 if state == 'Green' else 0 for state in self.light_states])
+        lights = np.array([1 if state == 'Green' else 0 for state in self.light_states])
+        if self.simulation is not None:
+            return np.concatenate([self.simulation.pressure(), lights])
+        return lights
     
     def get_traffic_light_status(self):
-        return self.light_states
\ No newline at end of file
+        return self.light_states
+
+class VectorTrafficEnv:
+    """num_envs copies of TrafficEnv stepped together with one batched action array.
+
+    Light states are a (num_envs, num_intersections) int8 array, 1 for Green and 0 for Red;
+    observations, rewards and done flags are returned for all environments at once.
+    A simulation, as in TrafficEnv, must have num_envs * num_intersections intersections
+    (environment after environment); environments reset together when their episode ends.
+    """
+
+    def __init__(self, num_envs, num_intersections, optimal_route=None, simulation=None,
+                 decision_interval=DECISION_INTERVAL, episode_seconds=EPISODE_SECONDS):
+        self.num_envs = num_envs
+        self.num_intersections = num_intersections
+        self.optimal_route = optimal_route
+        self.light_states = np.zeros((num_envs, num_intersections), dtype=np.int8)
+        self.simulation = simulation
+        self.decision_interval = decision_interval
+        self.episode_seconds = episode_seconds
+        self.observation_size = num_intersections if simulation is None else 2 * num_intersections
+
+        self.observation_space = np.zeros(num_intersections, dtype=np.int8)
+        self.action_space = np.array([0, 1])
+
+        # Buffers reused by every step
+        self._intersections = np.arange(num_intersections)
+        self._green = np.zeros((num_envs, num_intersections), dtype=bool)
+        self._rewards = np.zeros(num_envs, dtype=np.int64)
+        self._dones = np.ones(num_envs, dtype=bool)
+
+    def reset(self):
+        self.light_states[:] = 0
+        if self.simulation is not None:
+            self.simulation.reset()
+        return self.get_observation()
+
+    def step(self, actions):
+        """actions holds the intersection turned Green in each environment (others turn Red)."""
+        self.update_traffic_lights(actions)
+        if self.simulation is None:
+            return self.get_observation(), self.calculate_reward(), self._dones.copy(), {}
+
+        self.simulation.set_lights(self._green.ravel())
+        queued = self._queued_per_env()
+        waiting = self.simulation.advance(self.decision_interval)
+        rewards = (queued - self._queued_per_env()).astype(np.float64)
+        done = self.simulation.time >= self.episode_seconds
+        if done:
+            self.reset()
+        info = {"waiting": waiting.reshape(self.num_envs, self.num_intersections).sum(axis=1)}
+        return self.get_observation(), rewards, np.full(self.num_envs, done), info
+
+    def _queued_per_env(self):
+        return self.simulation.queued().reshape(self.num_envs, self.num_intersections).sum(axis=1)
+
+    def update_traffic_lights(self, actions):
+        actions = np.asarray(actions).reshape(self.num_envs, 1)
+        np.equal(self._intersections, actions, out=self._green)
+        self.light_states[:] = self._green
+
+    def calculate_reward(self):
+        # Negative count of red lights per environment, as in TrafficEnv
+        np.sum(self.light_states, axis=1, dtype=np.int64, out=self._rewards)
+        return self._rewards - self.num_intersections
+
+    def get_observation(self):
+        if self.simulation is not None:
+            pressure = self.simulation.pressure(self.num_intersections).reshape(self.num_envs, self.num_intersections)
+            return np.concatenate([pressure, self.light_states], axis=1)
+        return self.light_states.copy()
+
+    def get_traffic_light_status(self):
+        return np.where(self.light_states == 1, 'Green', 'Red')
@@ -0,0 +1,112 @@
+import json
+import os
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INTERSECTION_DATA_FILE = os.path.join(BASE_DIR, '../AI_routing_algorithm/intersection_data.json')
+
+# Seconds per simulation tick
+TICK = 1.0
+# Vehicles per second one approach discharges on green (one every 2 s, about 1800 per hour)
+SATURATION_FLOW = 0.5
+# Seconds of green lost to start-up after an approach turns green
+LOST_TIME = 2.0
+# The recorded traffic_volume and vehicle_count are taken as vehicles per this many seconds
+VOLUME_PERIOD = 300.0
+# Approaches of every intersection: 0 runs along the route (green when the light is Green), 1 crosses it
+MAIN, CROSS = 0, 1
+
+# Function to load the recorded intersection data
+def load_intersection_data(path=INTERSECTION_DATA_FILE):
+    with open(path, 'r') as file:
+        return json.load(file)
+
+def arrival_rates(records, num_intersections):
+    """Vehicles per second on each approach of num_intersections intersections.
+
+    Recorded readings are assigned to intersections in turn: traffic_volume feeds the
+    route approach and vehicle_count the crossing one.
+    """
+    volumes = np.array([[record["traffic_volume"], record["vehicle_count"]] for record in records], dtype=np.float64)
+    return volumes[np.arange(num_intersections) % len(volumes)] / VOLUME_PERIOD
+
+class QueueSimulation:
+    """Time-stepped queues at the two approaches of many signalised intersections.
+
+    Each tick, Poisson arrivals join every queue and the approach that has green discharges
+    at the saturation flow once its start-up lost time has passed. All intersections
+    advance together on (num_intersections, 2) arrays.
+    """
+
+    def __init__(self, rates, saturation_flow=SATURATION_FLOW, lost_time=LOST_TIME, tick=TICK, seed=None):
+        self.rates = np.asarray(rates, dtype=np.float64)
+        self.num_intersections = len(self.rates)
+        self.saturation_flow = saturation_flow
+        self.lost_time = lost_time
+        self.tick = tick
+        self.rng = np.random.default_rng(seed)
+        self.queues = np.zeros((self.num_intersections, 2), dtype=np.int64)
+        self.main_green = np.zeros(self.num_intersections, dtype=bool)
+        self.reset()
+
+    @classmethod
+    def from_data(cls, num_intersections, records=None, **options):
+        records = records if records is not None else load_intersection_data()
+        return cls(arrival_rates(records, num_intersections), **options)
+
+    def reset(self):
+        self.time = 0.0
+        self.queues[:] = 0
+        self.main_green[:] = False
+        self.lost = np.full(self.num_intersections, self.lost_time)  # Start-up time left on the green approach
+        self.credit = np.zeros(self.num_intersections)  # Fractional discharge carried between ticks
+        self.arrived = 0
+        self.departed = 0
+
+    def set_lights(self, main_green):
+        """Give green to the route approach where main_green is True and to the crossing one elsewhere."""
+        main_green = np.asarray(main_green, dtype=bool)
+        switched = main_green != self.main_green
+        self.lost[switched] = self.lost_time
+        self.credit[switched] = 0.0
+        self.main_green[:] = main_green
+
+    def advance(self, seconds):
+        """Run the simulation for seconds; returns the vehicle-seconds of waiting per intersection."""
+        waiting = np.zeros(self.num_intersections)
+        rows = np.arange(self.num_intersections)
+        green = np.where(self.main_green, MAIN, CROSS)
+        for _ in range(max(1, int(round(seconds / self.tick)))):
+            arrivals = self.rng.poisson(self.rates * self.tick)
+            self.queues += arrivals
+            self.arrived += int(arrivals.sum())
+
+            # Green time left after start-up loss becomes discharge capacity
+            effective = np.clip(self.tick - self.lost, 0.0, self.tick)
+            self.lost = np.maximum(self.lost - self.tick, 0.0)
+            self.credit += effective * self.saturation_flow
+            green_queues = self.queues[rows, green]
+            departures = np.minimum(green_queues, np.floor(self.credit).astype(np.int64))
+            self.queues[rows, green] = green_queues - departures
+            self.credit -= departures
+            # Unused capacity is not banked while the queue is empty
+            np.minimum(self.credit, 1.0, out=self.credit, where=self.queues[rows, green] == 0)
+            self.departed += int(departures.sum())
+
+            waiting += self.queues.sum(axis=1) * self.tick
+            self.time += self.tick
+        return waiting
+
+    def queued(self):
+        """Vehicles waiting at each intersection."""
+        return self.queues.sum(axis=1)
+
+    def pressure(self, group_size=None):
+        """1 where the route queue exceeds the crossing queue by more than the average of the group.
+
+        Intersections form consecutive groups of group_size (default: one group of all), like
+        the intersections of one environment; comparing within a group keeps the bits informative
+        when every queue grows.
+        """
+        excess = (self.queues[:, MAIN] - self.queues[:, CROSS]).reshape(-1, group_size or self.num_intersections)
+        return (excess > excess.mean(axis=1, keepdims=True)).astype(np.int8).ravel()
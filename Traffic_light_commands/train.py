@@ -0,0 +1,120 @@
+import argparse
+import json
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from q_learning_agent import QLearningAgent
+from traffic_env import EPISODE_SECONDS, DECISION_INTERVAL, VectorTrafficEnv
+from traffic_microsim import QueueSimulation, load_intersection_data
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+POLICY_FILE = os.path.join(BASE_DIR, 'q_table.npy')
+ROUTE_FILE = os.path.join(BASE_DIR, '../AI_routing_algorithm/optimal_route_results.json')
+
+ROUNDS = 40
+# Per round, each worker steps ENVS environments through one simulated episode, learning on its own copy of the table
+ENVS = 256
+STEPS = int(EPISODE_SECONDS / DECISION_INTERVAL)
+EPSILON_START = 1.0
+EPSILON_END = 0.05
+
+# Function to read how many intersections the current optimal route has
+def route_length(path=ROUTE_FILE):
+    with open(path, 'r') as file:
+        return len(json.load(file)["optimal_route"])
+
+# Function to create environments whose queues are fed by the recorded traffic volumes
+def make_env(num_envs, num_intersections, records, seed=None):
+    simulation = QueueSimulation.from_data(num_envs * num_intersections, records, seed=seed)
+    return VectorTrafficEnv(num_envs, num_intersections, simulation=simulation)
+
+# Rollout worker: learn from a copy of the Q-table and return the change and the visit counts
+def rollout(task):
+    q_table, num_intersections, num_envs, steps, epsilon, seed, records = task
+    env = make_env(num_envs, num_intersections, records, seed)
+    agent = QLearningAgent(num_intersections, epsilon=epsilon, q_table=q_table.copy(), seed=seed,
+                           observation_size=env.observation_size)
+    visits = np.zeros(q_table.size, dtype=np.int64)
+    total_reward = 0.0
+    states = agent.encode(env.reset())
+    for _ in range(steps):
+        actions = agent.act(states)
+        observations, rewards, dones, _ = env.step(actions)
+        next_states = agent.encode(observations)
+        visits += agent.update(states, actions, rewards, next_states, dones)
+        total_reward += rewards.sum()
+        states = next_states
+    return agent.q_table - q_table, visits.reshape(q_table.shape), total_reward / (num_envs * steps)
+
+# Merge worker updates: each entry moves by the mean change of the workers that visited it
+def merge(q_table, results):
+    deltas = np.zeros_like(q_table)
+    visited_by = np.zeros(q_table.shape, dtype=np.int64)
+    for delta, visits, _ in results:
+        deltas += delta
+        visited_by += visits > 0
+    np.divide(deltas, visited_by, out=deltas, where=visited_by > 0)
+    q_table += deltas
+
+def train(num_intersections, rounds=ROUNDS, workers=None, num_envs=ENVS, steps=STEPS, seed=0):
+    """Train a QLearningAgent with rollouts spread over a process pool; returns the agent."""
+    workers = workers or os.cpu_count()
+    records = load_intersection_data()
+    observation_size = make_env(1, num_intersections, records).observation_size
+    agent = QLearningAgent(num_intersections, seed=seed, observation_size=observation_size)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for round_index in range(rounds):
+            # Exploration decays linearly from EPSILON_START to EPSILON_END over the rounds
+            epsilon = EPSILON_START + (EPSILON_END - EPSILON_START) * round_index / max(1, rounds - 1)
+            started = time.perf_counter()
+            tasks = [(agent.q_table, num_intersections, num_envs, steps, epsilon,
+                      seed * 1000003 + round_index * workers + worker, records)
+                     for worker in range(workers)]
+            results = list(pool.map(rollout, tasks))
+            merge(agent.q_table, results)
+            mean_reward = np.mean([result[2] for result in results])
+            env_steps = workers * num_envs * steps
+            print(f"Round {round_index + 1}/{rounds}: epsilon {epsilon:.2f}, mean reward {mean_reward:.3f}, "
+                  f"{env_steps / (time.perf_counter() - started):.0f} env steps/s")
+    return agent
+
+# Function to compare the greedy policy with random light choices on fresh simulations
+def evaluate(agent, num_intersections, records, num_envs=ENVS, seed=12345):
+    """Mean vehicles queued per environment over one episode, for the policy and for random choices."""
+    rng = np.random.default_rng(seed)
+    choices = {
+        "policy": lambda observations: agent.act(agent.encode(observations), epsilon=0.0),
+        "random": lambda observations: rng.integers(0, num_intersections, len(observations))
+    }
+    results = {}
+    for name, choose in choices.items():
+        env = make_env(num_envs, num_intersections, records, seed)
+        observations = env.reset()
+        waiting = 0.0
+        for _ in range(STEPS):
+            observations, _, _, info = env.step(choose(observations))
+            waiting += info["waiting"].mean()
+        results[name] = waiting / env.episode_seconds
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the traffic light Q-learning policy.")
+    parser.add_argument('--intersections', type=int, help="Default: the length of the current optimal route")
+    parser.add_argument('--rounds', type=int, default=ROUNDS)
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Rollout processes")
+    parser.add_argument('--envs', type=int, default=ENVS, help="Environments per worker")
+    parser.add_argument('--steps', type=int, default=STEPS, help="Steps per worker and round")
+    parser.add_argument('--output', default=POLICY_FILE)
+    args = parser.parse_args()
+
+    num_intersections = args.intersections or route_length()
+    agent = train(num_intersections, args.rounds, args.workers, args.envs, args.steps)
+    results = evaluate(agent, num_intersections, load_intersection_data())
+    print(f"Mean vehicles queued per episode: {results['policy']:.1f} with the policy, "
+          f"{results['random']:.1f} with random lights")
+    agent.save(args.output)
+    print(f"Policy for {num_intersections} intersections saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import json
+import math
+import time
+import numpy as np
+
+try:
+    import cv2
+except ImportError:  # Resizing falls back to numpy sampling when OpenCV is missing
+    cv2 = None
+
+# Seconds one inference may take before the input resolution is lowered
+LATENCY_BUDGET = 0.15
+# Camera frame rate the inference rate is matched to
+TARGET_FPS = 15.0
+# Input scales tried from best to cheapest, and the largest number of frames between inferences
+SCALES = [1.0, 0.75, 0.5, 0.375, 0.25]
+MAX_STRIDE = 8
+# Mean absolute grey-level change (0-255) below which a frame is considered unchanged
+MOTION_THRESHOLD = 2.0
+# Pixel step used when downsampling frames for the motion score
+MOTION_STEP = 8
+# Inferences to wait after a resolution change before changing it again
+COOLDOWN = 5
+# Smoothing of the measured inference latency
+EWMA = 0.3
+
+# Function to load controller settings (constructor keywords) from a JSON file
+def load_config(path):
+    with open(path, 'r') as file:
+        return json.load(file)
+
+def resize(image, scale):
+    if scale == 1.0:
+        return image
+    height, width = image.shape[:2]
+    size = (max(1, int(width * scale)), max(1, int(height * scale)))
+    if cv2 is not None:
+        return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+    rows = (np.arange(size[1]) / scale).astype(int)
+    cols = (np.arange(size[0]) / scale).astype(int)
+    return image[rows][:, cols]
+
+# Function to rasterize polygons given in 0..1 image coordinates into a boolean mask
+def polygon_mask(polygons, height, width):
+    ys, xs = np.mgrid[0:height, 0:width]
+    xs = (xs + 0.5) / width
+    ys = (ys + 0.5) / height
+    mask = np.zeros((height, width), dtype=bool)
+    for polygon in polygons:
+        inside = np.zeros((height, width), dtype=bool)
+        points = list(polygon)
+        # Even-odd rule: toggle for every polygon edge crossed by a ray to the right
+        for (x1, y1), (x2, y2) in zip(points, points[1:] + points[:1]):
+            if y1 == y2:
+                continue
+            crosses = (ys >= min(y1, y2)) & (ys < max(y1, y2))
+            x_at_y = x1 + (ys - y1) * (x2 - x1) / (y2 - y1)
+            inside ^= crosses & (xs < x_at_y)
+        mask |= inside
+    return mask
+
+def to_gray(image):
+    if image.ndim == 3:
+        return image[..., :3].mean(axis=2)
+    return image.astype(float)
+
+class AdaptiveController:
+    """Decides, frame by frame, whether and at which resolution to run detection.
+
+    detect(image) returns boxes (x1, y1, x2, y2, ...) in the coordinates of the image it
+    was given; process() maps them back to the full frame. Only the bounding rectangle of
+    the lane ROI polygons is processed (pixels outside the polygons are blanked), frames
+    whose motion score is below motion_threshold reuse the previous detections, the input
+    scale is lowered while the smoothed latency exceeds latency_budget, and the inference
+    rate is lowered until inference keeps up with target_fps.
+
+    The rate skipping assumes process() sees every camera frame. Behind a FramePipeline,
+    whose LatestSlot already drops the frames inference has no time for, pass
+    skip_frames=False: skipping again would leave inference idle between the frames the
+    slot delivers.
+    """
+
+    def __init__(self, detect, latency_budget=LATENCY_BUDGET, target_fps=TARGET_FPS, scales=SCALES,
+                 max_stride=MAX_STRIDE, motion_threshold=MOTION_THRESHOLD, roi=None, skip_frames=True,
+                 clock=time.perf_counter):
+        self.detect = detect
+        self.latency_budget = latency_budget
+        self.target_fps = target_fps
+        self.scales = list(scales)
+        self.max_stride = max_stride
+        self.motion_threshold = motion_threshold
+        self.roi = roi  # List of polygons in 0..1 coordinates, or None for the whole frame
+        self.skip_frames = skip_frames
+        self.clock = clock
+        self.scale_index = 0
+        self.stride = 1
+        self.latency = None
+        self.cooldown = 0
+        self.frame_index = 0
+        self.last_boxes = []
+        self._last_motion_image = None
+        self._roi_cache = None
+        self.counts = {"frames": 0, "inferences": 0, "skipped_rate": 0, "skipped_motion": 0}
+
+    @property
+    def scale(self):
+        return self.scales[self.scale_index]
+
+    def _roi_for(self, shape):
+        """Return (mask of the crop or None, (y0, y1, x0, x1)) for a frame shape, cached."""
+        height, width = shape[:2]
+        if self._roi_cache is None or self._roi_cache[0] != (height, width):
+            if not self.roi:
+                self._roi_cache = ((height, width), None, (0, height, 0, width))
+            else:
+                mask = polygon_mask(self.roi, height, width)
+                rows, cols = np.any(mask, axis=1), np.any(mask, axis=0)
+                if not rows.any():
+                    raise ValueError("The ROI polygons do not cover any pixel of the frame")
+                y0, y1 = np.argmax(rows), height - np.argmax(rows[::-1])
+                x0, x1 = np.argmax(cols), width - np.argmax(cols[::-1])
+                self._roi_cache = ((height, width), mask[y0:y1, x0:x1], (y0, y1, x0, x1))
+        return self._roi_cache[1], self._roi_cache[2]
+
+    def motion_score(self, image):
+        """Mean absolute change of a downsampled grey image since the last inference."""
+        small = to_gray(image[::MOTION_STEP, ::MOTION_STEP])
+        if self._last_motion_image is None or self._last_motion_image.shape != small.shape:
+            return None, small
+        return float(np.abs(small - self._last_motion_image).mean()), small
+
+    def adapt(self, latency):
+        self.latency = latency if self.latency is None else (1 - EWMA) * self.latency + EWMA * latency
+        if self.cooldown:
+            self.cooldown -= 1
+        elif self.latency > self.latency_budget and self.scale_index < len(self.scales) - 1:
+            self.scale_index += 1
+            self.cooldown = COOLDOWN
+        elif self.latency < 0.5 * self.latency_budget and self.scale_index > 0:
+            self.scale_index -= 1
+            self.cooldown = COOLDOWN
+        # Run inference on every stride-th frame, where stride frames last as long as one inference
+        if self.skip_frames:
+            self.stride = min(self.max_stride, max(1, math.ceil(self.latency * self.target_fps)))
+
+    def process(self, frame):
+        """Return (boxes in frame coordinates, info); info['ran'] is False when the last boxes were reused."""
+        self.frame_index += 1
+        self.counts["frames"] += 1
+        info = {"ran": False, "scale": self.scale, "stride": self.stride}
+        if (self.frame_index - 1) % self.stride:
+            self.counts["skipped_rate"] += 1
+            info["reason"] = "rate"
+            return self.last_boxes, info
+
+        mask, (y0, y1, x0, x1) = self._roi_for(frame.shape)
+        image = frame[y0:y1, x0:x1]
+        if mask is not None:
+            image = np.where(mask[..., None] if image.ndim == 3 else mask, image, 0).astype(frame.dtype)
+
+        score, small = self.motion_score(image)
+        info["motion"] = score
+        if score is not None and score < self.motion_threshold:
+            self.counts["skipped_motion"] += 1
+            info["reason"] = "motion"
+            return self.last_boxes, info
+
+        scale = self.scale
+        started = self.clock()
+        raw_boxes = self.detect(resize(image, scale))
+        latency = self.clock() - started
+        self._last_motion_image = small
+        self.counts["inferences"] += 1
+
+        boxes = []
+        for box in raw_boxes:
+            x1, y1_, x2, y2_ = (float(v) for v in box[:4])
+            mapped = (x1 / scale + x0, y1_ / scale + y0, x2 / scale + x0, y2_ / scale + y0) + tuple(box[4:])
+            if mask is not None:
+                # Keep only detections centred inside a lane polygon
+                cy = min(int((y1_ + y2_) / 2 / scale), mask.shape[0] - 1)
+                cx = min(int((x1 + x2) / 2 / scale), mask.shape[1] - 1)
+                if not mask[max(cy, 0), max(cx, 0)]:
+                    continue
+            boxes.append(mapped)
+        self.last_boxes = boxes
+        self.adapt(latency)
+        info.update(ran=True, latency=latency)
+        return boxes, info
@@ -0,0 +1,119 @@
+import argparse
+import time
+import numpy as np
+from adaptive_controller import AdaptiveController, cv2, load_config, to_gray
+
+CASCADE_FILE = "yolov3_weights.txt"  # OpenCV Haar cascade XML despite the name
+# Synthetic scene: frame size, frames, and the detector cost per megapixel of input
+FRAME_SIZE = (480, 640)
+FRAMES = 300
+SECONDS_PER_MEGAPIXEL = 0.4
+# Lower half of the frame, where the synthetic lanes are
+DEFAULT_ROI = [[[0.0, 0.45], [1.0, 0.45], [1.0, 1.0], [0.0, 1.0]]]
+
+# Function to generate a street with cars driving along two lanes and idle stretches without traffic
+def synthetic_frames(count=FRAMES, size=FRAME_SIZE, seed=0):
+    rng = np.random.default_rng(seed)
+    height, width = size
+    background = rng.integers(40, 90, size=(height, width, 3)).astype(np.uint8)
+    lanes = [int(height * 0.6), int(height * 0.8)]
+    for index in range(count):
+        frame = background.copy()
+        frame += rng.integers(0, 2, size=frame.shape, dtype=np.uint8)  # Sensor noise
+        # Traffic in the first and last thirds, an empty street in between
+        if index < count // 3 or index > 2 * count // 3:
+            for lane, speed in zip(lanes, (9, 14)):
+                x = (index * speed) % (width + 120) - 120
+                frame[lane - 20:lane + 20, max(x, 0):max(x + 100, 0)] = 230
+        yield frame
+
+def runs(indices):
+    """Split sorted indices into (first, last) runs of consecutive values."""
+    if len(indices) == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(indices) > 1)
+    starts = np.concatenate(([indices[0]], indices[breaks + 1]))
+    ends = np.concatenate((indices[breaks], [indices[-1]]))
+    return list(zip(starts, ends))
+
+# Function to find bright blobs, costing time in proportion to the input pixels like a CNN would
+def synthetic_detect(image, seconds_per_megapixel=SECONDS_PER_MEGAPIXEL):
+    time.sleep(image.shape[0] * image.shape[1] / 1e6 * seconds_per_megapixel)
+    bright = to_gray(image) > 160
+    boxes = []
+    for r0, r1 in runs(np.flatnonzero(bright.any(axis=1))):
+        for c0, c1 in runs(np.flatnonzero(bright[r0:r1 + 1].any(axis=0))):
+            boxes.append((int(c0), int(r0), int(c1) + 1, int(r1) + 1))
+    return boxes
+
+def cascade_detector(path):
+    cascade = cv2.CascadeClassifier(path)
+    if cascade.empty():
+        raise ValueError(f"Could not load the cascade from {path}")
+
+    def detect(image):
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        return [(x, y, x + w, y + h) for x, y, w, h in cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=3)]
+    return detect
+
+def video_frames(path):
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open {path}")
+    try:
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                return
+            yield frame
+    finally:
+        capture.release()
+
+def run(frames, controller):
+    started = time.perf_counter()
+    latencies = []
+    for frame in frames:
+        _, info = controller.process(frame)
+        if info["ran"]:
+            latencies.append(info["latency"])
+    seconds = time.perf_counter() - started
+    return {
+        **controller.counts,
+        "fps": controller.counts["frames"] / seconds,
+        "mean_latency_ms": np.mean(latencies) * 1000 if latencies else 0.0,
+        "scale": controller.scale,
+        "stride": controller.stride
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the adaptive detection controller offline.")
+    parser.add_argument('--video', help="Recorded video file (needs OpenCV); a synthetic street is used otherwise")
+    parser.add_argument('--cascade', default=CASCADE_FILE, help="Haar cascade used as the detector for --video")
+    parser.add_argument('--config', help="JSON file with AdaptiveController settings for the adaptive runs")
+    args = parser.parse_args()
+
+    if args.video:
+        if cv2 is None:
+            parser.error("--video needs OpenCV (cv2)")
+        detect = cascade_detector(args.cascade)
+        frames = lambda: video_frames(args.video)
+    else:
+        detect = synthetic_detect
+        frames = synthetic_frames
+
+    settings = load_config(args.config) if args.config else {}
+    configurations = [
+        ("full frame, every frame", dict(scales=[1.0], max_stride=1, motion_threshold=0.0)),
+        ("adaptive", dict(settings, roi=None)),
+        ("adaptive + lane ROI", dict({"roi": DEFAULT_ROI}, **settings))
+    ]
+    print(f"{'configuration':<26} {'frames':>7} {'infer':>6} {'rate skip':>10} {'motion skip':>12} "
+          f"{'fps':>7} {'ms/infer':>9} {'scale':>6} {'stride':>7}")
+    for name, options in configurations:
+        result = run(frames(), AdaptiveController(detect, **options))
+        print(f"{name:<26} {result['frames']:>7} {result['inferences']:>6} {result['skipped_rate']:>10} "
+              f"{result['skipped_motion']:>12} {result['fps']:>7.1f} {result['mean_latency_ms']:>9.1f} "
+              f"{result['scale']:>6} {result['stride']:>7}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+from local_iot_hub import LocalIoTHub, Message
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'SimulatedDevices'))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'SimulatedDevices', 'Air_Quality_Sensor_Simulation'))
+from fleet_simulator import DEFAULT_PROFILE, LocalHubSink, load_profile, run_fleet
+from telemetry_log import TelemetryLog
+from telemetry_transmitter import TelemetryTransmitter
+
+# Hub behaviour every scenario runs against
+HUB_LATENCY = 0.005
+HUB_JITTER = 0.005
+FAILURE_RATE = 0.0
+# How often the cloud side reads device-to-cloud messages, and how often the backlog is sampled
+CONSUME_INTERVAL = 0.01
+SAMPLE_INTERVAL = 0.25
+DEFAULT_OUTPUT = "benchmark_hub_results.json"
+
+def make_hub(args):
+    return LocalIoTHub(latency=args.latency, jitter=args.jitter, failure_rate=args.failure_rate)
+
+def summarize(messages, seconds, latencies, samples, backlog):
+    """Throughput, latency percentiles and backlog growth of one scenario."""
+    latencies = np.asarray(latencies)
+    times = np.array([t for t, _ in samples])
+    depths = np.array([depth for _, depth in samples])
+    growth = float(np.polyfit(times, depths, 1)[0]) if len(samples) > 1 else 0.0
+    return {
+        "messages": messages,
+        "seconds": round(seconds, 3),
+        "msgs_per_s": round(messages / seconds, 1) if seconds > 0 else 0.0,
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 2) if len(latencies) else None,
+        "p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 2) if len(latencies) else None,
+        "backlog_final": backlog,
+        "backlog_max": int(depths.max()) if len(depths) else 0,
+        "backlog_growth_per_s": round(growth, 1),
+        "backlog_samples": [[round(float(t), 3), int(depth)] for t, depth in samples]
+    }
+
+# Cloud-side reader of device-to-cloud messages, at most rate messages/s (None reads everything)
+async def consume(hub, latencies, stopped, rate=None, sent_time=None):
+    sent_time = sent_time or (lambda message: message.created)
+    started = last = time.perf_counter()
+    allowance = 0.0
+    while not stopped.is_set():
+        await asyncio.sleep(CONSUME_INTERVAL)
+        now = time.perf_counter()
+        if rate:
+            allowance = min(allowance + (now - last) * rate, rate)  # At most one second of catch-up
+            messages = hub.read_messages(int(allowance))
+            allowance -= len(messages)
+        else:
+            messages = hub.read_messages()
+        last = now
+        latencies.extend(now - sent_time(message) for _, _, message in messages)
+    return time.perf_counter() - started
+
+async def sample_backlog(backlog, samples, stopped):
+    started = time.perf_counter()
+    while not stopped.is_set():
+        samples.append((time.perf_counter() - started, backlog()))
+        await asyncio.sleep(SAMPLE_INTERVAL)
+
+# Device-to-cloud: the fleet simulator's sensors and traffic lights sending through the hub
+async def bench_fleet(args):
+    hub = make_hub(args)
+    profile = load_profile(args.profile)
+    latencies, samples = [], []
+    stopped = asyncio.Event()
+    tasks = [asyncio.create_task(consume(hub, latencies, stopped, args.consume_rate)),
+             asyncio.create_task(sample_backlog(hub.backlog, samples, stopped))]
+    _, seconds = await run_fleet(profile, LocalHubSink(hub), args.duration, args.speedup)
+    stopped.set()
+    await asyncio.gather(*tasks)
+    return summarize(len(hub.received), seconds, latencies, samples, hub.backlog())
+
+# Device-to-cloud through the air quality sender: records are appended to the telemetry log at a
+# fixed rate while the transmitter drains it; latency runs from the append to the cloud read
+async def bench_air_quality(args):
+    hub = make_hub(args)
+    client = hub.create_device_client("AirQualitySensor")
+    await client.connect()
+    appended = {}
+
+    async def send(record):
+        message = Message(json.dumps(record), content_encoding="utf-8", content_type="application/json")
+        await client.send_message(message)
+
+    def sent_time(message):
+        return appended[json.loads(message.data)["sequence"]]
+
+    with tempfile.TemporaryDirectory() as directory:
+        log = TelemetryLog(os.path.join(directory, 'telemetry.log'), consumers=('iothub',))
+        transmitter = TelemetryTransmitter(log.consumer('iothub'), send, poll_interval=0.05, seed=0)
+        latencies, samples = [], []
+        stopped = asyncio.Event()
+        tasks = [asyncio.create_task(transmitter.run()),
+                 asyncio.create_task(consume(hub, latencies, stopped, args.consume_rate, sent_time)),
+                 asyncio.create_task(sample_backlog(lambda: len(appended) - transmitter.sent, samples, stopped))]
+        started = time.perf_counter()
+        for sequence in range(int(args.duration * args.record_rate)):
+            await asyncio.sleep(max(0.0, started + sequence / args.record_rate - time.perf_counter()))
+            appended[sequence] = time.perf_counter()
+            log.append({"sensorType": "AirQualitySensor", "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+                        "sequence": sequence, "data": {"co": 4.7, "no2": 6.4, "pm25": 13}})
+        seconds = time.perf_counter() - started
+        transmitter.stop()
+        await asyncio.sleep(CONSUME_INTERVAL * 2)  # One last read of what the transmitter sent
+        stopped.set()
+        await asyncio.gather(*tasks)
+        log.close()
+    await client.shutdown()
+    return summarize(transmitter.sent, seconds, latencies, samples, len(appended) - transmitter.sent)
+
+# Cloud-to-device: traffic light commands, shaped like Traffic_light_commands/main.py, sent through
+# the registry manager to blocking device clients that each receive on their own thread
+def bench_c2d(args):
+    hub = make_hub(args)
+    registry_manager = hub.create_registry_manager()
+    stopped = threading.Event()
+
+    def receive(device_id):
+        client = hub.create_sync_device_client(device_id)
+        client.connect()
+        while not stopped.is_set():
+            client.receive_message(timeout=0.1)
+        client.shutdown()
+
+    devices = [f"TrafficLight-{index:05d}" for index in range(args.c2d_devices)]
+    receivers = [threading.Thread(target=receive, args=(device_id,)) for device_id in devices]
+    for thread in receivers:
+        thread.start()
+
+    samples = []
+    sampling_started = time.perf_counter()
+
+    def sample():
+        while not stopped.is_set():
+            samples.append((time.perf_counter() - sampling_started, hub.c2d_backlog()))
+            time.sleep(SAMPLE_INTERVAL)
+    sampler = threading.Thread(target=sample)
+    sampler.start()
+
+    # Commands go out at command_rate, or as fast as the blocking sends allow when that is slower
+    started = time.perf_counter()
+    sent = 0
+    sequence = 0
+    while time.perf_counter() - started < args.duration:
+        time.sleep(max(0.0, started + sequence / args.command_rate - time.perf_counter()))
+        state = "Green" if sequence % 2 == 0 else "Red"
+        message = json.dumps({"intersection_status": [{"name": "Intersection A", "state": state}]})
+        try:
+            registry_manager.send_c2d_message(devices[sequence % len(devices)], message)
+            sent += 1
+        except Exception as e:
+            print(f"Error sending message: {e}")
+        sequence += 1
+    seconds = time.perf_counter() - started
+    deadline = time.perf_counter() + 5.0
+    while hub.c2d_backlog() and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    stopped.set()
+    for thread in receivers + [sampler]:
+        thread.join()
+    latencies = [received - enqueued for _, enqueued, received, _ in hub.c2d_delivered]
+    return summarize(sent, seconds, latencies, samples, hub.c2d_backlog())
+
+SCENARIOS = {
+    "fleet": lambda args: asyncio.run(bench_fleet(args)),
+    "air_quality": lambda args: asyncio.run(bench_air_quality(args)),
+    "c2d": bench_c2d
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the senders end to end against the local IoT Hub.")
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--duration', type=float, default=5.0, help="Seconds each scenario sends for")
+    parser.add_argument('--latency', type=float, default=HUB_LATENCY, help="Hub latency per send, in seconds")
+    parser.add_argument('--jitter', type=float, default=HUB_JITTER)
+    parser.add_argument('--failure-rate', type=float, default=FAILURE_RATE)
+    parser.add_argument('--consume-rate', type=float, help="Cloud-side reads per second (default: unlimited)")
+    parser.add_argument('--profile', default=DEFAULT_PROFILE, help="Fleet simulator profile")
+    parser.add_argument('--speedup', type=float, default=20.0, help="Fleet send interval divisor")
+    parser.add_argument('--record-rate', type=float, default=200.0, help="Air quality records appended per second")
+    parser.add_argument('--command-rate', type=float, default=500.0, help="Cloud-to-device commands per second")
+    parser.add_argument('--c2d-devices', type=int, default=20)
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="JSON results file")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'scenario':<12} {'messages':>9} {'msgs/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'backlog/s':>10} {'backlog':>8}")
+    for name in args.scenarios:
+        result = results[name] = SCENARIOS[name](args)
+        print(f"{name:<12} {result['messages']:>9} {result['msgs_per_s']:>9.1f} {result['p50_ms'] or 0:>8.2f} "
+              f"{result['p99_ms'] or 0:>8.2f} {result['backlog_growth_per_s']:>10.1f} {result['backlog_final']:>8}")
+
+    with open(args.output, 'w') as file:
+        json.dump({"settings": {key: value for key, value in vars(args).items() if key != 'output'},
+                   "results": results}, file, indent=4)
+    print(f"Results saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import argparse
+import json
+import random
+import time
+import zlib
+import telemetry_codec
+from telemetry_codec import decode_batch, encode_batch
+
+RECORDS = 20000
+BATCH_SIZE = telemetry_codec.DEFAULT_BATCH_SIZE
+
+# Function to generate readings shaped like the simulators' and the routing data's
+def make_records(count, seed=0):
+    rng = random.Random(seed)
+    start = 1741996800  # 2025-03-15 00:00:00 UTC
+    records = []
+    for index in range(count):
+        timestamp = telemetry_codec.from_epoch(start + index)
+        kind = index % 5
+        if kind == 0:
+            data = {"co": round(rng.uniform(0, 10), 1), "no2": round(rng.uniform(0, 50), 1), "pm25": rng.randint(0, 150)}
+            records.append({"sensorType": "AirQualitySensor", "timestamp": timestamp, "data": data})
+        elif kind == 1:
+            records.append({"sensorType": "SpeedSensor", "timestamp": timestamp, "data": {"speed": round(rng.uniform(30, 80), 1)}})
+        elif kind == 2:
+            records.append({"sensorType": "RoadConditionSensor", "timestamp": timestamp,
+                            "data": {"road_condition": rng.choice(["dry", "wet", "icy"])}})
+        elif kind == 3:
+            records.append({"sensorType": "TrafficLight", "timestamp": timestamp,
+                            "data": {"state": rng.choice(["Red", "Green"])}})
+        else:
+            records.append({"timestamp": timestamp, "co": round(rng.uniform(2, 6), 1), "no2": round(rng.uniform(4, 8), 1),
+                            "pm25": rng.randint(6, 15), "temperature": round(rng.uniform(20, 26), 2),
+                            "humidity": round(rng.uniform(45, 65), 2), "traffic_volume": rng.randint(20, 50),
+                            "average_speed": round(rng.uniform(30, 50), 1), "vehicle_count": rng.randint(15, 35),
+                            "light_status": rng.choice(["red", "green"]), "rain": rng.randint(100, 700)})
+    return records
+
+def batches(records, size):
+    return [records[start:start + size] for start in range(0, len(records), size)]
+
+# Each format: (encode one batch into a list of messages, decode those messages back to records)
+def json_messages(indent):
+    return (lambda batch: [json.dumps(record, indent=indent).encode('utf-8') for record in batch],
+            lambda messages: [json.loads(message) for message in messages])
+
+def json_batch_zlib():
+    return (lambda batch: [zlib.compress(json.dumps(batch).encode('utf-8'), telemetry_codec.ZLIB_LEVEL)],
+            lambda messages: json.loads(zlib.decompress(messages[0])))
+
+def codec(compression):
+    return (lambda batch: [encode_batch(batch, compression)],
+            lambda messages: decode_batch(messages[0]))
+
+def measure(records, batch_size, encode, decode):
+    groups = batches(records, batch_size)
+    started = time.perf_counter()
+    encoded = [encode(batch) for batch in groups]
+    encode_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    decoded = [decode(messages) for messages in encoded]
+    decode_seconds = time.perf_counter() - started
+    assert [record for batch in decoded for record in batch] == records
+    size = sum(len(message) for messages in encoded for message in messages)
+    return size, len(records) / encode_seconds, len(records) / decode_seconds
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare telemetry frame sizes and speed against JSON messages.")
+    parser.add_argument('--records', type=int, default=RECORDS)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    records = make_records(args.records)
+    formats = [
+        ("JSON pretty, per message", json_messages(4)),
+        ("JSON plain, per message", json_messages(None)),
+        ("JSON batch + zlib", json_batch_zlib()),
+        ("frame, no compression", codec('none')),
+        ("frame + zlib", codec('zlib'))
+    ]
+    if telemetry_codec.zstandard is not None:
+        formats.append(("frame + zstd", codec('zstd')))
+
+    baseline = None
+    print(f"{args.records} readings, {args.batch_size} per batch")
+    print(f"{'format':<26} {'bytes/rec':>10} {'vs JSON':>8} {'enc rec/s':>11} {'dec rec/s':>11}")
+    for name, (encode, decode) in formats:
+        size, encode_rate, decode_rate = measure(records, args.batch_size, encode, decode)
+        per_record = size / len(records)
+        if name.startswith("JSON plain"):
+            baseline = per_record
+        ratio = f"{per_record / baseline:.2f}x" if baseline else ""
+        print(f"{name:<26} {per_record:>10.1f} {ratio:>8} {encode_rate:>11.0f} {decode_rate:>11.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import queue
+import threading
+import time
+from collections import deque
+
+# Latency samples kept per stage for the percentiles
+STATS_WINDOW = 500
+
+class LatestSlot:
+    """Single-item hand-off where a new item replaces one that was not taken yet.
+
+    Used between capture and inference so a slow consumer always gets the newest frame
+    instead of working through a backlog of stale ones; replaced items are counted.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.item = None
+        self.has_item = False
+        self.closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self.condition:
+            if self.has_item:
+                self.dropped += 1
+            self.item = item
+            self.has_item = True
+            self.condition.notify()
+
+    def get(self, timeout=None):
+        """Return the newest item, or None once closed or after timeout seconds."""
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.has_item or self.closed, timeout):
+                return None
+            if not self.has_item:
+                return None
+            item = self.item
+            self.item = None
+            self.has_item = False
+            return item
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+class StageStats:
+    """Latency of the recent calls of one stage, in milliseconds."""
+
+    def __init__(self, window=STATS_WINDOW):
+        self.lock = threading.Lock()
+        self.samples = deque(maxlen=window)
+        self.count = 0
+
+    def record(self, seconds):
+        with self.lock:
+            self.samples.append(seconds)
+            self.count += 1
+
+    def snapshot(self):
+        with self.lock:
+            samples = sorted(self.samples)
+            count = self.count
+        if not samples:
+            return {"count": count}
+        return {
+            "count": count,
+            "mean_ms": round(sum(samples) / len(samples) * 1000, 2),
+            "p50_ms": round(samples[len(samples) // 2] * 1000, 2),
+            "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 2),
+            "max_ms": round(samples[-1] * 1000, 2)
+        }
+
+class FramePipeline:
+    """Capture -> inference -> upload, each stage on its own thread.
+
+    read_frame() returns (ok, frame) like cv2.VideoCapture.read; infer(frame) returns
+    (telemetry, annotated_frame); upload(telemetry) sends one record. Capture hands over
+    through a LatestSlot, uploads through a bounded queue (the oldest record is dropped
+    when it is full), and annotated frames go to display_slot for an optional viewer.
+    """
+
+    def __init__(self, read_frame, infer, upload, upload_queue_size=32, display=True):
+        self.read_frame = read_frame
+        self.infer = infer
+        self.upload = upload
+        self.display = display
+        self.frames = LatestSlot()
+        self.display_slot = LatestSlot()
+        self.uploads = queue.Queue(maxsize=upload_queue_size)
+        self.stop_event = threading.Event()
+        self.threads = []
+        self.stats = {name: StageStats() for name in ("capture", "inference", "upload", "end_to_end")}
+        self.capture_errors = 0
+        self.inference_errors = 0
+        self.upload_errors = 0
+        self.upload_dropped = 0
+
+    def _capture(self):
+        while not self.stop_event.is_set():
+            started = time.perf_counter()
+            try:
+                ok, frame = self.read_frame()
+            except Exception as e:
+                print(f"Error reading frame: {e}")
+                ok = False
+            if not ok:
+                self.capture_errors += 1
+                print("Error: Failed to grab frame.")
+                time.sleep(0.1)
+                continue
+            self.stats["capture"].record(time.perf_counter() - started)
+            self.frames.put((started, frame))
+        self.frames.close()
+
+    def _inference(self):
+        while not self.stop_event.is_set():
+            item = self.frames.get(timeout=0.5)
+            if item is None:
+                continue
+            captured_at, frame = item
+            started = time.perf_counter()
+            try:
+                telemetry, annotated = self.infer(frame)
+            except Exception as e:
+                # One bad frame (e.g. an unreadable speed or an ALPR failure) must not stop the stage
+                self.inference_errors += 1
+                print(f"Error processing frame: {e}")
+                continue
+            self.stats["inference"].record(time.perf_counter() - started)
+            self._enqueue_upload((captured_at, telemetry))
+            if self.display:
+                self.display_slot.put(annotated)
+
+    def _enqueue_upload(self, item):
+        while True:
+            try:
+                self.uploads.put_nowait(item)
+                return
+            except queue.Full:
+                # The uplink is behind: keep the newest telemetry, drop the oldest
+                try:
+                    self.uploads.get_nowait()
+                    self.upload_dropped += 1
+                except queue.Empty:
+                    pass
+
+    def _upload(self):
+        while not self.stop_event.is_set() or not self.uploads.empty():
+            try:
+                captured_at, telemetry = self.uploads.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            started = time.perf_counter()
+            try:
+                self.upload(telemetry)
+            except Exception as e:
+                self.upload_errors += 1
+                print(f"Error sending telemetry: {e}")
+                continue
+            finished = time.perf_counter()
+            self.stats["upload"].record(finished - started)
+            self.stats["end_to_end"].record(finished - captured_at)
+
+    def start(self):
+        for target in (self._capture, self._inference, self._upload):
+            thread = threading.Thread(target=target, name=target.__name__.strip('_'), daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self, timeout=5.0):
+        self.stop_event.set()
+        self.display_slot.close()
+        for thread in self.threads:
+            thread.join(timeout)
+
+    def report(self):
+        return {
+            "stages": {name: stats.snapshot() for name, stats in self.stats.items()},
+            "frames_dropped": self.frames.dropped,
+            "display_dropped": self.display_slot.dropped,
+            "upload_dropped": self.upload_dropped,
+            "upload_queue": self.uploads.qsize(),
+            "capture_errors": self.capture_errors,
+            "inference_errors": self.inference_errors,
+            "upload_errors": self.upload_errors
+        }
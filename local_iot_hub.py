@@ -0,0 +1,183 @@
+import asyncio
+import random
+import threading
+import time
+import uuid
+from collections import deque
+
+class Message:
+    """Same fields as azure.iot.device.Message, for code that runs against the local hub."""
+
+    def __init__(self, data, message_id=None, content_encoding=None, content_type=None):
+        self.data = data
+        self.message_id = message_id or str(uuid.uuid4())
+        self.content_encoding = content_encoding
+        self.content_type = content_type
+        self.custom_properties = {}
+        # Creation time on the hub's default clock, for end-to-end latency
+        self.created = time.perf_counter()
+
+    def __str__(self):
+        return str(self.data)
+
+class HubSendError(Exception):
+    """Injected send failure, standing in for the connection errors of the Azure SDK."""
+
+class LocalIoTHub:
+    """In-process stand-in for Azure IoT Hub with device-to-cloud and cloud-to-device messages.
+
+    Each send waits latency (+ up to jitter) seconds and fails with probability
+    failure_rate, so retry and concurrency behaviour can be measured offline.
+    Device-to-cloud messages are kept in received and read back in order with
+    read_messages(); cloud-to-device messages wait in a queue per device until
+    the device client receives them.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0, seed=0, clock=time.perf_counter):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.clock = clock
+        # (device_id, enqueued time, message) in arrival order
+        self.received = []
+        self.read_offset = 0  # Messages in received already returned by read_messages()
+        self.failures = 0
+        # device_id -> deque of (enqueued time, message) waiting for the device
+        self.c2d_queues = {}
+        # (device_id, enqueued time, received time, message) in delivery order
+        self.c2d_delivered = []
+        self._c2d_ready = threading.Condition()
+
+    def create_device_client(self, device_id):
+        return LocalDeviceClient(self, device_id)
+
+    def create_sync_device_client(self, device_id):
+        return LocalSyncDeviceClient(self, device_id)
+
+    def create_registry_manager(self):
+        return LocalRegistryManager(self)
+
+    def _delay(self):
+        return self.latency + self.jitter * self.rng.random()
+
+    def _accept(self, device_id, message):
+        if self.failure_rate and self.rng.random() < self.failure_rate:
+            self.failures += 1
+            raise HubSendError(f"Injected send failure for {device_id}")
+        if not isinstance(message, Message):
+            message = Message(message)
+        self.received.append((device_id, self.clock(), message))
+
+    def read_messages(self, max_count=None):
+        """Return the next unread device-to-cloud messages, like a cloud-side consumer."""
+        end = len(self.received) if max_count is None else min(len(self.received), self.read_offset + max_count)
+        messages = self.received[self.read_offset:end]
+        self.read_offset = end
+        return messages
+
+    def backlog(self):
+        return len(self.received) - self.read_offset
+
+    def _enqueue_c2d(self, device_id, message):
+        if self.failure_rate and self.rng.random() < self.failure_rate:
+            self.failures += 1
+            raise HubSendError(f"Injected send failure for {device_id}")
+        if not isinstance(message, Message):
+            message = Message(message)
+        with self._c2d_ready:
+            self.c2d_queues.setdefault(device_id, deque()).append((self.clock(), message))
+            self._c2d_ready.notify_all()
+
+    def _take_c2d(self, device_id, timeout=0.0):
+        """Pop the oldest message for device_id, waiting up to timeout seconds (None waits forever)."""
+        with self._c2d_ready:
+            queue = self.c2d_queues.setdefault(device_id, deque())
+            if not queue and timeout != 0.0:
+                self._c2d_ready.wait_for(lambda: queue, timeout)
+            if not queue:
+                return None
+            enqueued, message = queue.popleft()
+            self.c2d_delivered.append((device_id, enqueued, self.clock(), message))
+            return message
+
+    def c2d_backlog(self):
+        with self._c2d_ready:
+            return sum(len(queue) for queue in self.c2d_queues.values())
+
+    def stats(self):
+        return {"received": len(self.received), "backlog": self.backlog(), "failures": self.failures,
+                "c2d_delivered": len(self.c2d_delivered), "c2d_backlog": self.c2d_backlog()}
+
+class LocalDeviceClient:
+    """Asyncio device client with the surface of azure.iot.device.aio.IoTHubDeviceClient."""
+
+    def __init__(self, hub, device_id):
+        self.hub = hub
+        self.device_id = device_id
+        self.connected = False
+
+    async def connect(self):
+        self.connected = True
+
+    async def disconnect(self):
+        self.connected = False
+
+    async def shutdown(self):
+        self.connected = False
+
+    async def send_message(self, message):
+        delay = self.hub._delay()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self.hub._accept(self.device_id, message)
+
+    async def receive_message(self, poll_interval=0.005):
+        """Wait for the next cloud-to-device message without blocking the event loop."""
+        while True:
+            message = self.hub._take_c2d(self.device_id)
+            if message is not None:
+                return message
+            await asyncio.sleep(poll_interval)
+
+class LocalSyncDeviceClient:
+    """Blocking device client with the surface of azure.iot.device.IoTHubDeviceClient."""
+
+    def __init__(self, hub, device_id):
+        self.hub = hub
+        self.device_id = device_id
+        self.connected = False
+
+    def connect(self):
+        self.connected = True
+
+    def disconnect(self):
+        self.connected = False
+
+    def shutdown(self):
+        self.connected = False
+
+    def send_message(self, message):
+        delay = self.hub._delay()
+        if delay > 0:
+            time.sleep(delay)
+        self.hub._accept(self.device_id, message)
+
+    def receive_message(self, block=True, timeout=None):
+        """Return the next cloud-to-device message, or None when none arrived in time."""
+        return self.hub._take_c2d(self.device_id, timeout if block else 0.0)
+
+class LocalRegistryManager:
+    """Service-side client with the send surface of azure.iot.hub.IoTHubRegistryManager."""
+
+    def __init__(self, hub):
+        self.hub = hub
+
+    def send_c2d_message(self, device_id, message, properties={}):
+        delay = self.hub._delay()
+        if delay > 0:
+            time.sleep(delay)
+        if not isinstance(message, Message):
+            message = Message(message)
+        message.custom_properties.update(properties)
+        self.hub._enqueue_c2d(device_id, message)
@@ -0,0 +1,194 @@
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_FILE = os.path.join(ROOT_DIR, '.pipeline_state.json')
+
+class Stage:
+    """One step of the pipeline.
+
+    run is called in this process; inputs are the files whose content decides whether the
+    stage needs to run again (a stage without inputs always runs); deps are stage names
+    that must finish first.
+    """
+
+    def __init__(self, name, run, inputs=(), deps=()):
+        self.name = name
+        self.run = run
+        self.inputs = list(inputs)
+        self.deps = list(deps)
+
+# Function to hash the content of the input files of a stage
+def hash_inputs(paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(path.encode('utf-8'))
+        if not os.path.exists(path):
+            digest.update(b'<missing>')
+            continue
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+def load_state(path=STATE_FILE):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r') as file:
+            return json.load(file)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+def save_state(state, path=STATE_FILE):
+    temporary_path = path + '.tmp'
+    with open(temporary_path, 'w') as file:
+        json.dump(state, file, indent=4)
+    os.replace(temporary_path, path)
+
+# Function to run a stage and measure its wall time
+def timed(run):
+    started = time.perf_counter()
+    try:
+        run()
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    except SystemExit as e:
+        error = f"exited with status {e.code}"
+    return time.perf_counter() - started, error
+
+# Run the stages as a DAG: independent stages run concurrently, unchanged stages are skipped
+def run_pipeline(stages, max_workers=4, force=False, state_path=STATE_FILE):
+    """Return {stage name: {"status": ..., "seconds": ...}}."""
+    by_name = {stage.name: stage for stage in stages}
+    for stage in stages:
+        unknown = [dep for dep in stage.deps if dep not in by_name]
+        if unknown:
+            raise ValueError(f"Stage {stage.name} depends on unknown stages: {unknown}")
+
+    state = load_state(state_path)
+    report = {}
+    pending = dict(by_name)
+    running = {}
+
+    def start(pool, stage):
+        # Hash the inputs when the stage becomes ready, so upstream outputs are included
+        input_hash = hash_inputs(stage.inputs) if stage.inputs else None
+        if not force and input_hash is not None and state.get(stage.name) == input_hash:
+            report[stage.name] = {"status": "skipped", "seconds": 0.0}
+            print(f"[{stage.name}] inputs unchanged, skipping.")
+            return
+        print(f"[{stage.name}] starting.")
+        running[pool.submit(timed, stage.run)] = (stage, input_hash)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            # Start every stage whose dependencies are finished
+            for name, stage in list(pending.items()):
+                dep_status = [report.get(dep, {}).get("status") for dep in stage.deps]
+                if any(status in ("failed", "blocked") for status in dep_status):
+                    report[name] = {"status": "blocked", "seconds": 0.0}
+                    print(f"[{name}] blocked by a failed dependency.")
+                    del pending[name]
+                elif all(status in ("done", "skipped") for status in dep_status):
+                    del pending[name]
+                    start(pool, stage)
+
+            if not running:
+                if pending:
+                    raise ValueError(f"Dependency cycle between stages: {sorted(pending)}")
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage, input_hash = running.pop(future)
+                seconds, error = future.result()
+                if error is None:
+                    report[stage.name] = {"status": "done", "seconds": seconds}
+                    if input_hash is not None:
+                        # Re-hash: a stage may rewrite its own inputs while it runs
+                        state[stage.name] = hash_inputs(stage.inputs)
+                    print(f"[{stage.name}] done in {seconds:.2f} s.")
+                else:
+                    report[stage.name] = {"status": "failed", "seconds": seconds, "error": error}
+                    state.pop(stage.name, None)
+                    print(f"[{stage.name}] failed after {seconds:.2f} s: {error}")
+
+    save_state(state, state_path)
+    return report
+
+# Function to run a script that cannot be imported, in its own interpreter
+def run_script(script_name, script_dir, *args, timeout=None):
+    """Run a script from its own directory; with a timeout, stop it after that many seconds."""
+    try:
+        subprocess.run([sys.executable, script_name] + list(args), cwd=script_dir, check=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        print(f"Stopped {script_name} after {timeout} seconds.")
+
+# Function to import a module from one of the project folders
+def import_from(folder, module_name):
+    path = os.path.join(ROOT_DIR, folder)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+    return __import__(module_name)
+
+def load_to_mongo(collection_name, **options):
+    json_to_mongo = import_from('JSON_to_MongoDB', 'json_to_mongo')
+    if not json_to_mongo.load_json_to_mongo(collection_name, **options):
+        raise RuntimeError(f"Loading {collection_name} into MongoDB failed")
+
+# Function to move the simulator log's readings into the columnar store, which lets the log compact them
+def store_telemetry():
+    import_from('AI_routing_algorithm', 'telemetry_store').append_logs()
+
+def run_routing():
+    import_from('AI_routing_algorithm', 'ai_routing').main()
+
+# The sensor -> MongoDB -> routing -> MongoDB chain that wrapper.py used to run one by one
+def default_stages(capture_seconds=60):
+    sensor_dir = os.path.join(ROOT_DIR, 'SimulatedDevices', 'Air_Quality_Sensor_Simulation')
+    routing_dir = os.path.join(ROOT_DIR, 'AI_routing_algorithm')
+    return [
+        # The simulator runs until stopped and connects to IoT Hub at import, so it keeps its own process
+        Stage("sensor_capture",
+              lambda: run_script("Air_Quality_Sensor_Simulation.py", sensor_dir, timeout=capture_seconds)),
+        # Streams only the readings added since the last run (from the simulator's telemetry log
+        # when there is one), so it runs every time instead of being skipped on unchanged inputs
+        Stage("mongo_sensor_readings", lambda: load_to_mongo("SensorReadings", stream=True, upsert=True),
+              deps=["sensor_capture"]),
+        # The store is a consumer of the simulator's log: segments are only deleted once it has read them
+        Stage("telemetry_store", store_telemetry, deps=["sensor_capture"]),
+        Stage("routing", run_routing,
+              inputs=[os.path.join(routing_dir, 'intersection_data.json'),
+                      os.path.join(routing_dir, 'sensor_data.json')]),
+        Stage("mongo_route_results", lambda: load_to_mongo("OptimalRouteResults"),
+              inputs=[os.path.join(routing_dir, 'optimal_route_results.json')],
+              deps=["routing"])
+    ]
+
+def print_report(report):
+    print(f"{'stage':<24} {'status':<8} {'seconds':>8}")
+    for name, result in report.items():
+        print(f"{name:<24} {result['status']:<8} {result['seconds']:>8.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the sensor, MongoDB and routing stages as a DAG.")
+    parser.add_argument('--force', action='store_true', help="Run every stage even if its inputs did not change")
+    parser.add_argument('--capture-seconds', type=float, default=60,
+                        help="How long the sensor simulator captures data before it is stopped")
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    report = run_pipeline(default_stages(args.capture_seconds), max_workers=args.workers, force=args.force)
+    print_report(report)
+    if any(result['status'] == 'failed' for result in report.values()):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -7,8 +7,13 @@ import json
 import datetime
 import requests
 import threading
+import argparse
+import time
 from azure.iot.device import IoTHubDeviceClient, Message
 from openalpr import Alpr
+from frame_pipeline import FramePipeline
+from vehicle_tracker import VehicleTracker
+from adaptive_controller import AdaptiveController, load_config
 
 # Load connection string for Azure IoT Hub
 def load_connection_string(filename="primary_connection_string.txt"):
@@ -20,11 +25,6 @@ client = IoTHubDeviceClient.create_from_connection_string(CONNECTION_STRING)
 
 # Camera feed from your phone (IP Webcam)
 ip_camera_url = "http://192.168.55.28:8080/video"
-cap = cv2.VideoCapture(ip_camera_url)
-
-if not cap.isOpened():
-    print("Error: Could not open video stream.")
-    exit()
 
 # Connect to Arduino for speed data
 ser = serial.Serial("/dev/serial0", 115200, timeout=1)
@@ -35,27 +35,60 @@ model = torch.hub.load("ultralytics/yolov5", "yolov5s", pretrained=True)
 # Initialize OpenALPR for license plate recognition
 alpr = Alpr("eu", "/etc/openalpr/openalpr.conf", "/usr/share/openalpr/runtime_data")
 
-# Function to detect cars and recognize license plates
-def detect_cars_and_license(frame):
-    results = model(frame)
-    car_count = 0
-    plate_number = "N/A"
+# Tracks cars across frames so each car is counted once and its plate is read a few times at most
+tracker = VehicleTracker()
+
+# Function to read the license plate on a car crop
+def read_license_plate(car_crop):
+    # recognize_ndarray skips the JPEG round trip on OpenALPR builds that provide it
+    if hasattr(alpr, "recognize_ndarray"):
+        alpr_results = alpr.recognize_ndarray(car_crop)
+    else:
+        alpr_results = alpr.recognize_array(cv2.imencode(".jpg", car_crop)[1].tobytes())
+    if alpr_results["plates"]:
+        best = alpr_results["plates"][0]
+        return best["characters"], best["confidence"]
+    return None, 0.0
+
+# Function to run YOLO on an image and return the car boxes
+def detect_car_boxes(image):
+    results = model(image)
+    car_boxes = []
 
     for result in results.xyxy[0]:
         x1, y1, x2, y2, conf, cls = result.numpy()
         if int(cls) == 2:  # Class 2 = Car
-            car_count += 1
-            cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), 2)
+            car_boxes.append((x1, y1, x2, y2))
+    return car_boxes
+
+# Chooses resolution and lane ROI for detect_car_boxes (see --controller-config); frames are
+# not skipped for rate, since the pipeline's LatestSlot already drops the ones inference misses
+controller = AdaptiveController(detect_car_boxes, skip_frames=False)
+last_tracks = []
+
+# Function to detect cars and recognize license plates; returns the tracked cars in the frame
+def detect_cars_and_license(frame):
+    global last_tracks
+    car_boxes, info = controller.process(frame)
+    if info["ran"]:
+        last_tracks = tracker.update(car_boxes)
+    tracks = last_tracks  # Skipped frames keep the tracks of the last inference
+
+    for track in tracks:
+        x1, y1, x2, y2 = (int(v) for v in track.box)
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
 
-            # Crop car region for license plate recognition
-            car_crop = frame[int(y1):int(y2), int(x1):int(x2)]
-            alpr_results = alpr.recognize_array(cv2.imencode(".jpg", car_crop)[1].tobytes())
+        # Run ALPR only for new or unresolved tracks, within their retry budget
+        if info["ran"] and tracker.needs_plate(track):
+            car_crop = frame[max(y1, 0):y2, max(x1, 0):x2]
+            if car_crop.size:
+                plate, confidence = read_license_plate(car_crop)
+                tracker.record_plate(track, plate, confidence)
 
-            if alpr_results["plates"]:
-                plate_number = alpr_results["plates"][0]["characters"]
-                cv2.putText(frame, plate_number, (int(x1), int(y1) - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 255), 2)
+        label = f"#{track.track_id} {track.plate or ''}".strip()
+        cv2.putText(frame, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 255), 2)
 
-    return car_count, plate_number
+    return tracks
 
 # Function to read car speed from Arduino
 def get_car_speed():
@@ -75,15 +108,11 @@ def send_telemetry_to_iothub(traffic_data):
     client.send_message(message)
     print(f"Sent to IoT Hub: {json.dumps(traffic_data)}")
 
-# Main loop to process video stream
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        print("Error: Failed to grab frame.")
-        continue
-
-    # Detect cars and license plates
-    car_count, license_plate = detect_cars_and_license(frame)
+# Function for the inference stage: detection, plates and speed for one frame
+def process_frame(frame):
+    # Detect and track cars, and read their license plates
+    tracks = detect_cars_and_license(frame)
+    plates = {str(track.track_id): track.plate for track in tracks if track.plate}
 
     # Get car speed from Arduino
     speed = get_car_speed()
@@ -91,20 +120,61 @@ while True:
     # Create JSON telemetry data
     traffic_data = {
         "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "vehicle_count": car_count,
-        "license_plate": license_plate,
+        "vehicle_count": len(tracks),  # Confirmed tracks in view, not raw detections
+        "vehicles_counted": tracker.total_count,  # Distinct vehicles since start
+        "license_plate": next(iter(plates.values()), "N/A"),
+        "license_plates": plates,
         "average_speed": speed
     }
-
-    # Send data to Azure IoT Hub
-    send_telemetry_to_iothub(traffic_data)
-
-    # Display processed frame
-    cv2.imshow("Car & License Plate Recognition", frame)
-
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
-
-cap.release()
-cv2.destroyAllWindows()
-alpr.unload()
+    return traffic_data, frame
+
+def main():
+    parser = argparse.ArgumentParser(description="Detect cars and plates on the camera feed and send them to IoT Hub.")
+    parser.add_argument('--camera-url', default=ip_camera_url)
+    parser.add_argument('--headless', action='store_true', help="Do not open a preview window")
+    parser.add_argument('--stats-interval', type=float, default=30.0,
+                        help="Seconds between pipeline latency / dropped frame reports")
+    parser.add_argument('--controller-config',
+                        help="JSON file with AdaptiveController settings (latency_budget, target_fps, roi, ...)")
+    args = parser.parse_args()
+
+    global controller
+    if args.controller_config:
+        controller = AdaptiveController(detect_car_boxes, **dict(load_config(args.controller_config), skip_frames=False))
+
+    cap = cv2.VideoCapture(args.camera_url)
+    if not cap.isOpened():
+        print("Error: Could not open video stream.")
+        exit()
+
+    # Capture, inference and upload run on their own threads, so a slow stage never stalls
+    # capture: inference always takes the newest frame and stale frames are dropped
+    pipeline = FramePipeline(cap.read, process_frame, send_telemetry_to_iothub, display=not args.headless)
+    pipeline.start()
+    last_report = time.monotonic()
+    try:
+        while True:
+            if args.headless:
+                time.sleep(0.5)
+            else:
+                # Display processed frames (imshow has to stay on the main thread)
+                frame = pipeline.display_slot.get(timeout=0.5)
+                if frame is not None:
+                    cv2.imshow("Car & License Plate Recognition", frame)
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+            if time.monotonic() - last_report >= args.stats_interval:
+                print(f"Pipeline stats: {json.dumps(pipeline.report())}")
+                print(f"Controller: scale {controller.scale}, stride {controller.stride}, {controller.counts}")
+                last_report = time.monotonic()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pipeline.stop()
+        print(f"Pipeline stats: {json.dumps(pipeline.report())}")
+        cap.release()
+        cv2.destroyAllWindows()
+        alpr.unload()
+
+if __name__ == "__main__":
+    main()
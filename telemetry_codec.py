@@ -0,0 +1,243 @@
+import calendar
+import json
+import math
+import struct
+import time
+import zlib
+from datetime import datetime
+
+try:
+    import zstandard
+except ImportError:  # zstd compression is optional; zlib is always available
+    zstandard = None
+
+# Frame header: magic, format version, compression, record count, payload bytes
+MAGIC = b'TLMF'
+VERSION = 1
+HEADER = struct.Struct('<4sBBII')
+COMPRESSIONS = {'none': 0, 'zlib': 1, 'zstd': 2}
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 3
+# Readings per frame when a file or stream is split into frames
+DEFAULT_BATCH_SIZE = 500
+# Extension of files holding concatenated frames
+FRAME_SUFFIX = '.tlm'
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Every record starts with its type id and its timestamp in epoch seconds
+RECORD_PREFIX = '<BI'
+# Type 0 carries any record that does not fit a schema as length-prefixed JSON
+JSON_RECORD = struct.Struct('<BI')
+JSON_TYPE = 0
+
+class Schema:
+    """Fixed binary layout of one kind of reading.
+
+    fields is a list of (name, struct code, decimals or a list of enum values). A field
+    with decimals holds floats and one without holds ints: decoding gives back that type,
+    so pack() refuses any other, and the record goes out as JSON instead. Nested schemas encode {"sensorType", "timestamp", "data": {...}} records like the
+    simulators send; flat schemas encode {"timestamp", <fields>} rows like the routing data.
+    """
+
+    def __init__(self, type_id, name, fields, nested=True):
+        self.type_id = type_id
+        self.name = name
+        self.nested = nested
+        self.names = [field[0] for field in fields]
+        self.codes = []  # Per field: ('enum', values, index) or ('number', scale, decimals)
+        for _, code, spec in fields:
+            if isinstance(spec, list):
+                self.codes.append(('enum', spec, {value: index for index, value in enumerate(spec)}))
+            else:
+                self.codes.append(('number', 10 ** spec, spec))
+        self.struct = struct.Struct(RECORD_PREFIX + ''.join(field[1] for field in fields))
+        self.keys = frozenset(self.names)
+
+    def pack(self, epoch, values):
+        """Pack the field values, or raise ValueError when unpack() would not return them as they are."""
+        packed = []
+        for value, (kind, spec, extra) in zip(values, self.codes):
+            if kind == 'enum':
+                packed.append(extra[value])
+            else:
+                # Exact type, so an int in a float field (or 12.0 in an int field) and bools are not coerced
+                if type(value) is not (float if extra else int):
+                    raise ValueError(f"{value!r} is not {'a float' if extra else 'an int'}")
+                scaled = round(value * spec)
+                if (round(scaled / spec, extra) if extra else scaled) != value:
+                    raise ValueError(f"{value!r} needs more than {extra} decimals")
+                if extra and value == 0.0 and math.copysign(1.0, value) < 0:
+                    raise ValueError("-0.0 would decode as 0.0")
+                packed.append(scaled)
+        try:
+            return self.struct.pack(self.type_id, epoch, *packed)
+        except struct.error as e:
+            raise ValueError(str(e))
+
+    def unpack(self, values):
+        fields = {}
+        for name, value, (kind, spec, decimals) in zip(self.names, values, self.codes):
+            if kind == 'enum':
+                fields[name] = spec[value]
+            elif decimals:
+                fields[name] = round(value / spec, decimals)
+            else:
+                fields[name] = value
+        return fields
+
+SCHEMAS = [
+    Schema(1, "AirQualitySensor", [("co", 'H', 2), ("no2", 'H', 1), ("pm25", 'H', 0)]),
+    Schema(2, "SpeedSensor", [("speed", 'H', 1)]),
+    Schema(3, "RoadConditionSensor", [("road_condition", 'B', ["dry", "wet", "icy"])]),
+    Schema(4, "TrafficLight", [("state", 'B', ["Red", "Green", "Yellow"])]),
+    # Intersection readings used by the routing model (AI_routing_algorithm/sensor_data.json)
+    Schema(5, "IntersectionReading", [
+        ("co", 'H', 2), ("no2", 'H', 1), ("pm25", 'H', 0), ("temperature", 'h', 2), ("humidity", 'H', 2),
+        ("traffic_volume", 'H', 0), ("average_speed", 'H', 1), ("vehicle_count", 'H', 0),
+        ("light_status", 'B', ["red", "green", "yellow"]), ("rain", 'H', 0)
+    ], nested=False)
+]
+SCHEMAS_BY_NAME = {schema.name: schema for schema in SCHEMAS if schema.nested}
+SCHEMAS_BY_ID = {schema.type_id: schema for schema in SCHEMAS}
+FLAT_SCHEMAS = {schema.keys: schema for schema in SCHEMAS if not schema.nested}
+
+# Epoch of midnight per "YYYY-mm-dd" day already seen; readings of one day share it
+_day_epochs = {}
+
+# Timestamps are "YYYY-mm-dd HH:MM:SS" in UTC, as the simulators write them
+def to_epoch(timestamp):
+    if (not isinstance(timestamp, str) or len(timestamp) != 19 or timestamp[10] != ' '
+            or timestamp[13] != ':' or timestamp[16] != ':'):
+        raise ValueError(f"Unsupported timestamp {timestamp!r}")
+    day = timestamp[:10]
+    day_epoch = _day_epochs.get(day)
+    if day_epoch is None:
+        day_epoch = _day_epochs[day] = calendar.timegm(datetime.strptime(day, "%Y-%m-%d").timetuple())
+    clock = timestamp[11:13] + timestamp[14:16] + timestamp[17:19]
+    hours, minutes, seconds = int(clock[:2]), int(clock[2:4]), int(clock[4:])
+    if not clock.isdigit() or hours > 23 or minutes > 59 or seconds > 59:
+        raise ValueError(f"Unsupported timestamp {timestamp!r}")
+    return day_epoch + hours * 3600 + minutes * 60 + seconds
+
+def from_epoch(epoch):
+    return time.strftime(TIMESTAMP_FORMAT, time.gmtime(epoch))
+
+def encode_record(record):
+    """Binary form of one reading; falls back to JSON for anything a schema cannot hold exactly, types included."""
+    try:
+        if "sensorType" in record:
+            schema = SCHEMAS_BY_NAME[record["sensorType"]]
+            data = record["data"]
+            if len(record) != 3 or data.keys() != schema.keys:
+                raise ValueError("Fields do not match the schema")
+        else:
+            schema = FLAT_SCHEMAS[frozenset(record) - {"timestamp"}]
+            data = record
+        return schema.pack(to_epoch(record["timestamp"]), [data[name] for name in schema.names])
+    except (KeyError, ValueError, TypeError, AttributeError):
+        body = json.dumps(record, separators=(',', ':')).encode('utf-8')
+        return JSON_RECORD.pack(JSON_TYPE, len(body)) + body
+
+def compress(payload, compression):
+    if compression == 'zlib':
+        return zlib.compress(payload, ZLIB_LEVEL)
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ValueError("zstd compression needs the zstandard package")
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(payload)
+    if compression == 'none':
+        return payload
+    raise ValueError(f"Unknown compression {compression!r} (use {', '.join(COMPRESSIONS)})")
+
+def decompress(payload, compression_id):
+    if compression_id == COMPRESSIONS['zlib']:
+        return zlib.decompress(payload)
+    if compression_id == COMPRESSIONS['zstd']:
+        if zstandard is None:
+            raise ValueError("Frame is zstd compressed but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    if compression_id == COMPRESSIONS['none']:
+        return payload
+    raise ValueError(f"Unknown compression id {compression_id}")
+
+def encode_batch(records, compression='zlib'):
+    """Encode many readings into one frame."""
+    payload = compress(b''.join(encode_record(record) for record in records), compression)
+    return HEADER.pack(MAGIC, VERSION, COMPRESSIONS[compression], len(records), len(payload)) + payload
+
+def _decode_payload(payload, count):
+    records = []
+    offset = 0
+    for _ in range(count):
+        type_id = payload[offset]
+        if type_id == JSON_TYPE:
+            _, length = JSON_RECORD.unpack_from(payload, offset)
+            offset += JSON_RECORD.size
+            records.append(json.loads(payload[offset:offset + length]))
+            offset += length
+            continue
+        schema = SCHEMAS_BY_ID[type_id]
+        values = schema.struct.unpack_from(payload, offset)
+        offset += schema.struct.size
+        fields = schema.unpack(values[2:])
+        if schema.nested:
+            records.append({"sensorType": schema.name, "timestamp": from_epoch(values[1]), "data": fields})
+        else:
+            records.append(dict(timestamp=from_epoch(values[1]), **fields))
+    return records
+
+def decode_frame(frame, offset=0):
+    """Decode the frame starting at offset. Returns (records, offset after the frame)."""
+    if len(frame) - offset < HEADER.size:
+        raise ValueError("Truncated frame header")
+    magic, version, compression_id, count, length = HEADER.unpack_from(frame, offset)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Not a version {VERSION} telemetry frame")
+    start = offset + HEADER.size
+    if len(frame) - start < length:
+        raise ValueError("Truncated frame payload")
+    payload = decompress(bytes(frame[start:start + length]), compression_id)
+    return _decode_payload(payload, count), start + length
+
+def decode_batch(frame):
+    return decode_frame(frame)[0]
+
+def decode_message(body):
+    """Records of a hub message body: a binary frame, or a JSON reading / list of readings."""
+    if isinstance(body, (bytes, bytearray)) and body[:len(MAGIC)] == MAGIC:
+        return decode_batch(body)
+    data = json.loads(body)
+    return data if isinstance(data, list) else [data]
+
+def write_frames(path, records, batch_size=DEFAULT_BATCH_SIZE, compression='zlib', mode='wb'):
+    """Write readings to a frame file, batch_size per frame. Returns the number of frames."""
+    frames = 0
+    with open(path, mode) as file:
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) == batch_size:
+                file.write(encode_batch(batch, compression))
+                frames += 1
+                batch = []
+        if batch:
+            file.write(encode_batch(batch, compression))
+            frames += 1
+    return frames
+
+def read_frames(path):
+    """Yield the readings of a frame file one frame at a time, as lists."""
+    with open(path, 'rb') as file:
+        data = file.read()
+    offset = 0
+    while offset < len(data):
+        records, offset = decode_frame(data, offset)
+        yield records
+
+def load_records(path):
+    """All readings of a frame file (FRAME_SUFFIX) or a JSON array file."""
+    if path.endswith(FRAME_SUFFIX):
+        return [record for records in read_frames(path) for record in records]
+    with open(path, 'r') as file:
+        return json.load(file)
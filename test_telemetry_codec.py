@@ -0,0 +1,42 @@
+import pytest
+from telemetry_codec import JSON_TYPE, decode_batch, encode_batch, encode_record
+
+# Function to pair every value with its type, so 4 and 4.0 (or 1 and True) compare different
+def typed(value):
+    if isinstance(value, dict):
+        return {key: typed(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [typed(item) for item in value]
+    return type(value).__name__, value
+
+def air_quality(co, no2, pm25):
+    return {"sensorType": "AirQualitySensor", "timestamp": "2025-03-15 08:30:00",
+            "data": {"co": co, "no2": no2, "pm25": pm25}}
+
+def intersection(**changes):
+    record = {"timestamp": "2025-03-15 08:30:00", "co": 4.25, "no2": 6.5, "pm25": 12, "temperature": -3.5,
+              "humidity": 55.25, "traffic_volume": 40, "average_speed": 35.5, "vehicle_count": 20,
+              "light_status": "red", "rain": 300}
+    record.update(changes)
+    return record
+
+@pytest.mark.parametrize('record, binary', [
+    (air_quality(4.25, 6.5, 12), True),
+    (air_quality(4, 6.5, 12), False),        # int in a float field
+    (air_quality(4.25, 6.5, 12.0), False),   # float in an int field
+    (air_quality(4.25, 6.5, True), False),   # bool in an int field
+    (air_quality(-0.0, 6.5, 12), False),     # the sign of zero would be lost
+    (air_quality(4.125, 6.5, 12), False),    # more decimals than the field keeps
+    (intersection(), True),
+    (intersection(temperature=22), False),
+    (intersection(rain=300.0), False),
+])
+def test_encode_decode_keeps_values_and_types(record, binary):
+    assert (encode_record(record)[0] != JSON_TYPE) == binary
+    decoded = decode_batch(encode_batch([record]))
+    assert typed(decoded) == typed([record])
+
+def test_mixed_batch_round_trip():
+    records = [air_quality(4.25, 6.5, 12), air_quality(5, 7, 8), intersection(), intersection(vehicle_count=20.5),
+               {"sensorType": "TrafficLight", "timestamp": "2025-03-15 08:30:01", "data": {"state": "Green"}}]
+    assert typed(decode_batch(encode_batch(records))) == typed(records)
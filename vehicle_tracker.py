@@ -0,0 +1,155 @@
+import numpy as np
+
+# Minimum IoU between a predicted track box and a detection for them to be matched
+IOU_THRESHOLD = 0.3
+# Unmatched detections can still join a track whose centre is within this many box diagonals
+CENTROID_DISTANCE = 1.0
+# Frames a track survives without a detection, and detections needed before it counts as a vehicle
+MAX_MISSES = 5
+MIN_HITS = 3
+# Plate recognition budget per track: attempts, frames between attempts, and the confidence that ends retries
+PLATE_ATTEMPTS = 3
+PLATE_RETRY_FRAMES = 5
+PLATE_CONFIDENCE = 85.0
+
+class Track:
+    """One vehicle followed across frames, with its best plate read so far."""
+
+    def __init__(self, track_id, box, frame_index):
+        self.track_id = track_id
+        self.box = np.asarray(box, dtype=float)
+        self.velocity = np.zeros(2)
+        self.hits = 1
+        self.misses = 0
+        self.first_frame = frame_index
+        self.confirmed = False
+        self.plate = None
+        self.plate_confidence = 0.0
+        self.plate_attempts = 0
+        self.last_plate_frame = None
+
+    def center(self):
+        return (self.box[:2] + self.box[2:]) / 2
+
+    def predicted_box(self):
+        # Constant velocity step of the box centre since the last matched detection
+        return self.box + np.tile(self.velocity * (self.misses + 1), 2)
+
+    def update(self, box):
+        box = np.asarray(box, dtype=float)
+        new_center = (box[:2] + box[2:]) / 2
+        self.velocity = 0.5 * self.velocity + 0.5 * (new_center - self.center()) / (self.misses + 1)
+        self.box = box
+        self.hits += 1
+        self.misses = 0
+
+# Function to compute the IoU of every pair of (x1, y1, x2, y2) boxes
+def iou_matrix(boxes_a, boxes_b):
+    boxes_a = np.asarray(boxes_a, dtype=float).reshape(-1, 4)
+    boxes_b = np.asarray(boxes_b, dtype=float).reshape(-1, 4)
+    top_left = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    bottom_right = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(boxes_a[:, 2:] - boxes_a[:, :2], axis=1)
+    area_b = np.prod(boxes_b[:, 2:] - boxes_b[:, :2], axis=1)
+    union = area_a[:, None] + area_b[None, :] - intersection
+    return np.where(union > 0, intersection / np.maximum(union, 1e-9), 0.0)
+
+class VehicleTracker:
+    """SORT-style tracker: detections are matched to predicted track boxes by IoU.
+
+    Matching is greedy on the IoU matrix (best pairs first), with a centroid-distance
+    fallback for fast vehicles whose boxes no longer overlap. A track is counted once,
+    when it reaches min_hits detections, so total_count is the number of distinct vehicles.
+    """
+
+    def __init__(self, iou_threshold=IOU_THRESHOLD, centroid_distance=CENTROID_DISTANCE,
+                 max_misses=MAX_MISSES, min_hits=MIN_HITS, plate_attempts=PLATE_ATTEMPTS,
+                 plate_retry_frames=PLATE_RETRY_FRAMES, plate_confidence=PLATE_CONFIDENCE):
+        self.iou_threshold = iou_threshold
+        self.centroid_distance = centroid_distance
+        self.max_misses = max_misses
+        self.min_hits = min_hits
+        self.plate_attempts = plate_attempts
+        self.plate_retry_frames = plate_retry_frames
+        self.plate_confidence = plate_confidence
+        self.tracks = []
+        self.next_id = 1
+        self.frame_index = 0
+        self.total_count = 0
+        self.plate_reads = 0
+
+    def _match(self, boxes):
+        """Return (pairs of (track index, detection index), unmatched detection indices)."""
+        pairs = []
+        free_tracks = set(range(len(self.tracks)))
+        free_detections = set(range(len(boxes)))
+        if self.tracks and len(boxes):
+            predicted = np.array([track.predicted_box() for track in self.tracks])
+            overlaps = iou_matrix(predicted, boxes)
+            for flat in np.argsort(overlaps, axis=None)[::-1]:
+                t, d = np.unravel_index(flat, overlaps.shape)
+                if overlaps[t, d] < self.iou_threshold:
+                    break
+                if t in free_tracks and d in free_detections:
+                    pairs.append((t, d))
+                    free_tracks.discard(t)
+                    free_detections.discard(d)
+
+            # Centroid fallback for what IoU could not match
+            for d in sorted(free_detections):
+                center = (boxes[d][:2] + boxes[d][2:]) / 2
+                best, best_distance = None, None
+                for t in free_tracks:
+                    box = predicted[t]
+                    distance = np.linalg.norm((box[:2] + box[2:]) / 2 - center)
+                    limit = self.centroid_distance * np.linalg.norm(box[2:] - box[:2])
+                    if distance <= limit and (best_distance is None or distance < best_distance):
+                        best, best_distance = t, distance
+                if best is not None:
+                    pairs.append((best, d))
+                    free_tracks.discard(best)
+                    free_detections.discard(d)
+        return pairs, sorted(free_detections)
+
+    def update(self, boxes):
+        """Feed the (x1, y1, x2, y2) detections of one frame; returns the confirmed tracks seen in it."""
+        boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        self.frame_index += 1
+        pairs, new_detections = self._match(boxes)
+
+        matched = set()
+        for t, d in pairs:
+            self.tracks[t].update(boxes[d])
+            matched.add(t)
+        for t, track in enumerate(self.tracks):
+            if t not in matched:
+                track.misses += 1
+        for d in new_detections:
+            self.tracks.append(Track(self.next_id, boxes[d], self.frame_index))
+            self.next_id += 1
+
+        visible = []
+        for track in self.tracks:
+            if not track.confirmed and track.hits >= self.min_hits:
+                track.confirmed = True
+                self.total_count += 1
+            if track.confirmed and track.misses == 0:
+                visible.append(track)
+        self.tracks = [track for track in self.tracks if track.misses <= self.max_misses]
+        return visible
+
+    def needs_plate(self, track):
+        """True for tracks without a confident plate that still have recognition attempts left."""
+        if track.plate_confidence >= self.plate_confidence or track.plate_attempts >= self.plate_attempts:
+            return False
+        return track.last_plate_frame is None or self.frame_index - track.last_plate_frame >= self.plate_retry_frames
+
+    def record_plate(self, track, plate, confidence):
+        """Count one recognition attempt and keep the plate if it is the best read of the track."""
+        track.plate_attempts += 1
+        track.last_plate_frame = self.frame_index
+        self.plate_reads += 1
+        if plate and confidence > track.plate_confidence:
+            track.plate = plate
+            track.plate_confidence = confidence